@@ -4,10 +4,14 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from config import Config
 from models import db
+from services.json_provider import init_json
+from services.compression import init_compression
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+init_json(app)
+init_compression(app)
 CORS(app)
 db.init_app(app)
 jwt = JWTManager(app)  # Initialize JWT manager
@@ -38,6 +42,37 @@ app.register_blueprint(moroccan_bp)
 with app.app_context():
     db.create_all()
 
+# Load resting limit/stop orders and stop-loss/take-profit levels into this process
+from services.order_book import order_engine
+from services.trade_triggers import trade_triggers
+order_engine.init_app(app)
+trade_triggers.init_app(app)
+
+# Challenge rules are evaluated off the order path
+from services.rule_queue import rule_queue
+rule_queue.init_app(app)
+
+# Ticks that take a challenge past its max trailing drawdown queue it for evaluation
+from services.mark_to_market import mtm_engine
+mtm_engine.on_drawdown = rule_queue.submit
+
+
+def _evict_final(challenge_id):
+    """Challenges that can no longer trade leave the order book and the trigger book"""
+    order_engine.evict(challenge_id)
+    trade_triggers.evict(challenge_id)
+
+
+rule_queue.on_final = _evict_final
+
+# Market orders are committed in groups by a single journal writer
+from services.trade_journal import trade_journal
+trade_journal.init_app(app)
+
+# Challenges whose owners stopped trading are evaluated by a periodic sweep
+from services.challenge_sweeper import challenge_sweeper
+challenge_sweeper.init_app(app)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -0,0 +1,158 @@
+"""
+Benchmark for group commit of market orders
+Runs the same concurrent order load with one commit per order
+(TradeService.execute_order) and through the trade journal (one commit per
+group), and prints orders per second for each.
+
+Usage: python benchmark_group_commit.py [threads] [orders_per_thread] [commit_latency_ms]
+
+Runs against a throwaway SQLite file unless BENCHMARK_DATABASE_URI is set.
+Point it at a scratch MySQL schema for production-like numbers: its tables
+are dropped and recreated. On storage where a log flush is nearly free
+(tmpfs, write-back caches) commit_latency_ms adds a sleep to every commit to
+model a durable disk; the commit count is reported either way.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+import config
+
+scratch = None
+if os.environ.get('BENCHMARK_DATABASE_URI'):
+    config.Config.SQLALCHEMY_DATABASE_URI = os.environ['BENCHMARK_DATABASE_URI']
+else:
+    scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    config.Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{scratch.name}'
+
+from app import app
+from models import db, User, UserChallenge
+from services.mark_to_market import mtm_engine
+from services.rule_queue import rule_queue
+from services.trade_journal import trade_journal
+from services.trade_service import TradeService
+
+
+def seed(threads):
+    """Fresh schema with one challenge per thread, so threads only contend on commits"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='benchmark@example.com', full_name='Benchmark')
+        user.set_password('benchmark')
+        db.session.add(user)
+        db.session.flush()
+        challenges = [
+            UserChallenge(user_id=user.id, plan_type='benchmark', initial_balance=1e9, current_balance=1e9,
+                          profit_target=1e8, max_daily_loss=5e7, max_total_loss=1e8, status='ACTIVE')
+            for _ in range(threads)
+        ]
+        db.session.add_all(challenges)
+        db.session.commit()
+        ids = [challenge.id for challenge in challenges]
+    for challenge_id in ids:
+        mtm_engine.discard(challenge_id)
+    return ids
+
+
+class CommitCounter:
+    """
+    Counts commits that wrote something and optionally makes each one slower
+
+    Read-only transactions do not flush the log, so they are neither counted
+    nor delayed.
+    """
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.commits = 0
+
+    def listen(self, engine):
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'commit', self.commit)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('SELECT'):
+            conn.info['wrote'] = True
+
+    def commit(self, conn):
+        if conn.info.pop('wrote', False):
+            self.commits += 1
+            if self.latency:
+                time.sleep(self.latency)
+
+
+def run(execute, threads, orders_per_thread, counter):
+    """Fire orders_per_thread orders from each thread, return (orders/s, commits, errors)"""
+    challenge_ids = seed(threads)
+    counter.commits = 0
+    errors = []
+    start = threading.Barrier(threads + 1)
+
+    def worker(challenge_id):
+        start.wait()
+        with app.app_context():
+            challenge = db.session.get(UserChallenge, challenge_id)
+            for i in range(orders_per_thread):
+                # Alternate sides so the balance and the challenge rules stay flat
+                side = 'BUY' if i % 2 == 0 else 'SELL'
+                fill, error = execute(challenge, 'AAPL', side, 1.0, 100.0, 'ACTIVE')
+                if error:
+                    errors.append(error)
+
+    workers = [threading.Thread(target=worker, args=(challenge_id,)) for challenge_id in challenge_ids]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Let queued rule evaluations finish before the next run drops the tables
+    with app.app_context():
+        rule_queue.flush()
+    time.sleep(rule_queue.window * 2)
+
+    return threads * orders_per_thread / elapsed, counter.commits, errors
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    orders_per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    trade_journal.enabled = True
+
+    with app.app_context():
+        engine = db.engine
+    counter = CommitCounter(latency_ms)
+    counter.listen(engine)
+
+    orders = threads * orders_per_thread
+    print(f"{threads} threads x {orders_per_thread} orders on {engine.url.get_backend_name()}"
+          f", +{latency_ms:g} ms per commit")
+    print('-' * 60)
+
+    single, single_commits, single_errors = run(TradeService.execute_order, threads, orders_per_thread, counter)
+    print(f"{'one commit per order':<28}{single:>8.0f} orders/s"
+          f"{orders / max(single_commits, 1):>8.1f} orders/commit")
+
+    grouped, grouped_commits, grouped_errors = run(trade_journal.execute_order, threads, orders_per_thread, counter)
+    print(f"{'group commit (journal)':<28}{grouped:>8.0f} orders/s"
+          f"{orders / max(grouped_commits, 1):>8.1f} orders/commit   ({grouped / single:.1f}x)")
+
+    for label, errors in (('one commit per order', single_errors), ('group commit', grouped_errors)):
+        if errors:
+            print(f"{label}: {len(errors)} failed orders, first: {errors[0]}")
+
+    if scratch is not None:
+        os.unlink(scratch.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark for challenge rule evaluation
+Evaluates the same synthetic challenges one at a time with ChallengeRules.check
+and in one pass with evaluate_batch, and prints challenges per second for each.
+
+Usage: python benchmark_rule_engine.py [number_of_challenges]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from challenge_engine import RULE_OUTCOMES, ChallengeRules, evaluate_batch
+
+
+def build_columns(count, seed=7):
+    """Synthetic challenge columns shaped like the default plans, about half of them breaking a rule"""
+    rng = np.random.default_rng(seed)
+    initial_balance = rng.choice([1000.0, 5000.0, 10000.0], size=count)
+    return {
+        'initial_balance': initial_balance,
+        'current_balance': initial_balance * rng.uniform(0.85, 1.15, size=count),
+        'daily_pnl': initial_balance * rng.uniform(-0.08, 0.03, size=count),
+        'profit_target': initial_balance * 0.10,
+        'max_daily_loss': initial_balance * 0.05,
+        'max_total_loss': initial_balance * 0.10,
+    }
+
+
+def best_of(runs, fn):
+    """Fastest of several runs, in seconds"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    columns = build_columns(count)
+
+    print(f"{count:,} challenges")
+    print('-' * 60)
+
+    # Rules compiled up front, as compile_rules caches them per challenge
+    rows = zip(*(columns[name].tolist() for name in
+                 ('initial_balance', 'profit_target', 'max_daily_loss', 'max_total_loss')))
+    rules = [ChallengeRules(thresholds + (None,)) for thresholds in rows]
+    balances = columns['current_balance'].tolist()
+    daily = columns['daily_pnl'].tolist()
+
+    single = best_of(1, lambda: [rule.check(balance, pnl) for rule, balance, pnl in zip(rules, balances, daily)])
+    print(f"{'ChallengeRules.check loop':<28}{count / single:>14,.0f} challenges/s{single * 1000:>10.1f} ms")
+
+    batch = best_of(5, lambda: evaluate_batch(**columns))
+    print(f"{'evaluate_batch (NumPy)':<28}{count / batch:>14,.0f} challenges/s{batch * 1000:>10.1f} ms"
+          f"   ({single / batch:.0f}x)")
+
+    counts = np.bincount(evaluate_batch(**columns), minlength=len(RULE_OUTCOMES))
+    print(', '.join(f"{outcome} {number:,}" for outcome, number in zip(RULE_OUTCOMES, counts)))
+
+
+if __name__ == '__main__':
+    main()
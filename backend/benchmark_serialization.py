@@ -0,0 +1,94 @@
+"""
+Benchmark for API response serialization
+Compares the previous jsonify path (isoformat per row + stdlib json) with the
+orjson provider and gzip/brotli compression on a /api/trades sized payload.
+
+Usage: python benchmark_serialization.py [number_of_trades]
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from services.compression import brotli, compress_body
+from services.json_provider import orjson, OrjsonProvider, _default
+
+
+def build_trades(count):
+    """Synthetic trade rows shaped like Trade.to_dict()"""
+    start = datetime(2024, 1, 15, 9, 30)
+    symbols = ['AAPL', 'TSLA', 'GOOGL', 'MSFT', 'BTC-USD', 'ETH-USD', 'IAM', 'ATW']
+    trades = []
+    for i in range(count):
+        price = round(random.uniform(50, 500), 2)
+        trades.append({
+            'id': i + 1,
+            'challenge_id': 1,
+            'user_id': 1,
+            'symbol': random.choice(symbols),
+            'trade_type': random.choice(['buy', 'sell']),
+            'quantity': round(random.uniform(1, 100), 4),
+            'entry_price': price,
+            'exit_price': price if i % 2 else None,
+            'profit_loss': round(random.uniform(-500, 500), 2),
+            'status': 'closed' if i % 2 else 'open',
+            'created_at': start + timedelta(seconds=i * 37, microseconds=i)
+        })
+    return trades
+
+
+def before(trades):
+    """Previous path: to_dict() formatted every datetime, Flask's default provider dumped it"""
+    rows = [dict(trade, created_at=trade['created_at'].isoformat()) for trade in trades]
+    return json.dumps({'trades': rows}, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def after(trades):
+    """New path: raw datetimes handed to orjson"""
+    return orjson.dumps({'trades': trades}, default=_default, option=OrjsonProvider.options)
+
+
+def cpu_time(func, trades, repeat):
+    """Best CPU time of `repeat` runs in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.process_time()
+        func(trades)
+        best = min(best, time.process_time() - started)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = 5
+    trades = build_trades(count)
+
+    print(f"Serializing {count} trades (best of {repeat})")
+    print('-' * 60)
+
+    old_ms = cpu_time(before, trades, repeat)
+    print(f"{'stdlib + isoformat per row':<32}{old_ms:>10.1f} ms")
+    if orjson is None:
+        print("orjson is not installed, install it to compare")
+        return
+    new_ms = cpu_time(after, trades, repeat)
+    print(f"{'orjson, native datetime':<32}{new_ms:>10.1f} ms   ({old_ms / new_ms:.1f}x faster)")
+
+    body = before(trades)
+    print('-' * 60)
+    print(f"{'Bytes on the wire':<32}{'size':>10}   {'compress ms':>11}")
+    print(f"{'identity':<32}{len(body):>10}   {'-':>11}")
+    for encoding in ('gzip', 'br'):
+        if encoding == 'br' and brotli is None:
+            print(f"{'br':<32}{'(brotli not installed)':>10}")
+            continue
+        started = time.process_time()
+        compressed = compress_body(body, encoding)
+        elapsed = (time.process_time() - started) * 1000
+        print(f"{encoding:<32}{len(compressed):>10}   {elapsed:>11.1f}   ({len(body) / len(compressed):.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,16 +3,156 @@ Challenge Engine - Core Business Logic
 Handles challenge evaluation based on trading rules
 """
 
-from datetime import datetime, timedelta
-from models import db, UserChallenge, Trade
+import math
+import numpy as np
+from models import db, UserChallenge
+from services.position_service import PositionService
+from services.daily_pnl_service import DailyPnlService
+from services.trading_calendar import get_calendar
+
+
+# Statuses that end a challenge, no further trading is allowed
+FINAL_STATUSES = ('PASSED', 'FAILED')
+
+
+class ChallengeRules:
+    """
+    A challenge's thresholds compiled into absolute limits
+    
+    The profit target and the max total loss become balance levels, the max
+    daily loss a floor for today's P&L and the max trailing drawdown a limit
+    on the fall from the equity peak, so checking a challenge is at most four
+    float comparisons. Rules are checked in order: profit target, max total
+    loss, max daily loss, max trailing drawdown.
+    """
+    
+    __slots__ = ('thresholds', 'pass_balance', 'fail_balance', 'daily_floor', 'max_drawdown')
+    
+    def __init__(self, thresholds):
+        initial_balance, profit_target, max_daily_loss, max_total_loss, max_trailing_drawdown = thresholds
+        self.thresholds = thresholds
+        self.pass_balance = initial_balance + profit_target
+        self.fail_balance = initial_balance - max_total_loss
+        self.daily_floor = -max_daily_loss
+        self.max_drawdown = math.inf if max_trailing_drawdown is None else max_trailing_drawdown
+    
+    def check(self, balance, daily_pnl, drawdown=0.0):
+        """
+        Find the first rule a balance, daily P&L and drawdown from the equity peak break
+        
+        Returns:
+            str: 'PASSED', 'FAILED_TOTAL', 'FAILED_DAILY' or 'FAILED_TRAILING',
+                 None while the challenge stays ACTIVE
+        """
+        if balance >= self.pass_balance:
+            return 'PASSED'
+        if balance <= self.fail_balance:
+            return 'FAILED_TOTAL'
+        if daily_pnl <= self.daily_floor:
+            return 'FAILED_DAILY'
+        if drawdown >= self.max_drawdown:
+            return 'FAILED_TRAILING'
+        return None
+
+
+# Compiled rules by challenge id
+_compiled_rules = {}
+
+
+def compile_rules(challenge):
+    """
+    Compiled rules of a challenge, built on first use and cached
+    
+    The cache entry is rebuilt if the challenge's thresholds changed since it
+    was compiled.
+    
+    Args:
+        challenge (UserChallenge): Challenge
+        
+    Returns:
+        ChallengeRules: The challenge's rules
+    """
+    thresholds = (challenge.initial_balance, challenge.profit_target, challenge.max_daily_loss,
+                  challenge.max_total_loss, challenge.max_trailing_drawdown)
+    rules = _compiled_rules.get(challenge.id)
+    
+    if rules is None or rules.thresholds != thresholds:
+        rules = ChallengeRules(thresholds)
+        _compiled_rules[challenge.id] = rules
+    
+    return rules
+
+
+# Outcomes of evaluate_batch, indexed by code (ACTIVE is 0)
+RULE_OUTCOMES = ('ACTIVE', 'PASSED', 'FAILED_TOTAL', 'FAILED_DAILY', 'FAILED_TRAILING')
+
+
+def evaluate_batch(initial_balance, current_balance, daily_pnl, profit_target, max_daily_loss, max_total_loss,
+                   drawdown=0.0, max_trailing_drawdown=math.inf):
+    """
+    Evaluate any number of challenges in one NumPy pass
+    
+    Every argument is a column (array-like, or a scalar applied to all
+    challenges). The limits are computed with the same float64 arithmetic as
+    ChallengeRules and the rules are applied in the same priority, so each
+    code is exactly the outcome ChallengeRules.check gives that challenge.
+    
+    Args:
+        initial_balance: Starting balances
+        current_balance: Current balances
+        daily_pnl: Today's P&L
+        profit_target: Profit targets
+        max_daily_loss: Max daily losses
+        max_total_loss: Max total losses
+        drawdown: Drawdowns from the equity peak, none by default
+        max_trailing_drawdown: Max trailing drawdowns, inf where the rule is off (the default)
+        
+    Returns:
+        numpy.ndarray: int8 codes, RULE_OUTCOMES[code] is the challenge's outcome
+    """
+    (initial_balance, current_balance, daily_pnl, profit_target, max_daily_loss, max_total_loss,
+     drawdown, max_trailing_drawdown) = np.broadcast_arrays(
+        *(np.asarray(column, dtype=np.float64) for column in
+          (initial_balance, current_balance, daily_pnl, profit_target, max_daily_loss, max_total_loss,
+           drawdown, max_trailing_drawdown))
+    )
+    
+    # Lowest priority first, so a higher priority rule overwrites the code.
+    # Like Python floats, inf - inf quietly gives nan, which breaks no rule
+    codes = np.zeros(current_balance.shape, dtype=np.int8)
+    with np.errstate(invalid='ignore', over='ignore'):
+        codes[drawdown >= max_trailing_drawdown] = 4
+        codes[daily_pnl <= -max_daily_loss] = 3
+        codes[current_balance <= initial_balance - max_total_loss] = 2
+        codes[current_balance >= initial_balance + profit_target] = 1
+    
+    return codes
+
+
+def current_drawdown(challenge):
+    """
+    A challenge's drawdown from its equity peak, from the mark-to-market engine
+    
+    Only looked up when the challenge has a max trailing drawdown.
+    
+    Args:
+        challenge (UserChallenge): Challenge with an up to date balance
+        
+    Returns:
+        float: Drawdown, 0.0 when the rule is off
+    """
+    if challenge.max_trailing_drawdown is None:
+        return 0.0
+    return PositionService.account_state(challenge)['drawdown']
 
 
 def evaluate_challenge(challenge_id):
     """
-    Evaluate challenge status based on business rules:
-    - MAX DAILY LOSS = 5% of starting balance
-    - MAX TOTAL LOSS = 10% of starting balance  
-    - PROFIT TARGET = +10% of starting balance
+    Evaluate challenge status against the challenge's own thresholds:
+    - PROFIT TARGET = profit_target above the starting balance
+    - MAX TOTAL LOSS = max_total_loss below the starting balance
+    - MAX DAILY LOSS = max_daily_loss lost today
+    - MAX TRAILING DRAWDOWN = max_trailing_drawdown below the equity peak (if set)
     
     Args:
         challenge_id (int): Challenge ID to evaluate
@@ -28,8 +168,33 @@ def evaluate_challenge(challenge_id):
             'error': 'Challenge not found'
         }
     
+    previous_status = challenge.status
+    daily_pnl = calculate_daily_pnl(challenge_id, challenge.trading_calendar)
+    evaluation = apply_rules(challenge, daily_pnl, current_drawdown(challenge))
+    
+    if challenge.status != previous_status:
+        db.session.commit()
+    
+    return evaluation
+
+
+def apply_rules(challenge, daily_pnl, drawdown=0.0):
+    """
+    Apply the challenge rules to data already loaded, without queries or commit
+    
+    The status transition is only set on the challenge object, the caller
+    commits it together with whatever caused the evaluation (e.g. the trade).
+    
+    Args:
+        challenge (UserChallenge): Challenge with an up to date balance
+        daily_pnl (float): Today's P&L including the latest trades
+        drawdown (float): Drawdown from the equity peak (see current_drawdown)
+        
+    Returns:
+        dict: Challenge evaluation result with status and metrics
+    """
     # Skip if already finalized
-    if challenge.status in ['PASSED', 'FAILED']:
+    if challenge.status in FINAL_STATUSES:
         return {
             'success': True,
             'status': challenge.status,
@@ -37,59 +202,67 @@ def evaluate_challenge(challenge_id):
             'message': f'Challenge already {challenge.status}'
         }
     
-    starting_balance = challenge.initial_balance
     current_balance = challenge.current_balance
+    broken = compile_rules(challenge).check(current_balance, daily_pnl, drawdown)
     
-    # Calculate total profit/loss
+    starting_balance = challenge.initial_balance
     total_pnl = current_balance - starting_balance
     total_pnl_pct = (total_pnl / starting_balance) * 100
     
-    # Check Rule 1: PROFIT TARGET (+10%)
-    if total_pnl_pct >= 10.0:
+    if broken is not None:
+        # Finalized challenges are never evaluated again
+        _compiled_rules.pop(challenge.id, None)
+    
+    # Check Rule 1: PROFIT TARGET
+    if broken == 'PASSED':
         challenge.status = 'PASSED'
-        db.session.commit()
         return {
             'success': True,
             'status': 'PASSED',
             'balance': current_balance,
             'total_pnl': round(total_pnl, 2),
             'total_pnl_pct': round(total_pnl_pct, 2),
-            'message': 'Profit target reached! Challenge PASSED'
+            'message': f'Profit target ({challenge.profit_target:g}) reached! Challenge PASSED'
         }
     
-    # Check Rule 2: MAX TOTAL LOSS (10%)
-    if total_pnl <= -(starting_balance * 0.10):
+    # Check Rule 2: MAX TOTAL LOSS
+    if broken == 'FAILED_TOTAL':
         challenge.status = 'FAILED'
-        db.session.commit()
         return {
             'success': True,
             'status': 'FAILED',
             'balance': current_balance,
             'total_pnl': round(total_pnl, 2),
             'total_pnl_pct': round(total_pnl_pct, 2),
-            'message': 'Max total loss (10%) exceeded. Challenge FAILED'
+            'message': f'Max total loss ({challenge.max_total_loss:g}) exceeded. Challenge FAILED'
         }
     
-    # Check Rule 3: MAX DAILY LOSS (5%)
-    daily_pnl = calculate_daily_pnl(challenge_id)
-    max_daily_loss = starting_balance * 0.05
+    daily_pnl_pct = (daily_pnl / starting_balance) * 100
     
-    if daily_pnl <= -max_daily_loss:
+    # Check Rule 3: MAX DAILY LOSS
+    if broken == 'FAILED_DAILY':
         challenge.status = 'FAILED'
-        db.session.commit()
-        daily_pnl_pct = (daily_pnl / starting_balance) * 100
         return {
             'success': True,
             'status': 'FAILED',
             'balance': current_balance,
             'daily_pnl': round(daily_pnl, 2),
             'daily_pnl_pct': round(daily_pnl_pct, 2),
-            'message': 'Max daily loss (5%) exceeded. Challenge FAILED'
+            'message': f'Max daily loss ({challenge.max_daily_loss:g}) exceeded. Challenge FAILED'
         }
     
-    # Challenge still ACTIVE
-    daily_pnl_pct = (daily_pnl / starting_balance) * 100
+    # Check Rule 4: MAX TRAILING DRAWDOWN
+    if broken == 'FAILED_TRAILING':
+        challenge.status = 'FAILED'
+        return {
+            'success': True,
+            'status': 'FAILED',
+            'balance': current_balance,
+            'drawdown': round(drawdown, 2),
+            'message': f'Max trailing drawdown ({challenge.max_trailing_drawdown:g}) from the equity peak exceeded. Challenge FAILED'
+        }
     
+    # Challenge still ACTIVE
     return {
         'success': True,
         'status': 'ACTIVE',
@@ -102,31 +275,20 @@ def evaluate_challenge(challenge_id):
     }
 
 
-def calculate_daily_pnl(challenge_id):
+def calculate_daily_pnl(challenge_id, calendar=None):
     """
-    Calculate profit/loss for today's trades only
-    Daily loss resets every new day (uses UTC timestamps)
+    Calculate profit/loss for the current trading day's trades only
+    Daily loss resets when the challenge's trading calendar starts a new day
     
     Args:
         challenge_id (int): Challenge ID
+        calendar (str, optional): Challenge's trading_calendar, the default (UTC days) if None
         
     Returns:
-        float: Total P&L for today
+        float: Total P&L for the current trading day
     """
-    # Get start of today (UTC)
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # Get all trades from today
-    today_trades = Trade.query.filter(
-        Trade.challenge_id == challenge_id,
-        Trade.created_at >= today_start
-    ).all()
-    
-    if not today_trades:
-        return 0.0
-    
-    # Sum up profit/loss from today's trades
-    daily_pnl = sum(trade.profit_loss for trade in today_trades)
+    # The day's bucket is kept up to date by every trade, a missing row means no trades yet today
+    daily_pnl, _ = DailyPnlService.get(challenge_id, calendar=calendar)
     
     return daily_pnl
 
@@ -146,26 +308,45 @@ def get_challenge_metrics(challenge_id):
     if not challenge:
         return None
     
+    account = PositionService.account_state(challenge)
+    return build_metrics(challenge, calculate_daily_pnl(challenge_id, challenge.trading_calendar), account)
+
+
+def build_metrics(challenge, daily_pnl, account=None):
+    """
+    Build the metrics payload from data already loaded
+    
+    Args:
+        challenge (UserChallenge): Challenge
+        daily_pnl (float): Today's P&L
+        account (dict, optional): Mark-to-market account state for the equity section
+        
+    Returns:
+        dict: Detailed metrics
+    """
     starting_balance = challenge.initial_balance
     current_balance = challenge.current_balance
     total_pnl = current_balance - starting_balance
     total_pnl_pct = (total_pnl / starting_balance) * 100
     
-    daily_pnl = calculate_daily_pnl(challenge_id)
     daily_pnl_pct = (daily_pnl / starting_balance) * 100
     
-    # Calculate remaining allowances
-    max_total_loss_amount = starting_balance * 0.10
+    # Calculate remaining allowances from the challenge's own thresholds
+    max_total_loss_amount = challenge.max_total_loss
     remaining_total_loss = max_total_loss_amount + total_pnl
     
-    max_daily_loss_amount = starting_balance * 0.05
+    max_daily_loss_amount = challenge.max_daily_loss
     remaining_daily_loss = max_daily_loss_amount + daily_pnl
     
-    profit_target_amount = starting_balance * 0.10
+    profit_target_amount = challenge.profit_target
     remaining_to_target = profit_target_amount - total_pnl
     
-    return {
-        'challenge_id': challenge_id,
+    # The daily figures are for the current trading day of the challenge's calendar
+    calendar = get_calendar(challenge.trading_calendar)
+    trading_day = calendar.trading_day()
+    
+    metrics = {
+        'challenge_id': challenge.id,
         'status': challenge.status,
         'balance': {
             'starting': starting_balance,
@@ -181,7 +362,10 @@ def get_challenge_metrics(challenge_id):
             'pnl': round(daily_pnl, 2),
             'pnl_pct': round(daily_pnl_pct, 2),
             'max_loss_allowed': max_daily_loss_amount,
-            'remaining_loss_buffer': round(remaining_daily_loss, 2)
+            'remaining_loss_buffer': round(remaining_daily_loss, 2),
+            'calendar': calendar.name,
+            'trading_day': trading_day.isoformat(),
+            'resets_at': calendar.day_bounds(trading_day)[1].isoformat()
         },
         'target': {
             'profit_needed': round(remaining_to_target, 2),
@@ -189,3 +373,24 @@ def get_challenge_metrics(challenge_id):
             'progress_pct': round((total_pnl / profit_target_amount) * 100, 2) if profit_target_amount > 0 else 0
         }
     }
+    
+    if account is not None:
+        metrics['equity'] = {
+            'equity': account['equity'],
+            'market_value': account['market_value'],
+            'exposure': account['exposure'],
+            'unrealized_pnl': account['unrealized_pnl'],
+            'realized_pnl': account['realized_pnl']
+        }
+        
+        max_drawdown = challenge.max_trailing_drawdown
+        metrics['drawdown'] = {
+            'high_water_mark': account['high_water_mark'],
+            'day_peak': account['day_peak'],
+            'drawdown': account['drawdown'],
+            'intraday_drawdown': account['intraday_drawdown'],
+            'max_trailing_drawdown': max_drawdown,
+            'remaining_drawdown_buffer': round(max_drawdown - account['drawdown'], 2) if max_drawdown is not None else None
+        }
+    
+    return metrics
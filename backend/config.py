@@ -18,4 +18,26 @@ class Config:
     # PayPal Configuration
     PAYPAL_CLIENT_ID = os.environ.get('PAYPAL_CLIENT_ID', 'sb')
     PAYPAL_CLIENT_SECRET = os.environ.get('PAYPAL_CLIENT_SECRET', 'your-fake-paypal-secret')
-    PAYPAL_MODE = os.environ.get('PAYPAL_MODE', 'sandbox')
\ No newline at end of file
+    PAYPAL_MODE = os.environ.get('PAYPAL_MODE', 'sandbox')
+    
+    # Response serialization: 'orjson' (falls back to 'stdlib' if not installed)
+    JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'orjson')
+    
+    # Gzip/Brotli compression for responses larger than COMPRESS_MIN_SIZE bytes
+    # (Brotli quality 4 is both smaller and faster than gzip level 6 on trade lists)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    
+    # WebSocket market data gateway (ws_gateway.py)
+    WS_GATEWAY_PORT = int(os.environ.get('WS_GATEWAY_PORT', 5001))
+    WS_GATEWAY_POLL_INTERVAL = float(os.environ.get('WS_GATEWAY_POLL_INTERVAL', 10))
+    
+    # Group commit of market orders (services/trade_journal.py): orders arriving
+    # within the window share one transaction and one log flush
+    TRADE_GROUP_COMMIT = os.environ.get('TRADE_GROUP_COMMIT', '1') == '1'
+    TRADE_GROUP_COMMIT_WINDOW_MS = float(os.environ.get('TRADE_GROUP_COMMIT_WINDOW_MS', 2))
+    
+    # Background pass evaluating every ACTIVE challenge in one UPDATE
+    # (services/challenge_sweeper.py), in seconds; 0 disables it
+    CHALLENGE_SWEEP_INTERVAL = float(os.environ.get('CHALLENGE_SWEEP_INTERVAL', 60))
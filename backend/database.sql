@@ -32,10 +32,19 @@ CREATE TABLE user_challenges (
     profit_target DECIMAL(15, 2) NOT NULL,
     max_daily_loss DECIMAL(15, 2) NOT NULL,
     max_total_loss DECIMAL(15, 2) NOT NULL,
+    trading_calendar VARCHAR(20) NOT NULL DEFAULT 'UTC', -- 'UTC', 'CRYPTO', 'US', 'MOROCCO': day boundaries of the daily limits
+    max_trailing_drawdown DECIMAL(15, 2), -- from the equity peak, NULL disables the rule
+    high_water_mark DECIMAL(15, 2), -- highest equity reached
+    day_peak_equity DECIMAL(15, 2), -- highest equity on day_peak_date (trading day)
+    day_peak_date DATE,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
+-- Existing databases: ALTER TABLE user_challenges ADD COLUMN max_trailing_drawdown DECIMAL(15, 2),
+--   ADD COLUMN high_water_mark DECIMAL(15, 2), ADD COLUMN day_peak_equity DECIMAL(15, 2), ADD COLUMN day_peak_date DATE;
+-- Existing databases: ALTER TABLE user_challenges ADD COLUMN trading_calendar VARCHAR(20) NOT NULL DEFAULT 'UTC';
+-- Existing databases: run normalize_challenge_statuses.py once ('active' -> 'ACTIVE', 'funded' -> 'PASSED', ...)
 
 -- Indexes for user_challenges table
 CREATE INDEX idx_user_challenges_user_id ON user_challenges(user_id);
@@ -54,6 +63,8 @@ CREATE TABLE trades (
     entry_price DECIMAL(15, 8) NOT NULL,
     exit_price DECIMAL(15, 8),
     profit_loss DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    stop_loss DECIMAL(15, 8), -- protective levels, open BUY trades only
+    take_profit DECIMAL(15, 8),
     status VARCHAR(20) NOT NULL DEFAULT 'open', -- 'open', 'closed'
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -61,13 +72,73 @@ CREATE TABLE trades (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
--- Indexes for trades table
-CREATE INDEX idx_trades_challenge_id ON trades(challenge_id);
-CREATE INDEX idx_trades_user_id ON trades(user_id);
+-- Indexes for trades table (composites match the hot queries, see backend/test_query_plans.py;
+-- their leading columns also serve the challenge_id / user_id foreign keys)
 CREATE INDEX idx_trades_symbol ON trades(symbol);
 CREATE INDEX idx_trades_status ON trades(status);
 CREATE INDEX idx_trades_created_at ON trades(created_at);
-CREATE INDEX idx_trades_challenge_status ON trades(challenge_id, status);
+CREATE INDEX idx_trades_challenge_created ON trades(challenge_id, created_at, id);
+CREATE INDEX idx_trades_challenge_status_created ON trades(challenge_id, status, created_at);
+CREATE INDEX idx_trades_user_created ON trades(user_id, created_at, id);
+CREATE INDEX idx_trades_user_stats ON trades(user_id, challenge_id, status, profit_loss);
+
+-- Existing databases: ALTER TABLE trades ADD COLUMN stop_loss DECIMAL(15, 8), ADD COLUMN take_profit DECIMAL(15, 8);
+-- then create the composites above and drop idx_trades_challenge_id, idx_trades_user_id
+-- and idx_trades_challenge_status, which they make redundant
+
+-- Daily P&L table (one row per challenge and trading day of its calendar, updated with every trade)
+CREATE TABLE daily_pnl (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    challenge_id INTEGER NOT NULL,
+    trade_date DATE NOT NULL,
+    pnl DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    closed_pnl DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (challenge_id, trade_date),
+    FOREIGN KEY (challenge_id) REFERENCES user_challenges(id) ON DELETE CASCADE
+);
+-- Existing databases: create the table, then run rebuild_daily_pnl.py once
+
+-- Positions table (net position per challenge and symbol)
+CREATE TABLE positions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    challenge_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    quantity DECIMAL(15, 8) NOT NULL DEFAULT 0,
+    average_cost DECIMAL(15, 8) NOT NULL DEFAULT 0,
+    realized_pnl DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    last_price DECIMAL(15, 8) NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (challenge_id, symbol),
+    FOREIGN KEY (challenge_id) REFERENCES user_challenges(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Indexes for positions table
+CREATE INDEX idx_positions_user_id ON positions(user_id);
+
+-- Orders table (resting limit and stop orders)
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    challenge_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    side VARCHAR(4) NOT NULL, -- 'BUY', 'SELL'
+    order_type VARCHAR(10) NOT NULL, -- 'LIMIT', 'STOP'
+    quantity DECIMAL(15, 8) NOT NULL,
+    price DECIMAL(15, 8) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'open', -- 'open', 'filled', 'cancelled', 'rejected'
+    fill_price DECIMAL(15, 8),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    filled_at DATETIME,
+    FOREIGN KEY (challenge_id) REFERENCES user_challenges(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Indexes for orders table
+CREATE INDEX idx_orders_challenge_id ON orders(challenge_id);
+CREATE INDEX idx_orders_status ON orders(status);
 
 -- Payments table
 CREATE TABLE payments (
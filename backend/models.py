@@ -38,7 +38,7 @@ class User(db.Model):
             'full_name': self.full_name,
             'is_admin': self.is_admin,
             'is_superadmin': self.is_superadmin,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -58,10 +58,18 @@ class UserChallenge(db.Model):
     profit_target = db.Column(db.Float, nullable=False)
     max_daily_loss = db.Column(db.Float, nullable=False)
     max_total_loss = db.Column(db.Float, nullable=False)
+    trading_calendar = db.Column(db.String(20), nullable=False, default='UTC')  # day boundaries of the daily limits
+    max_trailing_drawdown = db.Column(db.Float, nullable=True)  # from the equity peak, NULL disables the rule
+    high_water_mark = db.Column(db.Float, nullable=True)  # highest equity reached
+    day_peak_equity = db.Column(db.Float, nullable=True)  # highest equity on day_peak_date (trading day)
+    day_peak_date = db.Column(db.Date, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     trades = db.relationship('Trade', backref='challenge', lazy=True, cascade='all, delete-orphan')
+    positions = db.relationship('Position', backref='challenge', lazy=True, cascade='all, delete-orphan')
+    daily_pnl = db.relationship('DailyPnl', backref='challenge', lazy=True, cascade='all, delete-orphan')
+    orders = db.relationship('Order', backref='challenge', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         """Convert challenge object to dictionary"""
@@ -75,7 +83,10 @@ class UserChallenge(db.Model):
             'profit_target': self.profit_target,
             'max_daily_loss': self.max_daily_loss,
             'max_total_loss': self.max_total_loss,
-            'created_at': self.created_at.isoformat()
+            'trading_calendar': self.trading_calendar,
+            'max_trailing_drawdown': self.max_trailing_drawdown,
+            'high_water_mark': self.high_water_mark,
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -85,6 +96,16 @@ class UserChallenge(db.Model):
 class Trade(db.Model):
     """Trade model for recording user trades"""
     __tablename__ = 'trades'
+    __table_args__ = (
+        # Daily P&L sums and challenge history pages: challenge_id = ? AND created_at >= ?
+        db.Index('idx_trades_challenge_created', 'challenge_id', 'created_at', 'id'),
+        # Daily loss check and filtered challenge history: challenge_id = ? AND status = ?
+        db.Index('idx_trades_challenge_status_created', 'challenge_id', 'status', 'created_at'),
+        # User history pages and statistics: user_id = ? ORDER BY created_at, id
+        db.Index('idx_trades_user_created', 'user_id', 'created_at', 'id'),
+        # Covers the statistics aggregate, which never reads the table rows
+        db.Index('idx_trades_user_stats', 'user_id', 'challenge_id', 'status', 'profit_loss'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False)
@@ -95,6 +116,8 @@ class Trade(db.Model):
     entry_price = db.Column(db.Float, nullable=False)
     exit_price = db.Column(db.Float, nullable=True)
     profit_loss = db.Column(db.Float, default=0.0)
+    stop_loss = db.Column(db.Float, nullable=True)  # close when the price falls to this level
+    take_profit = db.Column(db.Float, nullable=True)  # close when the price rises to this level
     status = db.Column(db.String(20), default='open')  # open, closed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -110,14 +133,119 @@ class Trade(db.Model):
             'entry_price': self.entry_price,
             'exit_price': self.exit_price,
             'profit_loss': self.profit_loss,
+            'stop_loss': self.stop_loss,
+            'take_profit': self.take_profit,
             'status': self.status,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
     
     def __repr__(self):
         return f'<Trade {self.id} - {self.symbol}>'
 
 
+class DailyPnl(db.Model):
+    """Running P&L of one challenge for one trading day of its calendar, updated with every trade"""
+    __tablename__ = 'daily_pnl'
+    __table_args__ = (
+        db.UniqueConstraint('challenge_id', 'trade_date', name='uq_daily_pnl_challenge_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False)
+    trade_date = db.Column(db.Date, nullable=False)  # trading day of the trades' created_at in the challenge's calendar
+    pnl = db.Column(db.Float, nullable=False, default=0.0)  # all trades of the day
+    closed_pnl = db.Column(db.Float, nullable=False, default=0.0)  # closed trades only
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert daily P&L object to dictionary"""
+        return {
+            'challenge_id': self.challenge_id,
+            'trade_date': self.trade_date.isoformat(),
+            'pnl': round(self.pnl, 2),
+            'closed_pnl': round(self.closed_pnl, 2),
+            'updated_at': self.updated_at
+        }
+    
+    def __repr__(self):
+        return f'<DailyPnl {self.challenge_id} {self.trade_date}: {self.pnl}>'
+
+
+class Position(db.Model):
+    """Net position per challenge and symbol, maintained on every fill"""
+    __tablename__ = 'positions'
+    __table_args__ = (
+        db.UniqueConstraint('challenge_id', 'symbol', name='uq_positions_challenge_symbol'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    symbol = db.Column(db.String(20), nullable=False)
+    quantity = db.Column(db.Float, nullable=False, default=0.0)  # signed, negative when short
+    average_cost = db.Column(db.Float, nullable=False, default=0.0)
+    realized_pnl = db.Column(db.Float, nullable=False, default=0.0)
+    last_price = db.Column(db.Float, nullable=False, default=0.0)  # last fill, used as mark
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert position object to dictionary"""
+        market_value = self.quantity * self.last_price
+        return {
+            'id': self.id,
+            'challenge_id': self.challenge_id,
+            'symbol': self.symbol,
+            'quantity': self.quantity,
+            'average_cost': self.average_cost,
+            'last_price': self.last_price,
+            'market_value': round(market_value, 2),
+            'unrealized_pnl': round(self.quantity * (self.last_price - self.average_cost), 2),
+            'realized_pnl': round(self.realized_pnl, 2),
+            'updated_at': self.updated_at
+        }
+    
+    def __repr__(self):
+        return f'<Position {self.challenge_id} - {self.symbol} {self.quantity}>'
+
+
+class Order(db.Model):
+    """Resting limit or stop order, filled by the order engine when its price is crossed"""
+    __tablename__ = 'orders'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    symbol = db.Column(db.String(20), nullable=False)
+    side = db.Column(db.String(4), nullable=False)  # BUY, SELL
+    order_type = db.Column(db.String(10), nullable=False)  # LIMIT, STOP
+    quantity = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False)  # limit or stop price
+    status = db.Column(db.String(20), default='open', index=True)  # open, filled, cancelled, rejected
+    fill_price = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    filled_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        """Convert order object to dictionary"""
+        return {
+            'id': self.id,
+            'challenge_id': self.challenge_id,
+            'user_id': self.user_id,
+            'symbol': self.symbol,
+            'side': self.side,
+            'order_type': self.order_type,
+            'quantity': self.quantity,
+            'price': self.price,
+            'status': self.status,
+            'fill_price': self.fill_price,
+            'created_at': self.created_at,
+            'filled_at': self.filled_at
+        }
+    
+    def __repr__(self):
+        return f'<Order {self.id} - {self.order_type} {self.side} {self.symbol} @ {self.price}>'
+
+
 class Payment(db.Model):
     """Payment model for tracking user payments"""
     __tablename__ = 'payments'
@@ -147,7 +275,7 @@ class Payment(db.Model):
             'transaction_id': self.transaction_id,
             'paypal_order_id': self.paypal_order_id,
             'paypal_payer_id': self.paypal_payer_id,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
     
     def __repr__(self):
@@ -173,7 +301,7 @@ class PayPalSettings(db.Model):
             'mode': self.mode,
             'client_id': self.client_id,
             'is_active': self.is_active,
-            'updated_at': self.updated_at.isoformat()
+            'updated_at': self.updated_at
         }
         if include_secret:
             data['client_secret'] = self.client_secret
@@ -0,0 +1,27 @@
+from sqlalchemy import case, update
+from app import app
+from models import db, UserChallenge
+
+LEGACY_STATUSES = {
+    'active': 'ACTIVE',
+    'passed': 'PASSED',
+    'funded': 'PASSED',
+    'failed': 'FAILED',
+    'completed': 'COMPLETED',
+}
+
+def normalize_challenge_statuses():
+    with app.app_context():
+        # Convertir les anciens statuts en minuscules vers ACTIVE / PASSED / FAILED / COMPLETED
+        count = db.session.execute(
+            update(UserChallenge)
+            .where(UserChallenge.status.in_(list(LEGACY_STATUSES)))
+            .values(status=case(LEGACY_STATUSES, value=UserChallenge.status))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        
+        print(f"{count} challenge(s) normalisé(s)")
+
+if __name__ == '__main__':
+    normalize_challenge_statuses()
@@ -0,0 +1,17 @@
+from app import app
+from models import UserChallenge
+from services.daily_pnl_service import DailyPnlService
+
+def rebuild_daily_pnl():
+    with app.app_context():
+        # Recalculer une seule fois le P&L journalier de chaque challenge depuis l'historique
+        challenges = UserChallenge.query.all()
+        
+        for challenge in challenges:
+            count = DailyPnlService.rebuild(challenge)
+            print(f"Challenge {challenge.id}: {count} jour(s) reconstruit(s)")
+        
+        print("P&L journalier reconstruit avec succès!")
+
+if __name__ == '__main__':
+    rebuild_daily_pnl()
@@ -0,0 +1,17 @@
+from app import app
+from models import UserChallenge
+from services.position_service import PositionService
+
+def rebuild_positions():
+    with app.app_context():
+        # Rejouer l'historique des trades une seule fois pour chaque challenge
+        challenges = UserChallenge.query.all()
+        
+        for challenge in challenges:
+            count = PositionService.rebuild(challenge)
+            print(f"Challenge {challenge.id}: {count} position(s) reconstruite(s)")
+        
+        print("Positions reconstruites avec succès!")
+
+if __name__ == '__main__':
+    rebuild_positions()
@@ -3,6 +3,8 @@
 from flask import Blueprint, request, jsonify
 from routes.auth import jwt_required, superadmin_required
 from models import db, User, UserChallenge, PayPalSettings
+from services.challenge_sweeper import challenge_sweeper
+from services.rule_queue import rule_queue
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -141,6 +143,10 @@ def update_challenge_status(user, challenge_id):
         
         db.session.commit()
         
+        # An admin may reactivate a final challenge, the cached status must not block it
+        rule_queue.forget(challenge.id)
+        rule_queue.remember(challenge)
+        
         return jsonify({
             'message': f'Challenge status updated from {old_status} to {status}',
             'challenge': challenge.to_dict()
@@ -151,6 +157,57 @@ def update_challenge_status(user, challenge_id):
         return jsonify({'error': f'Failed to update challenge status: {str(e)}'}), 500
 
 
+@admin_bp.route('/challenges/sweep', methods=['POST'])
+@superadmin_required()
+def sweep_challenges(user):
+    """
+    Evaluate every ACTIVE challenge now instead of waiting for the next scheduled pass
+    POST /api/admin/challenges/sweep
+    Headers: Authorization: Bearer <admin_token>
+    """
+    try:
+        report = challenge_sweeper.sweep()
+        
+        return jsonify({
+            'sweep': report,
+            'interval': challenge_sweeper.interval
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to sweep challenges: {str(e)}'}), 500
+
+
+@admin_bp.route('/challenges/what-if', methods=['POST'])
+@superadmin_required()
+def challenges_what_if(user):
+    """
+    Preview how ACTIVE challenges would stand under other thresholds, without changing them
+    POST /api/admin/challenges/what-if
+    Headers: Authorization: Bearer <admin_token>
+    Body: {"profit_target_pct": 8, "max_daily_loss_pct": 4, "max_total_loss_pct": 8} (each optional,
+          percentages of the starting balance; a missing one keeps each challenge's own threshold)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        thresholds = {}
+        for field in ('profit_target_pct', 'max_daily_loss_pct', 'max_total_loss_pct'):
+            value = data.get(field)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                return jsonify({'error': f'{field} must be a positive number'}), 400
+            thresholds[field] = float(value)
+        
+        return jsonify({
+            'what_if': challenge_sweeper.what_if(**thresholds),
+            'thresholds': thresholds
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to evaluate challenges: {str(e)}'}), 500
+
+
 @admin_bp.route('/paypal/credentials', methods=['POST'])
 @superadmin_required()
 def update_paypal_credentials(user):
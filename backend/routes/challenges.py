@@ -4,6 +4,8 @@ from flask import Blueprint, request, jsonify
 from routes.auth import jwt_required
 from services.challenge_service import ChallengeService
 from services.challenge_monitor import check_challenge_rules
+from services.http_cache import content_etag, not_modified, cacheable
+from services.trading_calendar import DEFAULT_CALENDAR, MARKETS
 from models import db
 
 challenges_bp = Blueprint('challenges', __name__, url_prefix='/api/challenges')
@@ -66,7 +68,10 @@ def create_challenge(user):
     Create a new challenge
     POST /api/challenges/create
     Headers: Authorization: Bearer <token>
-    Body: {"plan_type": "starter|pro|elite"}
+    Body: {"plan_type": "starter|pro|elite", "trading_calendar": "UTC|CRYPTO|US|MOROCCO" (optional, UTC by default)}
+    
+    The trading calendar sets when the daily loss resets: UTC midnight,
+    17:00 New York time for US sessions, Casablanca midnight for MOROCCO.
     """
     try:
         data = request.get_json()
@@ -81,6 +86,10 @@ def create_challenge(user):
         if plan_type not in CHALLENGE_PLANS:
             return jsonify({'error': f'Invalid plan type. Must be one of: starter, pro, elite'}), 400
         
+        trading_calendar = str(data.get('trading_calendar') or DEFAULT_CALENDAR).upper()
+        if trading_calendar not in MARKETS:
+            return jsonify({'error': f'Invalid trading calendar. Must be one of: {", ".join(MARKETS)}'}), 400
+        
         # Get plan configuration
         plan_config = CHALLENGE_PLANS[plan_type]
         
@@ -91,7 +100,8 @@ def create_challenge(user):
             initial_balance=plan_config['initial_balance'],
             profit_target=plan_config['profit_target'],
             max_daily_loss=plan_config['max_daily_loss'],
-            max_total_loss=plan_config['max_total_loss']
+            max_total_loss=plan_config['max_total_loss'],
+            trading_calendar=trading_calendar
         )
         
         if error:
@@ -148,7 +158,7 @@ def update_challenge_status(user, challenge_id):
     Update challenge status
     PUT /api/challenges/<id>/status
     Headers: Authorization: Bearer <token>
-    Body: {"status": "active|passed|failed|completed"}
+    Body: {"status": "ACTIVE|COMPLETED"}
     """
     try:
         data = request.get_json()
@@ -183,27 +193,46 @@ def update_challenge_status(user, challenge_id):
         return jsonify({'error': f'Failed to update challenge: {str(e)}'}), 500
 
 
+# Plans only change with a deploy, let clients and proxies keep them for an hour
+PLANS_MAX_AGE = 3600
+
+
+def _build_plans():
+    """Public description of every challenge plan"""
+    plans = []
+    for plan_name, config in CHALLENGE_PLANS.items():
+        plans.append({
+            'name': plan_name,
+            'initial_balance': config['initial_balance'],
+            'profit_target': config['profit_target'],
+            'profit_target_percentage': 10,
+            'max_daily_loss': config['max_daily_loss'],
+            'max_daily_loss_percentage': 5,
+            'max_total_loss': config['max_total_loss'],
+            'max_total_loss_percentage': 10
+        })
+    return plans
+
+
+PLANS_ETAG = content_etag(_build_plans())
+
+
 @challenges_bp.route('/plans', methods=['GET'])
 def get_challenge_plans():
     """
     Get available challenge plans (no auth required)
     GET /api/challenges/plans
+    
+    Served with a strong ETag of the plan configuration, If-None-Match gets
+    304 Not Modified.
     """
     try:
-        plans = []
-        for plan_name, config in CHALLENGE_PLANS.items():
-            plans.append({
-                'name': plan_name,
-                'initial_balance': config['initial_balance'],
-                'profit_target': config['profit_target'],
-                'profit_target_percentage': 10,
-                'max_daily_loss': config['max_daily_loss'],
-                'max_daily_loss_percentage': 5,
-                'max_total_loss': config['max_total_loss'],
-                'max_total_loss_percentage': 10
-            })
-        
-        return jsonify({'plans': plans}), 200
+        unchanged = not_modified(PLANS_ETAG, PLANS_MAX_AGE)
+        if unchanged is not None:
+            return unchanged
+        
+        response = jsonify({'plans': _build_plans()})
+        return cacheable(response, PLANS_ETAG, PLANS_MAX_AGE), 200
     
     except Exception as e:
         return jsonify({'error': f'Failed to get plans: {str(e)}'}), 500
@@ -1,82 +1,132 @@
 """Leaderboard routes"""
 
+import threading
+import time
+from datetime import datetime
 from flask import Blueprint, jsonify
 from models import UserChallenge, User
 from sqlalchemy import desc
+from services.http_cache import content_etag, not_modified, cacheable
 
 leaderboard_bp = Blueprint('leaderboard', __name__, url_prefix='/api/leaderboard')
 
+# The ranking is rebuilt at most once per TTL, matching the frontend refresh rate
+LEADERBOARD_TTL = 30
+
+_leaderboard_cache = {'payload': None, 'etag': None, 'built_at': None, 'expires_at': 0.0}
+_leaderboard_lock = threading.Lock()
+
+
+def _get_cached_leaderboard():
+    """
+    Get the leaderboard payload, rebuilding it when the cached one expired
+    
+    Returns:
+        dict: {"payload", "etag", "built_at", "expires_at"}
+    """
+    with _leaderboard_lock:
+        if time.time() >= _leaderboard_cache['expires_at']:
+            payload = _build_leaderboard()
+            _leaderboard_cache.update({
+                'payload': payload,
+                'etag': content_etag(payload),
+                'built_at': datetime.utcnow(),
+                'expires_at': time.time() + LEADERBOARD_TTL
+            })
+        return dict(_leaderboard_cache)
+
 
 @leaderboard_bp.route('', methods=['GET'])
 def get_leaderboard():
     """
     Get top 10 traders by profit percentage
     GET /api/leaderboard
+    
+    The ranking is cached for LEADERBOARD_TTL seconds and served with a strong
+    ETag of its content, If-None-Match gets 304 Not Modified.
     """
     try:
-        # Get all active or funded challenges
-        challenges = UserChallenge.query.filter(
-            UserChallenge.status.in_(['active', 'funded'])
-        ).all()
+        cached = _get_cached_leaderboard()
+        max_age = max(int(cached['expires_at'] - time.time()), 0)
         
-        # Calculate profit percentage for each challenge
-        leaderboard_data = []
+        unchanged = not_modified(cached['etag'], max_age)
+        if unchanged is not None:
+            return unchanged
         
-        for challenge in challenges:
-            # Get user info
-            user = User.query.get(challenge.user_id)
-            if not user:
-                continue
-            
-            # Calculate profit/loss percentage
-            profit_loss = challenge.current_balance - challenge.initial_balance
-            profit_percentage = (profit_loss / challenge.initial_balance) * 100
-            
-            # Calculate win rate
-            total_trades = len(challenge.trades)
-            closed_trades = [t for t in challenge.trades if t.status == 'closed']
-            winning_trades = [t for t in closed_trades if t.profit_loss > 0]
-            win_rate = (len(winning_trades) / len(closed_trades) * 100) if closed_trades else 0
-            
-            leaderboard_data.append({
-                'rank': 0,  # Will be set after sorting
-                'user': {
-                    'id': user.id,
-                    'full_name': user.full_name,
-                    'email': user.email
-                },
-                'challenge': {
-                    'id': challenge.id,
-                    'plan_type': challenge.plan_type,
-                    'status': challenge.status,
-                    'initial_balance': challenge.initial_balance,
-                    'current_balance': challenge.current_balance,
-                    'created_at': challenge.created_at.isoformat()
-                },
-                'performance': {
-                    'profit_loss': round(profit_loss, 2),
-                    'profit_percentage': round(profit_percentage, 2),
-                    'total_trades': total_trades,
-                    'winning_trades': len(winning_trades),
-                    'win_rate': round(win_rate, 2)
-                }
-            })
+        response = jsonify(cached['payload'])
+        return cacheable(response, cached['etag'], max_age, last_modified=cached['built_at']), 200
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to get leaderboard: {str(e)}'}), 500
+
+
+def _build_leaderboard():
+    """
+    Rank active or passed challenges by profit percentage
+    
+    Returns:
+        dict: {"leaderboard": top 10 entries, "total_traders": int}
+    """
+    # Get all active or passed challenges
+    challenges = UserChallenge.query.filter(
+        UserChallenge.status.in_(['ACTIVE', 'PASSED'])
+    ).all()
+    
+    # Calculate profit percentage for each challenge
+    leaderboard_data = []
+    
+    for challenge in challenges:
+        # Get user info
+        user = User.query.get(challenge.user_id)
+        if not user:
+            continue
         
-        # Sort by profit percentage (descending) and get top 10
-        leaderboard_data.sort(key=lambda x: x['performance']['profit_percentage'], reverse=True)
-        top_10 = leaderboard_data[:10]
+        # Calculate profit/loss percentage
+        profit_loss = challenge.current_balance - challenge.initial_balance
+        profit_percentage = (profit_loss / challenge.initial_balance) * 100
         
-        # Assign ranks
-        for i, entry in enumerate(top_10, start=1):
-            entry['rank'] = i
+        # Calculate win rate
+        total_trades = len(challenge.trades)
+        closed_trades = [t for t in challenge.trades if t.status == 'closed']
+        winning_trades = [t for t in closed_trades if t.profit_loss > 0]
+        win_rate = (len(winning_trades) / len(closed_trades) * 100) if closed_trades else 0
         
-        return jsonify({
-            'leaderboard': top_10,
-            'total_traders': len(leaderboard_data)
-        }), 200
+        leaderboard_data.append({
+            'rank': 0,  # Will be set after sorting
+            'user': {
+                'id': user.id,
+                'full_name': user.full_name,
+                'email': user.email
+            },
+            'challenge': {
+                'id': challenge.id,
+                'plan_type': challenge.plan_type,
+                'status': challenge.status,
+                'initial_balance': challenge.initial_balance,
+                'current_balance': challenge.current_balance,
+                'created_at': challenge.created_at
+            },
+            'performance': {
+                'profit_loss': round(profit_loss, 2),
+                'profit_percentage': round(profit_percentage, 2),
+                'total_trades': total_trades,
+                'winning_trades': len(winning_trades),
+                'win_rate': round(win_rate, 2)
+            }
+        })
     
-    except Exception as e:
-        return jsonify({'error': f'Failed to get leaderboard: {str(e)}'}), 500
+    # Sort by profit percentage (descending) and get top 10
+    leaderboard_data.sort(key=lambda x: x['performance']['profit_percentage'], reverse=True)
+    top_10 = leaderboard_data[:10]
+    
+    # Assign ranks
+    for i, entry in enumerate(top_10, start=1):
+        entry['rank'] = i
+    
+    return {
+        'leaderboard': top_10,
+        'total_traders': len(leaderboard_data)
+    }
 
 
 @leaderboard_bp.route('/top-performer', methods=['GET'])
@@ -86,9 +136,9 @@ def get_top_performer():
     GET /api/leaderboard/top-performer
     """
     try:
-        # Get all active or funded challenges
+        # Get all active or passed challenges
         challenges = UserChallenge.query.filter(
-            UserChallenge.status.in_(['active', 'funded'])
+            UserChallenge.status.in_(['ACTIVE', 'PASSED'])
         ).all()
         
         if not challenges:
@@ -4,6 +4,8 @@ Market data routes - Real-time prices and market information
 
 from flask import Blueprint, request, jsonify
 from services.real_time_data import real_time_service
+from services.quote_delta import quote_versions, parse_since, has_changes
+from services.http_cache import make_etag, not_modified, cacheable
 
 market_bp = Blueprint('market', __name__, url_prefix='/api/market')
 
@@ -71,6 +73,14 @@ def get_watchlist():
     """
     Get predefined watchlist with live prices
     GET /api/market/watchlist
+    
+    Delta mode: GET /api/market/watchlist?since=<seq> only returns the
+    symbols and fields that changed since that sequence, e.g.
+    {"symbol": "AAPL", "market": "US", "seq": 12, "full": false, "changes": {"price": 150.3}}
+    Send back the top-level "seq" as the next since (start with since=0).
+    
+    Responses carry a strong ETag built from the quote versions, If-None-Match
+    gets 304 Not Modified while no watchlist price changed.
     """
     try:
         watchlist = [
@@ -90,10 +100,32 @@ def get_watchlist():
             price_data['display_name'] = item['name']
             results.append(price_data)
         
-        return jsonify({
+        since = request.args.get('since')
+        max_age = real_time_service.cache_duration
+        quotes = {(item['symbol'], item['market']): data for item, data in zip(watchlist, results)}
+        
+        # The quote versions identify the body, answer 304 before building it
+        versions = [quote_versions.update(key, data) for key, data in quotes.items()]
+        etag = make_etag('watchlist', since, *versions)
+        cached = not_modified(etag, max_age)
+        if cached is not None:
+            return cached
+        
+        _, payloads = quote_versions.sync(quotes, parse_since(since))
+        
+        if since is not None:
+            results = [
+                {'symbol': symbol, 'market': market, **payload}
+                for (symbol, market), payload in payloads.items()
+                if has_changes(payload)
+            ]
+        
+        response = jsonify({
             'success': True,
+            'seq': max(payload['seq'] for payload in payloads.values()),
             'data': results
-        }), 200
+        })
+        return cacheable(response, etag, max_age), 200
         
     except Exception as e:
         return jsonify({
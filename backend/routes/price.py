@@ -3,11 +3,20 @@ Real-Time Price API Routes
 Optimized for frequent calls with caching
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from services.price_service import price_service
+from services.price_stream import price_stream, parse_symbols
+from services.quote_delta import parse_since, has_changes
+from services.http_cache import make_etag, not_modified, cacheable
 
 price_bp = Blueprint('price', __name__, url_prefix='/api/price')
 
+MAX_STREAM_SYMBOLS = 20
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Clients and proxies may reuse a price for as long as the server caches it
+PRICE_MAX_AGE = int(price_service.cache.ttl.total_seconds())
+
 @price_bp.route('/<ticker>', methods=['GET'])
 def get_price(ticker):
     """
@@ -27,8 +36,22 @@ def get_price(ticker):
         "low": 149.50,
         "volume": 12345678,
         "timestamp": "2024-01-15T10:30:00.123456",
-        "last_updated": "2024-01-15T10:29:00"
+        "last_updated": "2024-01-15T10:29:00",
+        "seq": 1705314600123
+    }
+    
+    Delta mode: GET /api/price/AAPL?since=<seq> returns only the fields that
+    changed since that sequence (or a full snapshot when the client is too far
+    behind). Send since=0 to start.
+    {
+        "symbol": "AAPL",
+        "seq": 1705314600125,
+        "full": false,
+        "changes": {"current_price": 150.30, "timestamp": "..."}
     }
+    
+    Responses carry a strong ETag derived from the quote version, send it
+    back in If-None-Match to get 304 Not Modified while the price is unchanged.
     """
     try:
         # Validate input
@@ -45,7 +68,25 @@ def get_price(ticker):
         if 'error' in result:
             return jsonify(result), 404
         
-        return jsonify(result), 200
+        symbol = ticker.upper()
+        since = request.args.get('since')
+        
+        # The quote version identifies the body, answer 304 before building it
+        version = price_service.versions.update(symbol, result)
+        etag = make_etag('price', symbol, version, since)
+        cached = not_modified(etag, PRICE_MAX_AGE)
+        if cached is not None:
+            return cached
+        
+        _, payloads = price_service.versions.sync({symbol: result}, parse_since(since))
+        payload = payloads[symbol]
+        
+        if since is not None:
+            response = jsonify({'symbol': symbol, **payload})
+        else:
+            response = jsonify({**result, 'seq': payload['seq']})
+        
+        return cacheable(response, etag, PRICE_MAX_AGE), 200
         
     except Exception as e:
         return jsonify({
@@ -66,8 +107,12 @@ def get_multiple_prices():
             "AAPL": {...},
             "TSLA": {...},
             "BTC-USD": {...}
-        }
+        },
+        "seq": 1705314600123
     }
+    
+    Delta mode: add since=<seq> to receive, per ticker, only the fields that
+    changed since that sequence. Unchanged tickers are left out.
     """
     try:
         tickers_str = request.args.get('tickers', '')
@@ -91,10 +136,36 @@ def get_multiple_prices():
         for ticker in tickers:
             results[ticker] = price_service.get_price(ticker)
         
-        return jsonify({
+        since = request.args.get('since')
+        quotes = {ticker: data for ticker, data in results.items() if 'error' not in data}
+        
+        # Error payloads are not versioned, only fully successful responses are cacheable
+        etag = None
+        if len(quotes) == len(results):
+            versions = [(ticker, price_service.versions.update(ticker, data)) for ticker, data in quotes.items()]
+            etag = make_etag('prices', since, *versions)
+            cached = not_modified(etag, PRICE_MAX_AGE)
+            if cached is not None:
+                return cached
+        
+        _, payloads = price_service.versions.sync(quotes, parse_since(since))
+        
+        if since is not None:
+            results = {
+                ticker: payloads.get(ticker, data) for ticker, data in results.items()
+                if ticker not in payloads or has_changes(payloads[ticker])
+            }
+        
+        response = jsonify({
             'prices': results,
+            'seq': max((payload['seq'] for payload in payloads.values()), default=parse_since(since) or 0),
             'timestamp': 'null'
-        }), 200
+        })
+        
+        if etag is not None:
+            cacheable(response, etag, PRICE_MAX_AGE)
+        
+        return response, 200
         
     except Exception as e:
         return jsonify({
@@ -103,11 +174,70 @@ def get_multiple_prices():
         }), 500
 
 
+@price_bp.route('/stream', methods=['GET'])
+def stream_prices():
+    """
+    Stream live prices with Server-Sent Events
+    GET /api/price/stream?symbols=AAPL,BTC-USD,IAM:MOROCCO
+    
+    One server-side poller fetches each subscribed symbol once per interval
+    and pushes the update to every connected client, so opening more tabs
+    does not add upstream or HTTP requests.
+    
+    Events:
+        event: price
+        data: {"symbol": "AAPL", "market": "US", "price": 150.25, ...}
+    
+    With delta=1 the stream sends a full "snapshot" event per symbol first,
+    then "delta" events carrying only the changed fields:
+        event: delta
+        data: {"symbol": "AAPL", "market": "US", "seq": 12, "full": false, "changes": {"price": 150.3}}
+    """
+    keys = parse_symbols(request.args.get('symbols', ''))
+    delta = request.args.get('delta', '').lower() in ('1', 'true')
+    
+    if not keys:
+        return jsonify({
+            'error': 'Symbols parameter is required (comma separated)',
+            'timestamp': 'null'
+        }), 400
+    
+    if len(keys) > MAX_STREAM_SYMBOLS:
+        return jsonify({
+            'error': f'Maximum {MAX_STREAM_SYMBOLS} symbols allowed per stream',
+            'timestamp': 'null'
+        }), 400
+    
+    subscriber = price_stream.subscribe(keys, delta=delta)
+    
+    def generate():
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield 'retry: 5000\n\n'
+            while True:
+                message = subscriber.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                # Comment frames keep proxies from closing idle connections
+                yield message if message is not None else ': keep-alive\n\n'
+        finally:
+            price_stream.unsubscribe(subscriber)
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
 @price_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'service': 'real-time-price-api',
+        'stream_clients': price_stream.client_count(),
+        'stream_symbols': len(price_stream.subscribed_keys()),
         'timestamp': 'null'
     }), 200
@@ -1,16 +1,40 @@
 """Trading routes"""
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from routes.auth import jwt_required
 from services.trade_service import TradeService
+from services.position_service import PositionService
 from services.market_data import get_stock_price, get_crypto_price, get_morocco_stock
 from services.challenge_monitor import check_challenge_rules
-from models import db, UserChallenge, Trade
-from challenge_engine import evaluate_challenge, get_challenge_metrics
+from services.real_time_data import market_for_symbol, real_time_service
+from services.idempotency import idempotent
+from services.order_book import ORDER_TYPES, order_engine
+from services.trade_export import EXPORT_MIMETYPES, export_trades, parquet_available
+from services.trade_journal import trade_journal
+from services.trade_triggers import trade_triggers
+from models import db, UserChallenge, Trade, Order
+from challenge_engine import get_challenge_metrics
 
 trading_bp = Blueprint('trading', __name__, url_prefix='/api')
 
 
+def _protection_levels(data, price):
+    """
+    Parse the optional stop_loss / take_profit of a BUY
+    
+    Returns:
+        tuple: (stop_loss, take_profit, error_message)
+    """
+    stop_loss = float(data['stop_loss']) if data.get('stop_loss') is not None else None
+    take_profit = float(data['take_profit']) if data.get('take_profit') is not None else None
+    
+    if stop_loss is not None and (stop_loss <= 0 or stop_loss >= price):
+        return None, None, 'stop_loss must be positive and below the entry price'
+    if take_profit is not None and take_profit <= price:
+        return None, None, 'take_profit must be above the entry price'
+    return stop_loss, take_profit, None
+
+
 @trading_bp.route('/trade/execute', methods=['POST'])
 def execute_trade():
     """
@@ -21,7 +45,9 @@ def execute_trade():
         "symbol": "AAPL",
         "side": "BUY" or "SELL",
         "amount": 100.0,
-        "price": 150.25
+        "price": 150.25,
+        "stop_loss": 140.0,      (optional, BUY only)
+        "take_profit": 165.0     (optional, BUY only)
     }
     """
     try:
@@ -41,6 +67,12 @@ def execute_trade():
         amount = float(data['amount'])
         price = float(data['price'])
         
+        if amount <= 0 or price <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Amount and price must be positive'
+            }), 400
+        
         # Validate side
         if side not in ['BUY', 'SELL']:
             return jsonify({
@@ -48,6 +80,13 @@ def execute_trade():
                 'error': 'Side must be BUY or SELL'
             }), 400
         
+        stop_loss, take_profit, error = _protection_levels(data, price) if side == 'BUY' else (None, None, None)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Get challenge
         challenge = UserChallenge.query.get(challenge_id)
         if not challenge:
@@ -63,65 +102,46 @@ def execute_trade():
                 'error': f'Challenge is {challenge.status}. Cannot execute trades.'
             }), 400
         
-        # Calculate trade value
-        trade_value = amount * price
-        
-        # Calculate P&L (simplified: BUY = negative, SELL = positive)
-        if side == 'BUY':
-            profit_loss = -trade_value
-        else:  # SELL
-            profit_loss = trade_value
-        
-        # Create trade record
-        trade = Trade(
-            challenge_id=challenge_id,
-            user_id=challenge.user_id,
-            symbol=symbol,
-            trade_type=side.lower(),
-            quantity=amount,
-            entry_price=price,
-            exit_price=price if side == 'SELL' else None,
-            profit_loss=profit_loss,
-            status='closed' if side == 'SELL' else 'open'
+        # Journal the trade and move the balance atomically (re-checks ACTIVE under the row lock)
+        fill, error = trade_journal.execute_order(
+            challenge, symbol, side, amount, price, require_status='ACTIVE',
+            stop_loss=stop_loss, take_profit=take_profit
         )
         
-        # Update challenge balance
-        challenge.current_balance += profit_loss
-        
-        # Save trade and updated balance
-        db.session.add(trade)
-        db.session.commit()
-        
-        # Evaluate challenge after trade
-        evaluation = evaluate_challenge(challenge_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        # Get detailed metrics
-        metrics = get_challenge_metrics(challenge_id)
+        # Challenge rules are evaluated asynchronously by the rule queue
+        trade = fill['trade']
+        if side == 'SELL':
+            trade_triggers.trim(challenge_id, symbol)
+        else:
+            trade_triggers.add(trade['id'], challenge_id, symbol, trade['stop_loss'], trade['take_profit'])
+        profit_loss = trade['profit_loss']
         
         return jsonify({
             'success': True,
             'trade': {
-                'id': trade.id,
+                'id': trade['id'],
                 'symbol': symbol,
                 'side': side,
                 'amount': amount,
                 'price': price,
                 'profit_loss': round(profit_loss, 2),
-                'timestamp': trade.created_at.isoformat()
+                'stop_loss': trade['stop_loss'],
+                'take_profit': trade['take_profit'],
+                'timestamp': trade['created_at']
             },
             'challenge': {
                 'id': challenge_id,
-                'status': evaluation['status'],
-                'balance': evaluation['balance'],
-                'message': evaluation['message']
+                'status': fill['account']['challenge_status'],
+                'balance': fill['account']['balance'],
+                'message': 'Order filled, challenge rules are being evaluated'
             },
-            'account_state': {
-                'balance': challenge.current_balance,
-                'equity': challenge.current_balance,  # Simplified: equity = balance for now
-                'challenge_id': challenge.id,
-                'challenge_status': evaluation['status']
-            },
-            'metrics': metrics
+            'account_state': fill['account']
         }), 201
         
     except ValueError as e:
@@ -139,15 +159,19 @@ def execute_trade():
 
 @trading_bp.route('/trade/buy', methods=['POST'])
 @jwt_required()
+@idempotent()
 def buy_trade_endpoint(user):
     """
     Execute a BUY trade at current market price
     POST /api/trade/buy
     Headers: Authorization: Bearer <token>
+             Idempotency-Key: <unique key>  (optional, retries replay the first response)
     Body: {
         "challenge_id": 1,
         "symbol": "AAPL",
-        "amount": 100.0
+        "amount": 100.0,
+        "stop_loss": 140.0,      (optional)
+        "take_profit": 165.0     (optional)
     }
     """
     try:
@@ -165,6 +189,12 @@ def buy_trade_endpoint(user):
         symbol = data['symbol'].upper()
         amount = float(data['amount'])
         
+        if amount <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Amount must be positive'
+            }), 400
+        
         # Get current market price
         if symbol in ['BTC', 'ETH', 'BTC-USD', 'ETH-USD']:
             price_data = get_crypto_price(symbol)
@@ -181,6 +211,13 @@ def buy_trade_endpoint(user):
         
         market_price = price_data['price']
         
+        stop_loss, take_profit, error = _protection_levels(data, market_price)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Validate challenge ownership
         challenge = UserChallenge.query.get(challenge_id)
         if not challenge or challenge.user_id != user.id:
@@ -189,54 +226,36 @@ def buy_trade_endpoint(user):
                 'error': 'Challenge not found or unauthorized'
             }), 404
         
-        # Calculate trade value and P&L
-        trade_value = amount * market_price
-        profit_loss = -trade_value  # Negative for BUY
+        # Journal the trade and move the balance atomically (re-checks ACTIVE under the row lock)
+        fill, error = trade_journal.execute_order(challenge, symbol, 'BUY', amount, market_price,
+                                                  require_status='ACTIVE',
+                                                  stop_loss=stop_loss, take_profit=take_profit)
         
-        # Create trade record
-        trade = Trade(
-            challenge_id=challenge_id,
-            user_id=challenge.user_id,
-            symbol=symbol,
-            trade_type='buy',
-            quantity=amount,
-            entry_price=market_price,
-            exit_price=None,
-            profit_loss=profit_loss,
-            status='open'
-        )
-        
-        # Update challenge balance
-        challenge.current_balance += profit_loss
-        
-        # Save trade and updated balance
-        db.session.add(trade)
-        db.session.commit()
-        
-        # Evaluate challenge after trade
-        evaluation = evaluate_challenge(challenge_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        # Get detailed metrics
-        metrics = get_challenge_metrics(challenge_id)
+        # Challenge rules are evaluated asynchronously by the rule queue
+        trade = fill['trade']
+        trade_triggers.add(trade['id'], challenge_id, symbol, trade['stop_loss'], trade['take_profit'])
+        profit_loss = trade['profit_loss']
         
         return jsonify({
             'success': True,
             'trade': {
-                'id': trade.id,
+                'id': trade['id'],
                 'symbol': symbol,
                 'side': 'BUY',
                 'amount': amount,
                 'price': market_price,
                 'profit_loss': round(profit_loss, 2),
-                'timestamp': trade.created_at.isoformat()
+                'stop_loss': trade['stop_loss'],
+                'take_profit': trade['take_profit'],
+                'timestamp': trade['created_at']
             },
-            'account_state': {
-                'balance': challenge.current_balance,
-                'equity': challenge.current_balance,
-                'challenge_id': challenge.id,
-                'challenge_status': evaluation['status']
-            },
-            'metrics': metrics
+            'account_state': fill['account']
         }), 201
         
     except ValueError as e:
@@ -254,11 +273,13 @@ def buy_trade_endpoint(user):
 
 @trading_bp.route('/trade/sell', methods=['POST'])
 @jwt_required()
+@idempotent()
 def sell_trade_endpoint(user):
     """
     Execute a SELL trade at current market price
     POST /api/trade/sell
     Headers: Authorization: Bearer <token>
+             Idempotency-Key: <unique key>  (optional, retries replay the first response)
     Body: {
         "challenge_id": 1,
         "symbol": "AAPL",
@@ -280,6 +301,12 @@ def sell_trade_endpoint(user):
         symbol = data['symbol'].upper()
         amount = float(data['amount'])
         
+        if amount <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Amount must be positive'
+            }), 400
+        
         # Get current market price
         if symbol in ['BTC', 'ETH', 'BTC-USD', 'ETH-USD']:
             price_data = get_crypto_price(symbol)
@@ -304,54 +331,35 @@ def sell_trade_endpoint(user):
                 'error': 'Challenge not found or unauthorized'
             }), 404
         
-        # Calculate trade value and P&L
-        trade_value = amount * market_price
-        profit_loss = trade_value  # Positive for SELL
-        
-        # Create trade record
-        trade = Trade(
-            challenge_id=challenge_id,
-            user_id=challenge.user_id,
-            symbol=symbol,
-            trade_type='sell',
-            quantity=amount,
-            entry_price=market_price,
-            exit_price=market_price,
-            profit_loss=profit_loss,
-            status='closed'
-        )
-        
-        # Update challenge balance
-        challenge.current_balance += profit_loss
-        
-        # Save trade and updated balance
-        db.session.add(trade)
-        db.session.commit()
+        # Journal the trade and move the balance atomically (re-checks ACTIVE under the row lock)
+        fill, error = trade_journal.execute_order(challenge, symbol, 'SELL', amount, market_price,
+                                                  require_status='ACTIVE')
         
-        # Evaluate challenge after trade
-        evaluation = evaluate_challenge(challenge_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        # Get detailed metrics
-        metrics = get_challenge_metrics(challenge_id)
+        # Challenge rules are evaluated asynchronously by the rule queue
+        trade = fill['trade']
+        trade_triggers.trim(challenge_id, symbol)
+        profit_loss = trade['profit_loss']
         
         return jsonify({
             'success': True,
             'trade': {
-                'id': trade.id,
+                'id': trade['id'],
                 'symbol': symbol,
                 'side': 'SELL',
                 'amount': amount,
                 'price': market_price,
                 'profit_loss': round(profit_loss, 2),
-                'timestamp': trade.created_at.isoformat()
-            },
-            'account_state': {
-                'balance': challenge.current_balance,
-                'equity': challenge.current_balance,
-                'challenge_id': challenge.id,
-                'challenge_status': evaluation['status']
+                'stop_loss': trade['stop_loss'],
+                'take_profit': trade['take_profit'],
+                'timestamp': trade['created_at']
             },
-            'metrics': metrics
+            'account_state': fill['account']
         }), 201
         
     except ValueError as e:
@@ -367,38 +375,468 @@ def sell_trade_endpoint(user):
         }), 500
 
 
+MAX_BATCH_ORDERS = 100
+
+
+@trading_bp.route('/trade/batch', methods=['POST'])
+@jwt_required()
+@idempotent()
+def batch_trade_endpoint(user):
+    """
+    Execute several orders at current market prices in one transaction
+    POST /api/trade/batch
+    Headers: Authorization: Bearer <token>
+             Idempotency-Key: <unique key>  (optional, retries replay the first response)
+    Body: {
+        "challenge_id": 1,
+        "orders": [
+            {"symbol": "AAPL", "side": "BUY", "amount": 10},
+            {"symbol": "IAM", "side": "SELL", "amount": 5}
+        ]
+    }
+    
+    Each distinct symbol is priced once through the quote cache. Invalid or
+    unpriceable orders are rejected individually, the others are filled
+    together and the challenge is evaluated once for the batch.
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if not data or 'challenge_id' not in data or not isinstance(data.get('orders'), list):
+            return jsonify({
+                'success': False,
+                'error': 'Missing required fields: challenge_id, orders'
+            }), 400
+        
+        orders = data['orders']
+        if not orders or len(orders) > MAX_BATCH_ORDERS:
+            return jsonify({
+                'success': False,
+                'error': f'orders must contain between 1 and {MAX_BATCH_ORDERS} entries'
+            }), 400
+        
+        challenge_id = int(data['challenge_id'])
+        
+        # Validate challenge ownership
+        challenge = UserChallenge.query.get(challenge_id)
+        if not challenge or challenge.user_id != user.id:
+            return jsonify({
+                'success': False,
+                'error': 'Challenge not found or unauthorized'
+            }), 404
+        
+        # Validate every order, collect the symbols to price
+        results = [None] * len(orders)
+        valid = []
+        for index, order in enumerate(orders):
+            try:
+                symbol = str(order['symbol']).upper()
+                side = str(order['side']).upper()
+                amount = float(order['amount'])
+            except (KeyError, TypeError, ValueError):
+                results[index] = {'index': index, 'success': False,
+                                  'error': 'Each order needs symbol, side and a numeric amount'}
+                continue
+            
+            if side not in ['BUY', 'SELL']:
+                results[index] = {'index': index, 'success': False, 'error': 'Side must be BUY or SELL'}
+            elif amount <= 0:
+                results[index] = {'index': index, 'success': False, 'error': 'Amount must be positive'}
+            else:
+                valid.append((index, symbol, side, amount))
+        
+        # Price each distinct symbol once
+        quotes = {}
+        for symbol in {symbol for _, symbol, _, _ in valid}:
+            quotes[symbol] = real_time_service.get_live_price(symbol, market_for_symbol(symbol))
+        
+        fills = []
+        for index, symbol, side, amount in valid:
+            quote = quotes[symbol]
+            if 'error' in quote or not quote.get('price'):
+                results[index] = {'index': index, 'success': False,
+                                  'error': f'Failed to get market price: {quote.get("error", "no price")}'}
+                continue
+            fills.append((index, {'symbol': symbol, 'side': side, 'quantity': amount,
+                                  'price': quote['price']}))
+        
+        if not fills:
+            return jsonify({
+                'success': False,
+                'error': 'No order could be executed',
+                'results': results
+            }), 400
+        
+        # One balance update, one INSERT, one commit
+        batch, error = TradeService.execute_batch(
+            challenge, [order for _, order in fills], require_status='ACTIVE'
+        )
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        # Sold symbols may leave protected BUY trades without shares to close
+        for symbol in {order['symbol'] for _, order in fills if order['side'] == 'SELL'}:
+            trade_triggers.trim(challenge_id, symbol)
+        
+        for (index, order), row in zip(fills, batch['rows']):
+            results[index] = {
+                'index': index,
+                'success': True,
+                'symbol': order['symbol'],
+                'side': order['side'],
+                'amount': order['quantity'],
+                'price': order['price'],
+                'profit_loss': round(row['profit_loss'], 2),
+                'timestamp': row['created_at']
+            }
+        
+        return jsonify({
+            'success': True,
+            'filled': len(fills),
+            'rejected': len(orders) - len(fills),
+            'results': results,
+            'account_state': batch['account']
+        }), 201
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid numeric value: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Batch execution failed: {str(e)}'
+        }), 500
+
+
+@trading_bp.route('/orders', methods=['POST'])
+@jwt_required()
+@idempotent()
+def place_order(user):
+    """
+    Place a resting limit or stop order
+    POST /api/orders
+    Headers: Authorization: Bearer <token>
+             Idempotency-Key: <unique key>  (optional, retries replay the first response)
+    Body: {
+        "challenge_id": 1,
+        "symbol": "AAPL",
+        "side": "BUY" or "SELL",
+        "type": "LIMIT" or "STOP",
+        "amount": 10,
+        "price": 145.0
+    }
+    
+    The order rests in the order book until a price tick crosses it, then
+    it is filled at the tick price like a market order.
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        required_fields = ['challenge_id', 'symbol', 'side', 'type', 'amount', 'price']
+        if not data or not all(field in data for field in required_fields):
+            return jsonify({
+                'success': False,
+                'error': f'Missing required fields: {", ".join(required_fields)}'
+            }), 400
+        
+        challenge_id = int(data['challenge_id'])
+        symbol = data['symbol'].upper()
+        side = data['side'].upper()
+        order_type = data['type'].upper()
+        amount = float(data['amount'])
+        price = float(data['price'])
+        
+        if side not in ['BUY', 'SELL']:
+            return jsonify({
+                'success': False,
+                'error': 'Side must be BUY or SELL'
+            }), 400
+        
+        if order_type not in ORDER_TYPES:
+            return jsonify({
+                'success': False,
+                'error': f'Type must be one of: {", ".join(ORDER_TYPES)}'
+            }), 400
+        
+        if amount <= 0 or price <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Amount and price must be positive'
+            }), 400
+        
+        # Validate challenge ownership
+        challenge = UserChallenge.query.get(challenge_id)
+        if not challenge or challenge.user_id != user.id:
+            return jsonify({
+                'success': False,
+                'error': 'Challenge not found or unauthorized'
+            }), 404
+        
+        if challenge.status != 'ACTIVE':
+            return jsonify({
+                'success': False,
+                'error': f'Challenge is {challenge.status}. Cannot place orders.'
+            }), 400
+        
+        order = Order(
+            challenge_id=challenge_id,
+            user_id=user.id,
+            symbol=symbol,
+            side=side,
+            order_type=order_type,
+            quantity=amount,
+            price=price,
+            status='open'
+        )
+        db.session.add(order)
+        db.session.commit()
+        
+        order_engine.add(order)
+        
+        return jsonify({
+            'success': True,
+            'order': order.to_dict()
+        }), 201
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid numeric value: {str(e)}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Failed to place order: {str(e)}'
+        }), 500
+
+
+@trading_bp.route('/orders', methods=['GET'])
+@jwt_required()
+def get_orders(user):
+    """
+    Get user's limit and stop orders
+    GET /api/orders?status=open&challenge_id=1
+    Headers: Authorization: Bearer <token>
+    """
+    try:
+        query = Order.query.filter_by(user_id=user.id)
+        
+        status = request.args.get('status')
+        if status:
+            query = query.filter_by(status=status)
+        
+        challenge_id = request.args.get('challenge_id')
+        if challenge_id:
+            query = query.filter_by(challenge_id=int(challenge_id))
+        
+        orders = query.order_by(Order.created_at.desc()).all()
+        
+        return jsonify({
+            'success': True,
+            'orders': [order.to_dict() for order in orders]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to get orders: {str(e)}'
+        }), 500
+
+
+@trading_bp.route('/orders/<int:order_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_order(user, order_id):
+    """
+    Cancel an open order
+    DELETE /api/orders/<order_id>
+    Headers: Authorization: Bearer <token>
+    """
+    try:
+        order = Order.query.get(order_id)
+        if not order or order.user_id != user.id:
+            return jsonify({
+                'success': False,
+                'error': 'Order not found or unauthorized'
+            }), 404
+        
+        # Guarded so an order filled meanwhile is not reported as cancelled
+        cancelled = Order.query.filter_by(id=order_id, status='open').update(
+            {'status': 'cancelled'}, synchronize_session=False
+        )
+        db.session.commit()
+        
+        if not cancelled:
+            db.session.refresh(order)
+            return jsonify({
+                'success': False,
+                'error': f'Order is already {order.status}'
+            }), 400
+        
+        order_engine.cancel(order_id)
+        db.session.refresh(order)
+        
+        return jsonify({
+            'success': True,
+            'order': order.to_dict()
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Failed to cancel order: {str(e)}'
+        }), 500
+
+
 @trading_bp.route('/trades', methods=['GET'])
 @jwt_required()
 def get_trades(user):
     """
-    Get user's trade history
-    GET /api/trades?status=open&challenge_id=1
+    Get one page of the user's trade history, newest first
+    GET /api/trades?status=open&challenge_id=1&limit=50&cursor=<next_cursor>
     Headers: Authorization: Bearer <token>
     """
     try:
         # Get query parameters
         status = request.args.get('status')  # open or closed
-        challenge_id = request.args.get('challenge_id')
+        challenge_id = request.args.get('challenge_id', type=int)
+        limit = request.args.get('limit', 50, type=int)
+        cursor = request.args.get('cursor')
         
-        # Get trades
-        if challenge_id:
-            trades, error = TradeService.get_challenge_trades(int(challenge_id), status)
-        else:
-            trades, error = TradeService.get_user_trades(user.id, status)
+        page, error = TradeService.get_trade_page(user.id, challenge_id, status, limit, cursor)
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        return jsonify(page), 200
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to get trades: {str(e)}'}), 500
+
+
+@trading_bp.route('/trades/statistics', methods=['GET'])
+@jwt_required()
+def get_trades_statistics(user):
+    """
+    Get the user's trade statistics
+    GET /api/trades/statistics?challenge_id=1
+    Headers: Authorization: Bearer <token>
+    """
+    try:
+        challenge_id = request.args.get('challenge_id', type=int)
+        
+        stats, error = TradeService.get_trade_statistics(user_id=user.id, challenge_id=challenge_id)
         
         if error:
             return jsonify({'error': error}), 400
         
-        # Get trade statistics
-        stats, stats_error = TradeService.get_trade_statistics(user_id=user.id)
+        return jsonify({'statistics': stats}), 200
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to get trade statistics: {str(e)}'}), 500
+
+
+@trading_bp.route('/trades/export', methods=['GET'])
+@jwt_required()
+def export_trades_endpoint(user):
+    """
+    Stream the user's full trade history, oldest first
+    GET /api/trades/export?format=csv&challenge_id=1
+    Headers: Authorization: Bearer <token>
+    Formats: csv (default), ndjson, parquet
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    challenge_id = request.args.get('challenge_id', type=int)
+    
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({
+            'success': False,
+            'error': f"Invalid format. Must be one of: {', '.join(EXPORT_MIMETYPES)}"
+        }), 400
+    
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({
+            'success': False,
+            'error': 'Parquet export is not available on this server'
+        }), 501
+    
+    filename = f"trades-{challenge_id or 'all'}.{export_format}"
+    
+    # Chunked transfer: rows go out as they are read from the cursor
+    return Response(
+        stream_with_context(export_trades(user.id, export_format, challenge_id)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@trading_bp.route('/trade/<int:trade_id>/protection', methods=['PUT'])
+@jwt_required()
+def update_protection(user, trade_id):
+    """
+    Set or clear the stop-loss / take-profit of an open BUY trade
+    PUT /api/trade/<trade_id>/protection
+    Headers: Authorization: Bearer <token>
+    Body: {"stop_loss": 140.0, "take_profit": 165.0}  (null clears a level)
+    """
+    try:
+        data = request.get_json() or {}
+        
+        trade = Trade.query.get(trade_id)
+        if not trade or trade.user_id != user.id:
+            return jsonify({
+                'success': False,
+                'error': 'Trade not found or unauthorized'
+            }), 404
+        
+        if trade.status != 'open' or trade.trade_type != 'buy':
+            return jsonify({
+                'success': False,
+                'error': 'Only open BUY trades can be protected'
+            }), 400
+        
+        stop_loss, take_profit, error = _protection_levels(data, trade.entry_price)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        trade.stop_loss = stop_loss
+        trade.take_profit = take_profit
+        db.session.commit()
+        
+        trade_triggers.add(trade.id, trade.challenge_id, trade.symbol, stop_loss, take_profit)
         
         return jsonify({
-            'trades': trades,
-            'statistics': stats if not stats_error else {}
+            'success': True,
+            'trade': trade.to_dict()
         }), 200
     
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid numeric value: {str(e)}'
+        }), 400
     except Exception as e:
-        return jsonify({'error': f'Failed to get trades: {str(e)}'}), 500
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Failed to update protection: {str(e)}'
+        }), 500
 
 
 @trading_bp.route('/trade/<int:trade_id>', methods=['GET'])
@@ -449,4 +887,35 @@ def get_metrics(challenge_id):
         return jsonify({
             'success': False,
             'error': f'Failed to get metrics: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@trading_bp.route('/challenge/<int:challenge_id>/positions', methods=['GET'])
+@jwt_required()
+def get_positions(user, challenge_id):
+    """
+    Get open positions and account state from the position ledger
+    GET /api/challenge/<challenge_id>/positions
+    Headers: Authorization: Bearer <token>
+    """
+    try:
+        challenge = UserChallenge.query.get(challenge_id)
+        if not challenge or challenge.user_id != user.id:
+            return jsonify({
+                'success': False,
+                'error': 'Challenge not found or unauthorized'
+            }), 404
+        
+        positions = PositionService.get_positions(challenge_id, open_only=False)
+        
+        return jsonify({
+            'success': True,
+            'positions': [position.to_dict() for position in positions if position.quantity != 0],
+            'account_state': PositionService.account_state(challenge, positions)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to get positions: {str(e)}'
+        }), 500
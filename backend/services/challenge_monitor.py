@@ -1,17 +1,15 @@
 """Challenge monitoring service for rule validation"""
 
-from datetime import datetime, timedelta
-from models import UserChallenge, Trade
+from challenge_engine import evaluate_challenge
 
 
 def check_challenge_rules(challenge_id, db):
     """
     Check and enforce challenge rules
     
-    Verifies:
-    - Daily loss > 5% → status='failed'
-    - Total loss > 10% → status='failed'
-    - Profit > 10% → status='funded'
+    Runs the challenge engine, so the rules are the challenge's own
+    profit_target, max_daily_loss and max_total_loss and the statuses are
+    ACTIVE, PASSED and FAILED.
     
     Args:
         challenge_id (int): Challenge ID
@@ -21,104 +19,30 @@ def check_challenge_rules(challenge_id, db):
         dict: {"status": str, "reason": str}
     """
     try:
-        # Get challenge
-        challenge = UserChallenge.query.get(challenge_id)
+        evaluation = evaluate_challenge(challenge_id)
         
-        if not challenge:
+        if not evaluation['success']:
             return {
                 "status": "error",
-                "reason": "Challenge not found"
+                "reason": evaluation['error']
             }
         
-        # Skip if challenge is already completed or failed
-        if challenge.status in ['failed', 'funded', 'completed']:
-            return {
-                "status": challenge.status,
-                "reason": "Challenge already finalized"
-            }
-        
-        initial_balance = challenge.initial_balance
-        current_balance = challenge.current_balance
-        
-        # Calculate total profit/loss
-        total_profit_loss = current_balance - initial_balance
-        total_profit_loss_pct = (total_profit_loss / initial_balance) * 100
-        
-        # Check Rule 1: Total loss > 10% → failed
-        if total_profit_loss_pct <= -10:
-            challenge.status = 'failed'
-            db.session.commit()
-            return {
-                "status": "failed",
-                "reason": f"Total loss exceeds 10% ({total_profit_loss_pct:.2f}%)"
-            }
-        
-        # Check Rule 2: Profit > 10% → funded
-        if total_profit_loss_pct >= 10:
-            challenge.status = 'funded'
-            db.session.commit()
-            return {
-                "status": "funded",
-                "reason": f"Profit target reached ({total_profit_loss_pct:.2f}%)"
-            }
+        result = {
+            "status": evaluation['status'],
+            "reason": evaluation['message']
+        }
         
-        # Check Rule 3: Daily loss > 5% → failed
-        daily_loss_pct = _check_daily_loss(challenge)
-        if daily_loss_pct <= -5:
-            challenge.status = 'failed'
-            db.session.commit()
-            return {
-                "status": "failed",
-                "reason": f"Daily loss exceeds 5% ({daily_loss_pct:.2f}%)"
+        if evaluation['status'] == 'ACTIVE':
+            result["metrics"] = {
+                "total_profit_loss_pct": evaluation['total_pnl_pct'],
+                "daily_loss_pct": evaluation['daily_pnl_pct']
             }
         
-        # All rules passed, challenge remains active
-        return {
-            "status": "active",
-            "reason": "All rules satisfied",
-            "metrics": {
-                "total_profit_loss_pct": round(total_profit_loss_pct, 2),
-                "daily_loss_pct": round(daily_loss_pct, 2)
-            }
-        }
+        return result
     
     except Exception as e:
+        db.session.rollback()
         return {
             "status": "error",
             "reason": f"Error checking challenge rules: {str(e)}"
         }
-
-
-def _check_daily_loss(challenge):
-    """
-    Calculate daily loss percentage for a challenge
-    
-    Args:
-        challenge (UserChallenge): Challenge object
-        
-    Returns:
-        float: Daily loss percentage
-    """
-    try:
-        # Get trades from today
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        today_trades = Trade.query.filter(
-            Trade.challenge_id == challenge.id,
-            Trade.created_at >= today_start,
-            Trade.status == 'closed'
-        ).all()
-        
-        if not today_trades:
-            return 0.0
-        
-        # Calculate total profit/loss for today
-        daily_profit_loss = sum(trade.profit_loss for trade in today_trades)
-        
-        # Calculate percentage based on initial balance
-        daily_loss_pct = (daily_profit_loss / challenge.initial_balance) * 100
-        
-        return daily_loss_pct
-    
-    except Exception as e:
-        return 0.0
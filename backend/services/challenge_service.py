@@ -1,13 +1,19 @@
 """Challenge service for trading challenge management"""
 
 from models import db, UserChallenge
+from challenge_engine import FINAL_STATUSES, apply_rules, calculate_daily_pnl, current_drawdown
+from services.order_book import order_engine
+from services.rule_queue import rule_queue
+from services.trade_triggers import trade_triggers
+from services.trading_calendar import DEFAULT_CALENDAR
 
 
 class ChallengeService:
     """Service class for challenge management operations"""
     
     @staticmethod
-    def create_challenge(user_id, plan_type, initial_balance, profit_target, max_daily_loss, max_total_loss):
+    def create_challenge(user_id, plan_type, initial_balance, profit_target, max_daily_loss, max_total_loss,
+                         trading_calendar=DEFAULT_CALENDAR):
         """
         Create a new trading challenge
         
@@ -18,6 +24,7 @@ class ChallengeService:
             profit_target (float): Profit target amount
             max_daily_loss (float): Maximum daily loss allowed
             max_total_loss (float): Maximum total loss allowed
+            trading_calendar (str): Calendar whose trading days the daily loss resets with
             
         Returns:
             tuple: (challenge_dict, error_message)
@@ -31,7 +38,8 @@ class ChallengeService:
                 profit_target=profit_target,
                 max_daily_loss=max_daily_loss,
                 max_total_loss=max_total_loss,
-                status='active'
+                trading_calendar=trading_calendar,
+                status='ACTIVE'
             )
             
             db.session.add(challenge)
@@ -146,7 +154,8 @@ class ChallengeService:
             challenge.current_balance = new_balance
             
             # Check if challenge objectives are met or violated
-            ChallengeService._check_challenge_status(challenge)
+            daily_pnl = calculate_daily_pnl(challenge_id, challenge.trading_calendar)
+            apply_rules(challenge, daily_pnl, current_drawdown(challenge))
             
             db.session.commit()
             
@@ -163,7 +172,7 @@ class ChallengeService:
         
         Args:
             challenge_id (int): Challenge ID
-            status (str): New status (active, passed, failed, completed)
+            status (str): New status (ACTIVE or COMPLETED, any case)
             
         Returns:
             tuple: (challenge_dict, error_message)
@@ -173,10 +182,15 @@ class ChallengeService:
             if not challenge:
                 return None, "Challenge not found"
             
-            valid_statuses = ['active', 'passed', 'failed', 'completed']
+            # PASSED and FAILED are decided by the challenge rules, and only an admin reopens them
+            status = str(status).upper()
+            valid_statuses = ['ACTIVE', 'COMPLETED']
             if status not in valid_statuses:
                 return None, f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
             
+            if challenge.status in FINAL_STATUSES:
+                return None, f"Challenge is {challenge.status}. Its status cannot be changed."
+            
             challenge.status = status
             db.session.commit()
             
@@ -204,6 +218,9 @@ class ChallengeService:
             
             db.session.delete(challenge)
             db.session.commit()
+            order_engine.evict(challenge_id)
+            trade_triggers.evict(challenge_id)
+            rule_queue.forget(challenge_id)
             
             return True, None
             
@@ -249,21 +266,3 @@ class ChallengeService:
             
         except Exception as e:
             return None, f"Failed to get challenge performance: {str(e)}"
-    
-    @staticmethod
-    def _check_challenge_status(challenge):
-        """
-        Internal method to check and update challenge status based on performance
-        
-        Args:
-            challenge (UserChallenge): Challenge object
-        """
-        profit_loss = challenge.current_balance - challenge.initial_balance
-        
-        # Check if profit target is reached
-        if profit_loss >= challenge.profit_target:
-            challenge.status = 'passed'
-        
-        # Check if max total loss is exceeded
-        elif abs(profit_loss) >= challenge.max_total_loss:
-            challenge.status = 'failed'
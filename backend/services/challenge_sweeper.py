@@ -0,0 +1,214 @@
+"""
+Challenge Sweeper
+Periodic set-based evaluation of every ACTIVE challenge, traded or not
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import and_, case, func, select, update
+
+from challenge_engine import FINAL_STATUSES, RULE_OUTCOMES, evaluate_batch
+from models import db, DailyPnl, UserChallenge
+from services.order_book import order_engine
+from services.position_service import PositionService
+from services.rule_queue import rule_queue
+from services.trading_calendar import DEFAULT_CALENDAR, trading_days
+
+
+def current_trading_day(days):
+    """
+    SQL expression for each challenge's current trading day
+
+    Args:
+        days (dict): {calendar name: current trading day}, see trading_calendar.trading_days
+    """
+    return case(days, value=UserChallenge.trading_calendar, else_=days[DEFAULT_CALENDAR])
+
+
+def sweep_statement(days):
+    """
+    The UPDATE applying the challenge rules to every ACTIVE challenge at once
+
+    The set-based form of challenge_engine.ChallengeRules, on each row's own
+    thresholds: profit target first, then max total loss, then max daily
+    loss on the P&L bucket of the current trading day in the row's calendar.
+    Challenges that break no rule are set to their own status.
+
+    Args:
+        days (dict): {calendar name: current trading day}
+    """
+    balance = UserChallenge.current_balance
+    starting = UserChallenge.initial_balance
+    daily_pnl = func.coalesce(
+        select(DailyPnl.pnl).where(
+            DailyPnl.challenge_id == UserChallenge.id,
+            DailyPnl.trade_date == current_trading_day(days)
+        ).scalar_subquery(),
+        0.0
+    )
+
+    status = case(
+        (balance >= starting + UserChallenge.profit_target, 'PASSED'),
+        (balance <= starting - UserChallenge.max_total_loss, 'FAILED'),
+        (daily_pnl <= -UserChallenge.max_daily_loss, 'FAILED'),
+        else_=UserChallenge.status
+    )
+
+    return update(UserChallenge).where(UserChallenge.status == 'ACTIVE').values(
+        status=status
+    ).execution_options(synchronize_session=False)
+
+
+def _active_ids() -> Set[int]:
+    """Ids of the ACTIVE challenges, read in the current transaction"""
+    return {challenge_id for challenge_id, in db.session.query(UserChallenge.id).filter(
+        UserChallenge.status == 'ACTIVE'
+    )}
+
+
+def _final_rows(challenge_ids: Set[int], chunk: int = 1000) -> List:
+    """(id, status) rows of the challenges among `challenge_ids` that are final"""
+    challenge_ids = sorted(challenge_ids)
+    rows = []
+    for start in range(0, len(challenge_ids), chunk):
+        rows.extend(db.session.query(UserChallenge.id, UserChallenge.status).filter(
+            UserChallenge.id.in_(challenge_ids[start:start + chunk]),
+            UserChallenge.status.in_(FINAL_STATUSES)
+        ).all())
+    return rows
+
+
+class ChallengeSweeper:
+    """
+    Background pass over all ACTIVE challenges every `interval` seconds
+
+    The rule queue only evaluates challenges whose owner trades. The sweeper
+    catches the others (a new day, an admin balance change) with one UPDATE
+    ... CASE over the whole table, joined to each challenge's daily P&L bucket
+    for the current trading day of its calendar, instead of one
+    evaluate_challenge call per challenge. The UPDATE row locks wait for
+    in-flight orders, so every challenge is judged on a committed balance.
+    Running it in several processes is harmless: the statement is idempotent.
+
+    The max trailing drawdown needs live equity, which the database does not
+    have: the mark-to-market engine queues those challenges on its ticks. The
+    pass saves the equity peaks those ticks raised.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self.app = None
+        self.last_report: Optional[Dict] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        """Bind to the Flask app and start sweeping every CHALLENGE_SWEEP_INTERVAL seconds (0 disables)"""
+        self.app = app
+        self.interval = app.config.get('CHALLENGE_SWEEP_INTERVAL', self.interval)
+        if self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def sweep(self) -> Dict:
+        """
+        Evaluate every ACTIVE challenge and commit the transitions
+
+        Returns:
+            dict: {"processed", "transitioned", "peaks_saved", "duration_ms", "swept_at"}
+        """
+        started = time.perf_counter()
+        swept_at = datetime.utcnow()
+
+        try:
+            peaks_saved = PositionService.save_peaks()
+            active = _active_ids()
+            processed = db.session.execute(sweep_statement(trading_days(swept_at))).rowcount
+            transitioned = _final_rows(active - _active_ids())
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # The set-based pass finalizes challenges without the rule queue seeing them:
+        # remembering them evicts their resting orders and protective levels
+        for row in transitioned:
+            rule_queue.remember(row)
+        order_engine.evict_final()
+
+        self.last_report = {
+            'processed': processed,
+            'transitioned': len(transitioned),
+            'peaks_saved': peaks_saved,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'swept_at': swept_at.isoformat()
+        }
+        return self.last_report
+
+    def what_if(self, profit_target_pct: Optional[float] = None, max_daily_loss_pct: Optional[float] = None,
+                max_total_loss_pct: Optional[float] = None) -> Dict:
+        """
+        Outcomes the ACTIVE challenges would get right now under other thresholds
+
+        Nothing is written. The challenges are loaded as columns with the P&L
+        of their current trading day and evaluated in one evaluate_batch
+        pass. A threshold given as a percentage of the starting balance
+        replaces every challenge's own, one left out keeps them. The trailing drawdown rule needs live equity
+        and is not part of the preview.
+
+        Returns:
+            dict: {"evaluated", "outcomes": {outcome: count}, "duration_ms"}
+        """
+        started = time.perf_counter()
+        days = trading_days()
+
+        rows = db.session.query(
+            UserChallenge.initial_balance,
+            UserChallenge.current_balance,
+            func.coalesce(DailyPnl.pnl, 0.0),
+            UserChallenge.profit_target,
+            UserChallenge.max_daily_loss,
+            UserChallenge.max_total_loss
+        ).outerjoin(DailyPnl, and_(
+            DailyPnl.challenge_id == UserChallenge.id,
+            DailyPnl.trade_date == current_trading_day(days)
+        )).filter(UserChallenge.status == 'ACTIVE').all()
+
+        initial_balance, current_balance, daily_pnl, profit_target, max_daily_loss, max_total_loss = (
+            np.array(rows, dtype=np.float64).reshape(-1, 6).T
+        )
+        if profit_target_pct is not None:
+            profit_target = initial_balance * (profit_target_pct / 100)
+        if max_daily_loss_pct is not None:
+            max_daily_loss = initial_balance * (max_daily_loss_pct / 100)
+        if max_total_loss_pct is not None:
+            max_total_loss = initial_balance * (max_total_loss_pct / 100)
+
+        codes = evaluate_batch(initial_balance, current_balance, daily_pnl,
+                               profit_target, max_daily_loss, max_total_loss)
+        counts = np.bincount(codes, minlength=len(RULE_OUTCOMES)).tolist()
+
+        return {
+            'evaluated': len(rows),
+            'outcomes': dict(zip(RULE_OUTCOMES, counts)),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def _run(self):
+        """Sweep once per interval"""
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    report = self.sweep()
+                print(f"Challenge sweep: {report['processed']} processed, "
+                      f"{report['transitioned']} transitioned in {report['duration_ms']} ms")
+            except Exception as e:
+                print(f"Challenge sweep failed: {str(e)}")
+
+
+# Global instance
+challenge_sweeper = ChallengeSweeper()
@@ -0,0 +1,116 @@
+"""Daily P&L service maintaining one running total per challenge and trading day"""
+
+from datetime import datetime
+from models import db, DailyPnl, Trade
+from services.trading_calendar import get_calendar
+
+
+class DailyPnlService:
+    """Service class for daily P&L bucket operations"""
+    
+    @staticmethod
+    def add(challenge_id, trade_date, pnl, closed_pnl=0.0):
+        """
+        Add to a challenge's bucket for one day in the current transaction
+        
+        The bucket is moved with an in-database increment and created on
+        first use. Callers must hold the challenge row lock (see
+        TradeService.apply_balance_delta) so two first trades of the day
+        cannot both try to create it.
+        
+        Args:
+            challenge_id (int): Challenge ID
+            trade_date (date): Trading day the trades were created on
+            pnl (float): Change of the day's P&L
+            closed_pnl (float): Change of the day's P&L from closed trades
+        """
+        if not pnl and not closed_pnl:
+            return
+        
+        updated = DailyPnl.query.filter_by(challenge_id=challenge_id, trade_date=trade_date).update({
+            DailyPnl.pnl: DailyPnl.pnl + pnl,
+            DailyPnl.closed_pnl: DailyPnl.closed_pnl + closed_pnl,
+            DailyPnl.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        
+        if not updated:
+            db.session.add(DailyPnl(
+                challenge_id=challenge_id,
+                trade_date=trade_date,
+                pnl=pnl,
+                closed_pnl=closed_pnl
+            ))
+            db.session.flush()
+    
+    @staticmethod
+    def add_trades(challenge_id, trades, sign=1, calendar=None):
+        """
+        Add (or with sign=-1 remove) the contribution of trades to their days
+        
+        Args:
+            challenge_id (int): Challenge ID
+            trades (iterable): Objects or rows with created_at, profit_loss and status
+            sign (int): 1 to add, -1 to remove
+            calendar (str, optional): Challenge's trading calendar, the default one if None
+        """
+        calendar = get_calendar(calendar)
+        buckets = {}
+        for trade in trades:
+            pnl = (trade.profit_loss or 0.0) * sign
+            bucket = buckets.setdefault(calendar.trading_day(trade.created_at), [0.0, 0.0])
+            bucket[0] += pnl
+            if trade.status == 'closed':
+                bucket[1] += pnl
+        
+        for trade_date, (pnl, closed_pnl) in buckets.items():
+            DailyPnlService.add(challenge_id, trade_date, pnl, closed_pnl)
+    
+    @staticmethod
+    def get(challenge_id, trade_date=None, calendar=None):
+        """
+        Read a challenge's P&L for one day with a single-row lookup
+        
+        A day without trades has no row yet, so the totals reset on their
+        own when the calendar's next trading day starts.
+        
+        Args:
+            challenge_id (int): Challenge ID
+            trade_date (date, optional): Trading day, the current one by default
+            calendar (str, optional): Challenge's trading calendar, the default one if None
+        
+        Returns:
+            tuple: (pnl, closed_pnl)
+        """
+        if trade_date is None:
+            trade_date = get_calendar(calendar).trading_day()
+        
+        row = db.session.query(DailyPnl.pnl, DailyPnl.closed_pnl).filter_by(
+            challenge_id=challenge_id,
+            trade_date=trade_date
+        ).first()
+        
+        return (float(row.pnl), float(row.closed_pnl)) if row else (0.0, 0.0)
+    
+    @staticmethod
+    def rebuild(challenge):
+        """
+        Rebuild a challenge's buckets from its trade history
+        
+        Only needed once for challenges that traded before the buckets
+        existed, normal trading keeps them up to date incrementally.
+        
+        Args:
+            challenge (UserChallenge): Challenge to rebuild
+        
+        Returns:
+            int: Number of days written
+        """
+        DailyPnl.query.filter_by(challenge_id=challenge.id).delete(synchronize_session=False)
+        
+        trades = db.session.query(Trade.created_at, Trade.profit_loss, Trade.status).filter(
+            Trade.challenge_id == challenge.id
+        ).yield_per(10000)
+        DailyPnlService.add_trades(challenge.id, trades, calendar=challenge.trading_calendar)
+        db.session.commit()
+        
+        return DailyPnl.query.filter_by(challenge_id=challenge.id).count()
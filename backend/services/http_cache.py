@@ -0,0 +1,73 @@
+"""
+HTTP caching helpers
+Strong ETags, 304 Not Modified and Cache-Control for polled endpoints
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
+
+from flask import Response, request
+
+from services.compression import CONTENT_CODINGS
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag value from version parts
+
+    Args:
+        *parts: Anything identifying the response version (sequence numbers,
+                query parameters, content hashes)
+
+    Returns:
+        str: Opaque ETag value (without quotes)
+    """
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def content_etag(payload) -> str:
+    """ETag derived from the content of a JSON-serializable payload"""
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag: str, max_age: int) -> Optional[Response]:
+    """
+    Short-circuit with 304 when the client already holds this version
+
+    Call before building the body so unchanged data costs no serialization.
+    Compressed representations carry the ETag with a "-<coding>" suffix and
+    are matched as well.
+
+    Returns:
+        Response: 304 response, or None if the body has to be sent
+    """
+    for candidate in (etag, *(f'{etag}-{coding}' for coding in CONTENT_CODINGS)):
+        if request.if_none_match.contains(candidate):
+            return cacheable(Response(status=304), candidate, max_age)
+    return None
+
+
+def cacheable(response: Response, etag: str, max_age: int,
+              last_modified: Optional[datetime] = None) -> Response:
+    """
+    Attach validators and freshness information to a response
+
+    Args:
+        response (Response): Response to decorate
+        etag (str): Strong ETag value
+        max_age (int): Seconds the response may be reused, matches the data cache TTL
+        last_modified (datetime, optional): When the underlying data last changed
+
+    Returns:
+        Response: The same response
+    """
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = int(max_age)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
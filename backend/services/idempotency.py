@@ -0,0 +1,143 @@
+"""
+Idempotency
+Replay the original response of a retried order instead of executing it again
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional, Tuple
+
+from flask import Response, jsonify, make_response, request
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Marker stored while the first request with a key is still executing
+_IN_FLIGHT = object()
+
+
+class IdempotencyStore:
+    """
+    Bounded TTL store of responses keyed by (user, path, Idempotency-Key)
+
+    Entries live in an OrderedDict in insertion order. All entries share the
+    same TTL, so the oldest entry is always at the front: lookups are a
+    dict access, and expiry and the size bound only ever pop from the front.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Tuple, Tuple[float, str, object]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reserve(self, key: Tuple, fingerprint: str):
+        """
+        Claim a key for a new request
+
+        Returns:
+            None if the caller should execute the request, otherwise the
+            stored (fingerprint, response) pair; the response is the in-flight
+            marker while the first request has not finished
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[1], entry[2]
+            self._entries[key] = (now + self.ttl, fingerprint, _IN_FLIGHT)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return None
+
+    def complete(self, key: Tuple, response: Optional[Tuple[bytes, int, str]]):
+        """Store the final response of a reserved key, or release it with None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if response is None:
+                del self._entries[key]
+            else:
+                self._entries[key] = (entry[0], entry[1], response)
+
+    def _expire(self, now: float):
+        """Drop expired entries from the front (caller must hold the lock)"""
+        while self._entries:
+            expires_at = next(iter(self._entries.values()))[0]
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+
+def idempotent(store: Optional[IdempotencyStore] = None):
+    """
+    Decorator making a JWT-protected POST endpoint safe to retry
+
+    Place it under @jwt_required() so the user scopes the key. Requests
+    without the Idempotency-Key header are executed as usual. A repeated key
+    returns the stored response with an Idempotent-Replayed header; a key
+    reused with a different body is rejected with 422, and a retry arriving
+    while the original is still executing gets 409. 5xx responses are not
+    stored so the client can retry them.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(user, *args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return f(user, *args, **kwargs)
+
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return jsonify({
+                    'success': False,
+                    'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+                }), 400
+
+            target = store or idempotency_store
+            key = (user.id, request.path, idempotency_key)
+            fingerprint = hashlib.sha1(request.get_data()).hexdigest()
+
+            existing = target.reserve(key, fingerprint)
+            if existing is not None:
+                stored_fingerprint, stored = existing
+                if stored_fingerprint != fingerprint:
+                    return jsonify({
+                        'success': False,
+                        'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'
+                    }), 422
+                if stored is _IN_FLIGHT:
+                    return jsonify({
+                        'success': False,
+                        'error': 'A request with this Idempotency-Key is still being processed'
+                    }), 409
+                body, status, mimetype = stored
+                replay = Response(body, status=status, mimetype=mimetype)
+                replay.headers['Idempotent-Replayed'] = 'true'
+                return replay
+
+            try:
+                response = make_response(f(user, *args, **kwargs))
+            except Exception:
+                target.complete(key, None)
+                raise
+
+            if response.status_code >= 500:
+                target.complete(key, None)
+            else:
+                target.complete(key, (response.get_data(), response.status_code, response.mimetype))
+            return response
+
+        return decorated_function
+    return decorator
+
+
+# Global instance (per process, like the other in-memory engines)
+idempotency_store = IdempotencyStore()
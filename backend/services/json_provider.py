@@ -0,0 +1,88 @@
+"""
+JSON serialization for API responses
+Pluggable Flask JSON provider with native datetime and float handling
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(obj):
+    """Fallback for types neither encoder handles natively"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(JSONProvider):
+    """
+    Standard library encoder
+
+    Datetimes are written as ISO 8601 (same as `isoformat()`), so models can
+    hand raw datetime values to `jsonify` instead of formatting every row.
+    """
+
+    name = 'stdlib'
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    orjson encoder
+
+    Serializes datetimes, floats and numpy values natively in Rust and writes
+    bytes straight into the response without an intermediate str.
+    """
+
+    name = 'orjson'
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self.options)
+        return self._app.response_class(body, mimetype='application/json')
+
+
+PROVIDERS = {
+    'stdlib': StdlibJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+
+def init_json(app):
+    """
+    Install the JSON provider selected by JSON_SERIALIZER ('orjson' or 'stdlib')
+
+    Falls back to the standard library when orjson is not installed.
+    """
+    name = app.config.get('JSON_SERIALIZER', 'orjson')
+    if name == 'orjson' and orjson is None:
+        name = 'stdlib'
+    app.json = PROVIDERS[name](app)
@@ -0,0 +1,425 @@
+"""
+Mark-to-Market Engine
+Revalues every open position of every tracked challenge in one NumPy pass
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.real_time_data import market_for_symbol, real_time_service
+from services.trading_calendar import DEFAULT_CALENDAR, get_calendar
+
+
+class MarkToMarketEngine:
+    """
+    Columnar position book with vectorized revaluation
+
+    Positions are stored as parallel arrays (challenge index, symbol index,
+    quantity, average cost, realized P&L) and prices as one array indexed by
+    symbol. A price batch updates the price array and recomputes market value,
+    exposure, unrealized P&L and equity for all challenges with a handful of
+    `np.bincount` reductions, however many positions there are.
+
+    Fills only touch the challenge they belong to: its rows are updated in
+    place and its aggregates recomputed from those rows.
+
+    Every revaluation also raises each challenge's equity high-water mark
+    and the intraday peak of its current trading day (in its own trading
+    calendar) with an elementwise maximum, so drawdown from the peak is
+    known without rescanning history. Challenges whose drawdown reaches
+    their max trailing drawdown are handed to `on_drawdown` once, and raised
+    peaks are collected for persistence with take_peaks().
+    """
+
+    def __init__(self, poll_interval: float = 10, fetcher: Optional[Callable[[str], Dict]] = None,
+                 capacity: int = 1024):
+        self.poll_interval = poll_interval
+        self.fetcher = fetcher or (lambda symbol: real_time_service.get_live_price(symbol, market_for_symbol(symbol)))
+        self.marked_at: Optional[float] = None
+
+        # Position columns, the first `_size` rows are in use
+        self._size = 0
+        self._ci = np.zeros(capacity, dtype=np.int32)
+        self._si = np.zeros(capacity, dtype=np.int32)
+        self._qty = np.zeros(capacity, dtype=np.float64)
+        self._cost = np.zeros(capacity, dtype=np.float64)
+        self._realized = np.zeros(capacity, dtype=np.float64)
+        self._slots: Dict[Tuple[int, int], int] = {}
+        self._rows_by_challenge: Dict[int, List[int]] = {}
+
+        # Symbol axis
+        self._symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self._prices = np.zeros(64, dtype=np.float64)
+
+        # Challenge axis
+        self._challenge_ids: List[int] = []
+        self._challenge_index: Dict[int, int] = {}
+        self._stale = set()
+        self._balance = np.zeros(64, dtype=np.float64)
+        self._market_value = np.zeros(64, dtype=np.float64)
+        self._exposure = np.zeros(64, dtype=np.float64)
+        self._unrealized = np.zeros(64, dtype=np.float64)
+        self._realized_total = np.zeros(64, dtype=np.float64)
+
+        # Equity peaks per challenge, day peaks are for the current day of the challenge's calendar
+        self._peak = np.full(64, -np.inf)
+        self._day_peak = np.full(64, -np.inf)
+        self._max_drawdown = np.full(64, np.inf)
+        self._peak_dirty = np.zeros(64, dtype=bool)
+        self._drawdown_notified = np.zeros(64, dtype=bool)
+        self.on_drawdown: Optional[Callable[[int], None]] = None
+
+        # Trading calendars in use: index per challenge, current day per calendar
+        # and the earliest end of those days, before which there is nothing to roll
+        self._calendar = np.zeros(64, dtype=np.int32)
+        self._calendar_names: List[str] = []
+        self._peak_days: List[date] = []
+        self._next_rollover = 0.0
+        self._calendar_slot(DEFAULT_CALENDAR)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def equity(self) -> Dict[int, float]:
+        """Equity of every tracked challenge as of the last revaluation"""
+        with self._lock:
+            count = len(self._challenge_ids)
+            equity = self._balance[:count] + self._market_value[:count]
+            return dict(zip(self._challenge_ids, equity.tolist()))
+
+    def is_tracked(self, challenge_id: int) -> bool:
+        """True when a challenge's positions are loaded and up to date"""
+        return challenge_id in self._challenge_index and challenge_id not in self._stale
+
+    def sync(self, challenge_id: int, balance: float, positions: Iterable,
+             marks: Optional[Dict[str, float]] = None, high_water_mark: Optional[float] = None,
+             day_peak: Optional[float] = None, max_drawdown: Optional[float] = None,
+             calendar: Optional[str] = None) -> None:
+        """
+        Load or refresh one challenge from its Position rows
+
+        A position's last fill price is used as the mark of a symbol that has
+        not been priced yet.
+
+        Args:
+            challenge_id (int): Challenge ID
+            balance (float): Current cash balance
+            positions (iterable): All Position objects of the challenge
+            marks (dict, optional): {symbol: price} newer than the current marks,
+                                    e.g. the fill prices of the orders just executed
+            high_water_mark (float, optional): Persisted equity peak, the peak never goes below it
+            day_peak (float, optional): Persisted peak of the current trading day
+            max_drawdown (float, optional): Max trailing drawdown from the peak, None for no limit
+            calendar (str, optional): Trading calendar the day peak rolls over with, the default one if None
+        """
+        with self._lock:
+            self._roll_day()
+            ci = self._challenge_slot(challenge_id)
+            self._balance[ci] = balance
+            self._stale.discard(challenge_id)
+
+            k = self._calendar_slot(calendar or DEFAULT_CALENDAR)
+            if k != self._calendar[ci]:
+                self._calendar[ci] = k
+                self._day_peak[ci] = -np.inf
+
+            if high_water_mark is not None:
+                self._peak[ci] = max(self._peak[ci], high_water_mark)
+            if day_peak is not None:
+                self._day_peak[ci] = max(self._day_peak[ci], day_peak)
+            self._max_drawdown[ci] = np.inf if max_drawdown is None else max_drawdown
+            self._drawdown_notified[ci] = False
+
+            # Rows not in `positions` (e.g. from a rolled back fill) go flat
+            for row in self._rows_by_challenge.get(ci, []):
+                self._qty[row] = 0.0
+                self._cost[row] = 0.0
+                self._realized[row] = 0.0
+
+            for position in positions:
+                si = self._symbol_slot(position.symbol)
+                row = self._slots.get((ci, si))
+                if row is None:
+                    row = self._append_row(ci, si)
+                self._qty[row] = position.quantity
+                self._cost[row] = position.average_cost
+                self._realized[row] = position.realized_pnl
+                if not self._prices[si] and position.last_price:
+                    self._prices[si] = position.last_price
+
+            for symbol, price in (marks or {}).items():
+                if symbol in self._symbol_index and price:
+                    self._prices[self._symbol_index[symbol]] = price
+
+            self._revalue_challenge(ci)
+            breached = self._track_peaks(slice(ci, ci + 1))
+        self._notify_drawdown(breached)
+        self._ensure_poller()
+
+    def discard(self, challenge_id: int) -> None:
+        """Mark a challenge as out of date, it is reloaded with sync() on next use"""
+        with self._lock:
+            self._stale.add(challenge_id)
+            # Its peaks may have been taken by a transaction that rolled back
+            ci = self._challenge_index.get(challenge_id)
+            if ci is not None:
+                self._peak_dirty[ci] = True
+
+    def mark(self, prices: Dict[str, float]) -> None:
+        """
+        Apply a price batch and revalue every tracked challenge
+
+        Args:
+            prices (dict): {symbol: price}, unknown symbols are ignored
+        """
+        with self._lock:
+            for symbol, price in prices.items():
+                si = self._symbol_index.get(symbol)
+                if si is not None and price:
+                    self._prices[si] = price
+            self._roll_day()
+            self._revalue_all()
+            breached = self._track_peaks(slice(0, len(self._challenge_ids)))
+            self.marked_at = time.time()
+        self._notify_drawdown(breached)
+
+    def account(self, challenge_id: int, balance: Optional[float] = None) -> Optional[Dict]:
+        """
+        Equity figures of one challenge
+
+        Args:
+            challenge_id (int): Challenge ID
+            balance (float, optional): Fresher cash balance than the one last synced
+
+        Returns:
+            dict: balance, equity, market value, exposure, unrealized and realized P&L,
+                  equity peaks and drawdowns from them, None if the challenge is not tracked
+        """
+        with self._lock:
+            ci = self._challenge_index.get(challenge_id)
+            if ci is None or challenge_id in self._stale:
+                return None
+            if balance is not None:
+                self._balance[ci] = balance
+            self._roll_day()
+
+            market_value = float(self._market_value[ci])
+            equity = float(self._balance[ci]) + market_value
+            peak = max(float(self._peak[ci]), equity)
+            day_peak = max(float(self._day_peak[ci]), equity)
+            return {
+                'balance': float(self._balance[ci]),
+                'equity': round(equity, 2),
+                'market_value': round(market_value, 2),
+                'exposure': round(float(self._exposure[ci]), 2),
+                'unrealized_pnl': round(float(self._unrealized[ci]), 2),
+                'realized_pnl': round(float(self._realized_total[ci]), 2),
+                'high_water_mark': round(peak, 2),
+                'day_peak': round(day_peak, 2),
+                'drawdown': round(peak - equity, 2),
+                'intraday_drawdown': round(day_peak - equity, 2)
+            }
+
+    def take_peaks(self, challenge_ids: Optional[Iterable[int]] = None) -> Dict:
+        """
+        Collect the peaks raised since they were last taken
+
+        Args:
+            challenge_ids (iterable, optional): Only these challenges, all by default
+
+        Returns:
+            dict: {challenge_id: (high_water_mark, day_peak, trading day of day_peak)}
+        """
+        with self._lock:
+            self._roll_day()
+            count = len(self._challenge_ids)
+            if challenge_ids is None:
+                rows = np.flatnonzero(self._peak_dirty[:count])
+            else:
+                rows = np.array([self._challenge_index[challenge_id] for challenge_id in challenge_ids
+                                 if challenge_id in self._challenge_index], dtype=np.int64)
+                rows = rows[self._peak_dirty[rows]]
+
+            self._peak_dirty[rows] = False
+            peak = self._peak[rows]
+            day_peak = self._day_peak[rows]
+            rows = rows[np.isfinite(peak) & np.isfinite(day_peak)]
+            ids = [self._challenge_ids[ci] for ci in rows.tolist()]
+            days = [self._peak_days[k] for k in self._calendar[rows].tolist()]
+            return dict(zip(ids, zip(self._peak[rows].tolist(), self._day_peak[rows].tolist(), days)))
+
+    def held_symbols(self) -> List[str]:
+        """Symbols with a non-zero quantity in any tracked challenge"""
+        with self._lock:
+            held = np.unique(self._si[:self._size][self._qty[:self._size] != 0])
+            return [self._symbols[si] for si in held.tolist()]
+
+    def _revalue_all(self):
+        """Recompute every challenge's aggregates in one pass (caller must hold the lock)"""
+        n = self._size
+        count = len(self._challenge_ids)
+        ci = self._ci[:n]
+        qty = self._qty[:n]
+        mark = self._prices[self._si[:n]]
+        value = qty * mark
+
+        self._market_value[:count] = np.bincount(ci, weights=value, minlength=count)
+        self._exposure[:count] = np.bincount(ci, weights=np.abs(value), minlength=count)
+        self._unrealized[:count] = np.bincount(ci, weights=qty * (mark - self._cost[:n]), minlength=count)
+        self._realized_total[:count] = np.bincount(ci, weights=self._realized[:n], minlength=count)
+
+    def _revalue_challenge(self, ci: int):
+        """Recompute one challenge's aggregates from its rows (caller must hold the lock)"""
+        rows = np.fromiter(self._rows_by_challenge.get(ci, []), dtype=np.int64)
+        qty = self._qty[rows]
+        mark = self._prices[self._si[rows]]
+        value = qty * mark
+
+        self._market_value[ci] = value.sum()
+        self._exposure[ci] = np.abs(value).sum()
+        self._unrealized[ci] = (qty * (mark - self._cost[rows])).sum()
+        self._realized_total[ci] = self._realized[rows].sum()
+
+    def _track_peaks(self, rows: slice) -> List[int]:
+        """
+        Raise the peaks of a range of challenges to their equity (caller must hold the lock)
+
+        Returns:
+            list: Ids of challenges that just reached their max trailing drawdown
+        """
+        equity = self._balance[rows] + self._market_value[rows]
+        raised = (equity > self._peak[rows]) | (equity > self._day_peak[rows])
+        np.maximum(self._peak[rows], equity, out=self._peak[rows])
+        np.maximum(self._day_peak[rows], equity, out=self._day_peak[rows])
+        self._peak_dirty[rows] |= raised
+
+        breached = (self._peak[rows] - equity >= self._max_drawdown[rows]) & ~self._drawdown_notified[rows]
+        self._drawdown_notified[rows] |= breached
+        return [self._challenge_ids[rows.start + i] for i in np.flatnonzero(breached).tolist()]
+
+    def _roll_day(self):
+        """Start new intraday peaks where a calendar's trading day ended (caller must hold the lock)"""
+        if time.time() < self._next_rollover:
+            return
+
+        count = len(self._challenge_ids)
+        ends = []
+        for k, name in enumerate(self._calendar_names):
+            day, _, end = get_calendar(name).locate()
+            ends.append(end)
+            if day != self._peak_days[k]:
+                self._peak_days[k] = day
+                day_peak = self._day_peak[:count]
+                day_peak[self._calendar[:count] == k] = -np.inf
+        self._next_rollover = min(ends)
+
+    def _calendar_slot(self, name: str) -> int:
+        """Index of a trading calendar, tracked from its current day on first use (caller must hold the lock)"""
+        if name in self._calendar_names:
+            return self._calendar_names.index(name)
+
+        day, _, end = get_calendar(name).locate()
+        self._calendar_names.append(name)
+        self._peak_days.append(day)
+        self._next_rollover = min(self._next_rollover, end) if len(self._calendar_names) > 1 else end
+        return len(self._calendar_names) - 1
+
+    def _notify_drawdown(self, challenge_ids: List[int]):
+        """Hand challenges over their max trailing drawdown to `on_drawdown` (outside the lock)"""
+        if self.on_drawdown is None:
+            return
+        for challenge_id in challenge_ids:
+            try:
+                self.on_drawdown(challenge_id)
+            except Exception as e:
+                print(f"Drawdown notification failed for challenge {challenge_id}: {str(e)}")
+
+    def _challenge_slot(self, challenge_id: int) -> int:
+        """Index of a challenge on the challenge axis, allocated on first use"""
+        ci = self._challenge_index.get(challenge_id)
+        if ci is not None:
+            return ci
+
+        ci = len(self._challenge_ids)
+        self._challenge_ids.append(challenge_id)
+        if ci >= len(self._balance):
+            for name in ('_balance', '_market_value', '_exposure', '_unrealized', '_realized_total',
+                         '_peak_dirty', '_drawdown_notified'):
+                setattr(self, name, _grow(getattr(self, name)))
+            self._peak = _grow(self._peak, -np.inf)
+            self._day_peak = _grow(self._day_peak, -np.inf)
+            self._max_drawdown = _grow(self._max_drawdown, np.inf)
+            self._calendar = _grow(self._calendar)
+
+        self._challenge_index[challenge_id] = ci
+        return ci
+
+    def _symbol_slot(self, symbol: str) -> int:
+        """Index of a symbol on the price axis, allocated on first use"""
+        si = self._symbol_index.get(symbol)
+        if si is None:
+            si = len(self._symbols)
+            self._symbols.append(symbol)
+            self._symbol_index[symbol] = si
+            if si >= len(self._prices):
+                self._prices = _grow(self._prices)
+        return si
+
+    def _append_row(self, ci: int, si: int) -> int:
+        """Allocate a position row, doubling the columns when full"""
+        if self._size >= len(self._qty):
+            for name in ('_ci', '_si', '_qty', '_cost', '_realized'):
+                setattr(self, name, _grow(getattr(self, name)))
+
+        row = self._size
+        self._size += 1
+        self._ci[row] = ci
+        self._si[row] = si
+        self._slots[(ci, si)] = row
+        self._rows_by_challenge.setdefault(ci, []).append(row)
+        return row
+
+    def _ensure_poller(self):
+        """Start the background price poller"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self):
+        """Price every held symbol once per interval and revalue"""
+        while True:
+            started = time.time()
+            prices = {}
+            for symbol in self.held_symbols():
+                try:
+                    data = self.fetcher(symbol)
+                except Exception as e:
+                    print(f"Mark-to-market fetch failed for {symbol}: {str(e)}")
+                    continue
+                if 'error' not in data and data.get('price'):
+                    prices[symbol] = data['price']
+
+            if prices:
+                self.mark(prices)
+
+            elapsed = time.time() - started
+            self._wakeup.wait(max(self.poll_interval - elapsed, 0))
+            self._wakeup.clear()
+
+
+def _grow(array: np.ndarray, fill=0) -> np.ndarray:
+    """Double an array's length, keeping its contents"""
+    grown = np.full(len(array) * 2, fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+# Global instance (marks at the same rate the upstream cache expires)
+mtm_engine = MarkToMarketEngine(poll_interval=real_time_service.cache_duration)
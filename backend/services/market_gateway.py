@@ -0,0 +1,272 @@
+"""
+WebSocket Market Data Gateway
+Multiplexes many symbol subscriptions over one connection on asyncio
+"""
+
+import asyncio
+import json
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from services.price_stream import parse_symbols
+from services.quote_delta import QuoteVersions
+from services.real_time_data import real_time_service
+
+MARKETS = ('US', 'CRYPTO', 'MOROCCO')
+
+
+class GatewayConnection:
+    """
+    One connected WebSocket client
+
+    Outgoing prices are conflated per symbol: when the client reads slower
+    than ticks arrive, a newer price replaces the unsent one instead of
+    queueing, so a slow consumer only ever holds the latest value. An unsent
+    delta is replaced by a full snapshot so no changed field gets lost. Idle
+    connections own no task, a flush task only exists while data is pending.
+    """
+
+    __slots__ = ('websocket', 'keys', 'pending', 'flushing', 'delta')
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.keys: Set[Tuple[str, str]] = set()
+        self.pending: Dict[Tuple[str, str], str] = {}
+        self.flushing = False
+        self.delta = False
+
+    def offer(self, key: Tuple[str, str], message: str, snapshot: Optional[Callable[[], str]] = None):
+        """Queue the latest serialized price for a key, replacing any unsent one"""
+        if snapshot is not None and key in self.pending:
+            message = snapshot()
+        self.pending[key] = message
+        if not self.flushing:
+            self.flushing = True
+            asyncio.get_running_loop().create_task(self._flush())
+
+    async def send(self, payload: Dict):
+        """Send a control message to this client"""
+        await self.websocket.send(json.dumps(payload, separators=(',', ':')))
+
+    async def _flush(self):
+        """Drain pending prices, newer ones arriving meanwhile are picked up"""
+        try:
+            while self.pending:
+                key = next(iter(self.pending))
+                message = self.pending.pop(key)
+                await self.websocket.send(message)
+        except Exception:
+            # Connection closed, the handler cleans up subscriptions
+            self.pending.clear()
+        finally:
+            self.flushing = False
+
+
+class MarketDataGateway:
+    """
+    Asyncio WebSocket gateway for live prices
+
+    Keeps a per-symbol subscriber index, polls each subscribed symbol once per
+    interval, serializes every tick once and hands the same string to all of
+    its subscribers.
+
+    Client messages:
+        {"action": "subscribe", "symbols": ["AAPL", "BTC-USD:CRYPTO", "IAM:MOROCCO"]}
+        {"action": "subscribe", "symbols": [...], "delta": true}
+        {"action": "unsubscribe", "symbols": ["AAPL"]}
+        {"action": "ping"}
+
+    Server messages:
+        {"type": "price", "data": {...}}
+        {"type": "snapshot", "symbol", "market", "seq", "full": true, "data": {...}}  (delta mode)
+        {"type": "delta", "symbol", "market", "seq", "full": false, "changes": {...}}  (delta mode)
+        {"type": "subscribed" | "unsubscribed", "symbols": [...]}
+        {"type": "error", "error": "..."}
+    """
+
+    def __init__(self, poll_interval: float = 10, fetcher=None, max_subscriptions: int = 50,
+                 max_concurrent_fetches: int = 8):
+        self.poll_interval = poll_interval
+        self.fetcher = fetcher or real_time_service.get_live_price
+        self.max_subscriptions = max_subscriptions
+        self.subscribers: Dict[Tuple[str, str], Set[GatewayConnection]] = {}
+        self.latest: Dict[Tuple[str, str], str] = {}
+        self.published_seq: Dict[Tuple[str, str], int] = {}
+        self.versions = QuoteVersions()
+        self.connections = 0
+        self._fetch_slots = asyncio.Semaphore(max_concurrent_fetches)
+        self._poller: Optional[asyncio.Task] = None
+
+    async def handler(self, websocket):
+        """Serve one WebSocket connection until it closes"""
+        connection = GatewayConnection(websocket)
+        self.connections += 1
+        try:
+            async for raw in websocket:
+                await self._handle_message(connection, raw)
+        finally:
+            self.connections -= 1
+            self._unsubscribe(connection, list(connection.keys))
+
+    async def _handle_message(self, connection: GatewayConnection, raw):
+        """Dispatch a client control message"""
+        try:
+            message = json.loads(raw)
+            action = message.get('action')
+            symbols = message.get('symbols', [])
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            keys = parse_symbols(','.join(symbols))
+        except (ValueError, AttributeError, TypeError):
+            await connection.send({'type': 'error', 'error': 'Invalid message'})
+            return
+
+        if action == 'ping':
+            await connection.send({'type': 'pong'})
+            return
+
+        invalid = [f'{symbol}:{market}' for symbol, market in keys if market not in MARKETS]
+        if invalid:
+            await connection.send({'type': 'error', 'error': f'Unknown market for: {", ".join(invalid)}'})
+            return
+
+        if action == 'subscribe':
+            if len(connection.keys | set(keys)) > self.max_subscriptions:
+                await connection.send({
+                    'type': 'error',
+                    'error': f'Maximum {self.max_subscriptions} subscriptions per connection'
+                })
+                return
+            if message.get('delta'):
+                connection.delta = True
+            self._subscribe(connection, keys)
+            await connection.send({'type': 'subscribed', 'symbols': [f'{s}:{m}' for s, m in keys]})
+        elif action == 'unsubscribe':
+            self._unsubscribe(connection, keys)
+            await connection.send({'type': 'unsubscribed', 'symbols': [f'{s}:{m}' for s, m in keys]})
+        else:
+            await connection.send({'type': 'error', 'error': 'Action must be subscribe, unsubscribe or ping'})
+
+    def _subscribe(self, connection: GatewayConnection, keys):
+        """Add a connection to the subscriber index and replay the latest prices"""
+        new_keys = []
+        for key in keys:
+            if key not in self.subscribers:
+                self.subscribers[key] = set()
+                new_keys.append(key)
+            self.subscribers[key].add(connection)
+            connection.keys.add(key)
+            if connection.delta and key in self.published_seq:
+                connection.offer(key, self._snapshot_message(key))
+            elif not connection.delta and key in self.latest:
+                connection.offer(key, self.latest[key])
+
+        # A freshly started poller fetches everything right away anyway
+        if not self._ensure_poller():
+            for key in new_keys:
+                asyncio.get_running_loop().create_task(self._fetch_and_publish(key))
+
+    def _unsubscribe(self, connection: GatewayConnection, keys):
+        """Remove a connection from the index, unwatched symbols stop being polled"""
+        for key in keys:
+            connection.keys.discard(key)
+            connection.pending.pop(key, None)
+            watchers = self.subscribers.get(key)
+            if watchers is None:
+                continue
+            watchers.discard(connection)
+            if not watchers:
+                del self.subscribers[key]
+                self.latest.pop(key, None)
+                self.published_seq.pop(key, None)
+
+    def publish(self, key: Tuple[str, str], data: Dict):
+        """Serialize a tick once per format and offer it to every subscriber of the key"""
+        watchers = self.subscribers.get(key)
+        if not watchers:
+            return
+
+        since = self.published_seq.get(key)
+        _, payloads = self.versions.sync({key: data}, since)
+        payload = payloads[key]
+        if payload['seq'] == since:
+            return
+        self.published_seq[key] = payload['seq']
+
+        message = json.dumps({'type': 'price', 'data': data}, separators=(',', ':'))
+        self.latest[key] = message
+
+        delta_message = None
+        snapshot_message = None
+
+        def snapshot():
+            nonlocal snapshot_message
+            if snapshot_message is None:
+                snapshot_message = self._snapshot_message(key)
+            return snapshot_message
+
+        for connection in watchers:
+            if not connection.delta:
+                connection.offer(key, message)
+                continue
+            if delta_message is None:
+                delta_message = json.dumps({
+                    'type': 'snapshot' if payload['full'] else 'delta',
+                    'symbol': key[0],
+                    'market': key[1],
+                    **payload
+                }, separators=(',', ':'))
+            connection.offer(key, delta_message, snapshot)
+
+    def _snapshot_message(self, key: Tuple[str, str]) -> str:
+        """Full quote message for delta connections"""
+        return json.dumps({
+            'type': 'snapshot',
+            'symbol': key[0],
+            'market': key[1],
+            **self.versions.diff(key)
+        }, separators=(',', ':'))
+
+    async def _fetch_and_publish(self, key: Tuple[str, str]):
+        """Fetch one key off the event loop and publish it"""
+        symbol, market = key
+        async with self._fetch_slots:
+            try:
+                data = await asyncio.to_thread(self.fetcher, symbol, market)
+            except Exception as e:
+                print(f"Gateway fetch failed for {symbol}: {str(e)}")
+                return
+        self.publish(key, data)
+
+    async def poll_once(self):
+        """Fetch every subscribed key exactly once and publish the results"""
+        await asyncio.gather(*(self._fetch_and_publish(key) for key in list(self.subscribers)))
+
+    def _ensure_poller(self) -> bool:
+        """Start the poller task on first subscription, returns True if it was started"""
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll_loop())
+            return True
+        return False
+
+    async def _poll_loop(self):
+        """Poll upstream while anyone is subscribed"""
+        while self.subscribers:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await self.poll_once()
+            await asyncio.sleep(max(self.poll_interval - (loop.time() - started), 0))
+
+
+async def serve(host: str = '0.0.0.0', port: int = 5001, poll_interval: float = 10):
+    """
+    Run the gateway forever
+
+    Per-message compression is disabled: it costs tens of kilobytes per
+    connection, which matters when holding tens of thousands of idle sockets.
+    """
+    import websockets
+
+    gateway = MarketDataGateway(poll_interval=poll_interval)
+    async with websockets.serve(gateway.handler, host, port, compression=None, max_size=2 ** 14):
+        print(f"Market data gateway listening on ws://{host}:{port}")
+        await asyncio.Future()
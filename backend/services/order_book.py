@@ -0,0 +1,310 @@
+"""
+Order Book
+Resting limit and stop orders indexed by price level for O(log n) matching
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from challenge_engine import FINAL_STATUSES
+from models import db, Order, UserChallenge
+from services.real_time_data import market_for_symbol, real_time_service
+from services.trade_service import TradeService
+from services.trade_triggers import trade_triggers
+
+ORDER_TYPES = ('LIMIT', 'STOP')
+
+
+class RestingOrder:
+    """Minimal in-memory copy of an open Order row"""
+
+    __slots__ = ('id', 'challenge_id', 'symbol', 'side', 'order_type', 'quantity', 'price')
+
+    def __init__(self, id: int, challenge_id: int, symbol: str, side: str, order_type: str,
+                 quantity: float, price: float):
+        self.id = id
+        self.challenge_id = challenge_id
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.quantity = quantity
+        self.price = price
+
+    @classmethod
+    def from_model(cls, order: Order) -> 'RestingOrder':
+        return cls(order.id, order.challenge_id, order.symbol, order.side, order.order_type,
+                   order.quantity, order.price)
+
+
+class PriceLevels:
+    """
+    Sorted price levels, each holding its orders in arrival order
+
+    Level prices are kept in a sorted list so every order crossed by a tick
+    is found with one bisect; the orders themselves are never scanned.
+    """
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.levels: Dict[float, Dict[int, RestingOrder]] = {}
+        self.count = 0
+
+    def add(self, order: RestingOrder):
+        level = self.levels.get(order.price)
+        if level is None:
+            insort(self.prices, order.price)
+            level = self.levels[order.price] = {}
+        level[order.id] = order
+        self.count += 1
+
+    def remove(self, order: RestingOrder) -> bool:
+        level = self.levels.get(order.price)
+        if level is None or level.pop(order.id, None) is None:
+            return False
+        self.count -= 1
+        if not level:
+            del self.levels[order.price]
+            del self.prices[bisect_left(self.prices, order.price)]
+        return True
+
+    def pop_at_or_below(self, price: float) -> List[RestingOrder]:
+        """Remove and return every order whose level is <= price, lowest first"""
+        end = bisect_right(self.prices, price)
+        return self._pop(0, end)
+
+    def pop_at_or_above(self, price: float) -> List[RestingOrder]:
+        """Remove and return every order whose level is >= price, highest first"""
+        start = bisect_left(self.prices, price)
+        return self._pop(start, len(self.prices))[::-1]
+
+    def _pop(self, start: int, end: int) -> List[RestingOrder]:
+        crossed = []
+        for level_price in self.prices[start:end]:
+            crossed.extend(self.levels.pop(level_price).values())
+        del self.prices[start:end]
+        self.count -= len(crossed)
+        return crossed
+
+
+class SymbolBook:
+    """
+    The four trigger sides of one symbol
+
+    BUY LIMIT fills when the price falls to the limit, SELL LIMIT when it
+    rises to it. BUY STOP triggers when the price rises to the stop, SELL
+    STOP when it falls to it.
+    """
+
+    def __init__(self):
+        self.sides = {
+            ('BUY', 'LIMIT'): PriceLevels(),
+            ('SELL', 'LIMIT'): PriceLevels(),
+            ('BUY', 'STOP'): PriceLevels(),
+            ('SELL', 'STOP'): PriceLevels(),
+        }
+
+    def __len__(self):
+        return sum(levels.count for levels in self.sides.values())
+
+    def add(self, order: RestingOrder):
+        self.sides[(order.side, order.order_type)].add(order)
+
+    def remove(self, order: RestingOrder) -> bool:
+        return self.sides[(order.side, order.order_type)].remove(order)
+
+    def cross(self, price: float) -> List[RestingOrder]:
+        """Remove and return every order triggered by a trade at `price`"""
+        return (self.sides[('BUY', 'LIMIT')].pop_at_or_above(price)
+                + self.sides[('SELL', 'LIMIT')].pop_at_or_below(price)
+                + self.sides[('BUY', 'STOP')].pop_at_or_below(price)
+                + self.sides[('SELL', 'STOP')].pop_at_or_above(price))
+
+
+class OrderEngine:
+    """
+    Per-process book of resting orders
+
+    Open orders are loaded from the database at startup and polled per
+    symbol; a tick finds every crossed order by bisecting that symbol's
+    price levels. Crossed orders are claimed with a guarded
+    `UPDATE ... WHERE status = 'open'` (several workers may hold the same
+    order) and filled at the tick price through TradeService.execute_batch,
+    the same ledger as the market order endpoints.
+    """
+
+    def __init__(self, poll_interval: float = 10, fetcher: Optional[Callable[[str], Dict]] = None):
+        self.poll_interval = poll_interval
+        self.fetcher = fetcher or (lambda symbol: real_time_service.get_live_price(symbol, market_for_symbol(symbol)))
+        self.app = None
+        self._books: Dict[str, SymbolBook] = {}
+        self._orders: Dict[int, RestingOrder] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        """Bind to the Flask app and load the open orders of unfinished challenges into the book"""
+        self.app = app
+        with app.app_context():
+            orders = Order.query.join(UserChallenge, Order.challenge_id == UserChallenge.id).filter(
+                Order.status == 'open',
+                UserChallenge.status.notin_(FINAL_STATUSES)
+            )
+            for order in orders.yield_per(10000):
+                self.add(order)
+
+    def resting_count(self) -> int:
+        return len(self._orders)
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one resting order"""
+        with self._lock:
+            return [symbol for symbol, book in self._books.items() if len(book)]
+
+    def add(self, order: Order):
+        """Index an open Order row"""
+        resting = RestingOrder.from_model(order)
+        with self._lock:
+            book = self._books.get(resting.symbol)
+            if book is None:
+                book = self._books[resting.symbol] = SymbolBook()
+            book.add(resting)
+            self._orders[resting.id] = resting
+        self._ensure_poller()
+
+    def cancel(self, order_id: int) -> bool:
+        """Drop an order from the book, False if it is not resting here"""
+        with self._lock:
+            resting = self._orders.pop(order_id, None)
+            if resting is None:
+                return False
+            return self._books[resting.symbol].remove(resting)
+
+    def evict(self, challenge_id: int) -> int:
+        """
+        Drop every resting order of a challenge from the book
+
+        For challenges that were deleted or can no longer trade: their
+        orders would only be rejected when crossed.
+
+        Returns:
+            int: Number of orders dropped
+        """
+        with self._lock:
+            evicted = [resting for resting in self._orders.values() if resting.challenge_id == challenge_id]
+            for resting in evicted:
+                del self._orders[resting.id]
+                self._books[resting.symbol].remove(resting)
+            return len(evicted)
+
+    def evict_final(self) -> int:
+        """
+        Drop the resting orders of every challenge that reached a final status
+
+        Catches transitions this process was not told about, like the
+        set-based sweep or another worker's rule evaluation.
+
+        Returns:
+            int: Number of orders dropped
+        """
+        with self._lock:
+            challenge_ids = {resting.challenge_id for resting in self._orders.values()}
+        if not challenge_ids:
+            return 0
+
+        final = db.session.query(UserChallenge.id).filter(
+            UserChallenge.id.in_(challenge_ids),
+            UserChallenge.status.in_(FINAL_STATUSES)
+        ).all()
+        return sum(self.evict(challenge_id) for challenge_id, in final)
+
+    def match(self, symbol: str, price: float) -> List[RestingOrder]:
+        """Remove and return the orders of `symbol` crossed by `price`"""
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                return []
+            crossed = book.cross(price)
+            for resting in crossed:
+                self._orders.pop(resting.id, None)
+            return crossed
+
+    def on_tick(self, symbol: str, price: float) -> int:
+        """
+        Fill every order crossed by a new price
+
+        Returns:
+            int: Number of orders filled
+        """
+        crossed = self.match(symbol, price)
+        if not crossed:
+            return 0
+        with self.app.app_context():
+            return self._fill(crossed, price)
+
+    def _fill(self, crossed: List[RestingOrder], price: float) -> int:
+        """Claim and execute crossed orders, one batch per challenge"""
+        by_challenge: Dict[int, List[RestingOrder]] = {}
+        for resting in crossed:
+            by_challenge.setdefault(resting.challenge_id, []).append(resting)
+
+        filled = 0
+        now = datetime.utcnow()
+        for challenge_id, orders in by_challenge.items():
+            claimed = [resting for resting in orders if Order.query.filter_by(id=resting.id, status='open').update(
+                {'status': 'filled', 'fill_price': price, 'filled_at': now}, synchronize_session=False)]
+            if not claimed:
+                db.session.rollback()
+                continue
+
+            challenge = UserChallenge.query.get(challenge_id)
+            batch, error = TradeService.execute_batch(challenge, [
+                {'symbol': resting.symbol, 'side': resting.side, 'quantity': resting.quantity, 'price': price}
+                for resting in claimed
+            ], require_status='ACTIVE')
+
+            if error:
+                # Drop the claim with the batch, then reject what is still open
+                db.session.rollback()
+                Order.query.filter(Order.id.in_([resting.id for resting in claimed]),
+                                   Order.status == 'open').update(
+                    {'status': 'rejected'}, synchronize_session=False)
+                db.session.commit()
+                continue
+            filled += len(claimed)
+
+            # Sold symbols may leave protected BUY trades without shares to close
+            for symbol in {resting.symbol for resting in claimed if resting.side == 'SELL'}:
+                trade_triggers.trim(challenge_id, symbol)
+        return filled
+
+    def _ensure_poller(self):
+        """Start the background price poller"""
+        if self.app is None:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self):
+        """Price every symbol with resting orders once per interval"""
+        while True:
+            started = time.time()
+            for symbol in self.symbols():
+                try:
+                    data = self.fetcher(symbol)
+                    if 'error' not in data and data.get('price'):
+                        self.on_tick(symbol, data['price'])
+                except Exception as e:
+                    print(f"Order engine tick failed for {symbol}: {str(e)}")
+
+            elapsed = time.time() - started
+            self._wakeup.wait(max(self.poll_interval - elapsed, 0))
+            self._wakeup.clear()
+
+
+# Global instance (ticks at the same rate the upstream cache expires)
+order_engine = OrderEngine(poll_interval=real_time_service.cache_duration)
@@ -0,0 +1,231 @@
+"""Position service maintaining the per-challenge position ledger"""
+
+from sqlalchemy import and_, bindparam, case, or_, update
+from models import db, Position, Trade, UserChallenge
+from services.mark_to_market import mtm_engine
+from services.trading_calendar import trading_day
+
+# Quantities below this are treated as flat (float dust from partial sells)
+QUANTITY_EPSILON = 1e-9
+
+
+class PositionService:
+    """Service class for position ledger operations"""
+    
+    @staticmethod
+    def apply_fills(challenge, fills):
+        """
+        Apply fills to the challenge positions in the current transaction
+        
+        Each fill touches a single (challenge, symbol) row, so the ledger is
+        maintained in O(1) per order without reading trade history. Callers
+        must hold the challenge row lock (see TradeService.apply_balance_delta)
+        so concurrent orders cannot interleave on the same position.
+        
+        Args:
+            challenge (UserChallenge): Challenge the fills belong to
+            fills (list): [{"symbol", "side", "quantity", "price"}]
+        
+        Returns:
+            dict: {symbol: Position} for every position of the challenge
+        """
+        # One row per symbol ever traded, never the trade history
+        positions = {
+            position.symbol: position
+            for position in Position.query.filter_by(challenge_id=challenge.id)
+        }
+        
+        for fill in fills:
+            position = positions.get(fill['symbol'])
+            if position is None:
+                position = Position(
+                    challenge_id=challenge.id,
+                    user_id=challenge.user_id,
+                    symbol=fill['symbol'],
+                    quantity=0.0,
+                    average_cost=0.0,
+                    realized_pnl=0.0
+                )
+                db.session.add(position)
+                positions[fill['symbol']] = position
+            
+            quantity = fill['quantity'] if fill['side'].upper() == 'BUY' else -fill['quantity']
+            PositionService._apply(position, quantity, fill['price'])
+        
+        return positions
+    
+    @staticmethod
+    def _apply(position, quantity, price):
+        """
+        Apply one signed fill to a position (average cost method)
+        
+        Args:
+            position (Position): Position to update
+            quantity (float): Signed quantity, positive for BUY, negative for SELL
+            price (float): Fill price
+        """
+        held = position.quantity
+        position.last_price = price
+        
+        if abs(quantity) < QUANTITY_EPSILON:
+            # An empty fill moves nothing but the mark
+            return
+        
+        if abs(held) < QUANTITY_EPSILON or (held > 0) == (quantity > 0):
+            # Opening or adding: blend the average cost
+            total = held + quantity
+            position.average_cost = (held * position.average_cost + quantity * price) / total
+            position.quantity = total
+        else:
+            # Reducing, closing or flipping: realize against the average cost
+            closed = min(abs(quantity), abs(held))
+            direction = 1 if held > 0 else -1
+            position.realized_pnl += closed * (price - position.average_cost) * direction
+            position.quantity = held + quantity
+            
+            if abs(position.quantity) < QUANTITY_EPSILON:
+                position.quantity = 0.0
+                position.average_cost = 0.0
+            elif (position.quantity > 0) != (held > 0):
+                # Flipped through flat, the remainder was opened at this price
+                position.average_cost = price
+    
+    @staticmethod
+    def get_positions(challenge_id, open_only=True):
+        """
+        Get positions for a challenge
+        
+        Args:
+            challenge_id (int): Challenge ID
+            open_only (bool): Skip flat positions
+        
+        Returns:
+            list: Position objects
+        """
+        query = Position.query.filter_by(challenge_id=challenge_id)
+        
+        if open_only:
+            query = query.filter(Position.quantity != 0)
+        
+        return query.order_by(Position.symbol).all()
+    
+    @staticmethod
+    def account_state(challenge, positions=None):
+        """
+        Account summary from the mark-to-market engine
+        
+        Challenges the engine does not track yet are loaded from their
+        position rows first.
+        
+        Args:
+            challenge (UserChallenge): Challenge with an up to date balance
+            positions (iterable, optional): All positions of the challenge, queried if omitted
+        
+        Returns:
+            dict: balance, equity, market value, exposure, unrealized and realized P&L
+        """
+        account = mtm_engine.account(challenge.id, challenge.current_balance)
+        
+        if account is None:
+            if positions is None:
+                positions = Position.query.filter_by(challenge_id=challenge.id).all()
+            PositionService.sync_account(challenge, positions)
+            account = mtm_engine.account(challenge.id)
+        
+        account['challenge_id'] = challenge.id
+        account['challenge_status'] = challenge.status
+        return account
+    
+    @staticmethod
+    def sync_account(challenge, positions, marks=None):
+        """
+        Load or refresh a challenge in the mark-to-market engine
+        
+        The engine's equity peaks start from the persisted ones (the starting
+        balance before any was saved), so a restart does not lower them.
+        
+        Args:
+            challenge (UserChallenge): Challenge with an up to date balance
+            positions (iterable): All positions of the challenge
+            marks (dict, optional): {symbol: price} fill prices newer than the current marks
+        """
+        today = trading_day(challenge.trading_calendar)
+        high_water_mark = challenge.high_water_mark
+        
+        mtm_engine.sync(
+            challenge.id, challenge.current_balance, positions, marks,
+            high_water_mark=high_water_mark if high_water_mark is not None else challenge.initial_balance,
+            day_peak=challenge.day_peak_equity if challenge.day_peak_date == today else None,
+            max_drawdown=challenge.max_trailing_drawdown,
+            calendar=challenge.trading_calendar
+        )
+    
+    @staticmethod
+    def save_peaks(challenge_ids=None):
+        """
+        Persist the equity peaks the engine raised since they were last saved
+        
+        Runs in the current transaction, the caller commits. The UPDATE only
+        ever raises a stored peak, so processes saving concurrently cannot
+        lower each other's.
+        
+        Args:
+            challenge_ids (iterable, optional): Only these challenges, all by default
+        
+        Returns:
+            int: Number of challenges written
+        """
+        peaks = mtm_engine.take_peaks(challenge_ids)
+        if not peaks:
+            return 0
+        
+        statement = update(UserChallenge).where(UserChallenge.id == bindparam('challenge_id')).values(
+            high_water_mark=case(
+                (or_(UserChallenge.high_water_mark.is_(None), UserChallenge.high_water_mark < bindparam('peak')),
+                 bindparam('peak')),
+                else_=UserChallenge.high_water_mark
+            ),
+            day_peak_equity=case(
+                (and_(UserChallenge.day_peak_date == bindparam('day'),
+                      UserChallenge.day_peak_equity >= bindparam('day_peak')),
+                 UserChallenge.day_peak_equity),
+                else_=bindparam('day_peak')
+            ),
+            day_peak_date=bindparam('day')
+        )
+        db.session.connection().execute(statement, [
+            {'challenge_id': challenge_id, 'peak': peak, 'day_peak': day_peak, 'day': day}
+            for challenge_id, (peak, day_peak, day) in peaks.items()
+        ])
+        
+        return len(peaks)
+    
+    @staticmethod
+    def rebuild(challenge):
+        """
+        Rebuild a challenge's positions from its trade history
+        
+        Only needed once for challenges that traded before the ledger
+        existed, normal trading keeps positions up to date incrementally.
+        
+        Args:
+            challenge (UserChallenge): Challenge to rebuild
+        
+        Returns:
+            int: Number of positions written
+        """
+        Position.query.filter_by(challenge_id=challenge.id).delete(synchronize_session=False)
+        
+        trades = Trade.query.filter_by(challenge_id=challenge.id).order_by(Trade.created_at, Trade.id).all()
+        fills = [{
+            'symbol': trade.symbol,
+            'side': trade.trade_type,
+            'quantity': trade.quantity,
+            'price': trade.entry_price
+        } for trade in trades]
+        
+        positions = PositionService.apply_fills(challenge, fills) if fills else {}
+        db.session.commit()
+        mtm_engine.discard(challenge.id)
+        
+        return len(positions)
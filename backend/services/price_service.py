@@ -9,6 +9,8 @@ import threading
 import time
 from typing import Dict, Optional
 
+from services.quote_delta import QuoteVersions
+
 
 class PriceCache:
     """Thread-safe price cache with TTL"""
@@ -56,6 +58,7 @@ class RealTimePriceService:
     
     def __init__(self, cache_ttl: int = 10):
         self.cache = PriceCache(ttl_seconds=cache_ttl)
+        self.versions = QuoteVersions()
         self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
         self.cleanup_thread.start()
     
@@ -0,0 +1,217 @@
+"""
+Price Stream Hub
+Fans out live prices from a single upstream poller to every connected client
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from services.real_time_data import real_time_service
+from services.quote_delta import QuoteVersions, quote_versions
+
+
+def parse_symbols(symbols_str: str, default_market: str = 'US') -> List[Tuple[str, str]]:
+    """
+    Parse a symbol list such as "AAPL,BTC-USD,IAM:MOROCCO"
+
+    Args:
+        symbols_str (str): Comma separated symbols, optionally suffixed with ":MARKET"
+        default_market (str): Market used when no suffix is given
+
+    Returns:
+        list: Unique (symbol, market) keys in request order
+    """
+    keys = []
+    for item in symbols_str.split(','):
+        item = item.strip().upper()
+        if not item:
+            continue
+        symbol, _, market = item.partition(':')
+        key = (symbol, market or default_market.upper())
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def format_sse(event: str, payload: Dict) -> str:
+    """Serialize a payload into a Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+class StreamSubscriber:
+    """
+    A connected stream client with a per-symbol outbox
+
+    At most one message per symbol waits to be sent: a slow client gets the
+    latest value instead of an ever-growing backlog. For delta clients an
+    unsent delta cannot simply be overwritten (its fields would be lost), so
+    it is replaced by a full snapshot instead.
+    """
+
+    def __init__(self, keys: List[Tuple[str, str]], delta: bool = False):
+        self.keys = set(keys)
+        self.delta = delta
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._ready = threading.Condition()
+
+    def push(self, key: Tuple[str, str], message: str, snapshot: Optional[Callable[[], str]] = None):
+        """Queue the message for a key, replacing any unsent one"""
+        with self._ready:
+            if snapshot is not None and key in self._pending:
+                message = snapshot()
+            self._pending[key] = message
+            self._ready.notify()
+
+    def get(self, timeout: float) -> Optional[str]:
+        """Wait for the next message, returns None on timeout"""
+        with self._ready:
+            if not self._pending:
+                self._ready.wait(timeout)
+            if not self._pending:
+                return None
+            return self._pending.pop(next(iter(self._pending)))
+
+
+class PriceStreamHub:
+    """
+    Single upstream poller shared by all stream clients
+
+    Each subscribed (symbol, market) is fetched once per interval no matter
+    how many clients watch it, serialized once and pushed to every subscriber.
+    Unchanged quotes are not pushed at all. Delta clients receive a snapshot
+    first, then only the changed fields (with periodic full snapshots).
+    """
+
+    def __init__(self, poll_interval: float = 10, fetcher=None, versions: Optional[QuoteVersions] = None):
+        self.poll_interval = poll_interval
+        self.fetcher = fetcher or real_time_service.get_live_price
+        self.versions = versions or quote_versions
+        self._subscribers: Dict[Tuple[str, str], Set[StreamSubscriber]] = {}
+        self._latest: Dict[Tuple[str, str], str] = {}
+        self._published_seq: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, keys: List[Tuple[str, str]], delta: bool = False) -> StreamSubscriber:
+        """Register a client for the given keys and replay the latest known prices"""
+        subscriber = StreamSubscriber(keys, delta=delta)
+        new_keys = False
+        with self._lock:
+            for key in subscriber.keys:
+                if key not in self._subscribers:
+                    self._subscribers[key] = set()
+                    new_keys = True
+                self._subscribers[key].add(subscriber)
+                if delta and key in self._published_seq:
+                    subscriber.push(key, self._snapshot_frame(key))
+                elif not delta and key in self._latest:
+                    subscriber.push(key, self._latest[key])
+            self._ensure_poller()
+
+        # Fetch newly watched symbols right away instead of at the next interval
+        if new_keys:
+            self._wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        """Remove a client, symbols nobody watches any more stop being polled"""
+        with self._lock:
+            for key in subscriber.keys:
+                watchers = self._subscribers.get(key)
+                if watchers is None:
+                    continue
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self._subscribers[key]
+                    self._latest.pop(key, None)
+                    self._published_seq.pop(key, None)
+
+    def subscribed_keys(self) -> List[Tuple[str, str]]:
+        """Snapshot of the keys with at least one subscriber"""
+        with self._lock:
+            return list(self._subscribers.keys())
+
+    def client_count(self) -> int:
+        """Number of distinct connected clients"""
+        with self._lock:
+            clients = set()
+            for watchers in self._subscribers.values():
+                clients.update(watchers)
+            return len(clients)
+
+    def publish(self, key: Tuple[str, str], data: Dict):
+        """Serialize a price update once per format and push it to every subscriber of the key"""
+        with self._lock:
+            watchers = list(self._subscribers.get(key, ()))
+            if not watchers:
+                return
+
+            since = self._published_seq.get(key)
+            _, payloads = self.versions.sync({key: data}, since)
+            payload = payloads[key]
+            if payload['seq'] == since:
+                return
+            self._published_seq[key] = payload['seq']
+
+            message = format_sse('price', data)
+            self._latest[key] = message
+
+        delta_message = None
+        snapshot_message = None
+
+        def snapshot():
+            nonlocal snapshot_message
+            if snapshot_message is None:
+                snapshot_message = self._snapshot_frame(key)
+            return snapshot_message
+
+        for subscriber in watchers:
+            if not subscriber.delta:
+                subscriber.push(key, message)
+                continue
+            if delta_message is None:
+                event = 'snapshot' if payload['full'] else 'delta'
+                delta_message = format_sse(event, {'symbol': key[0], 'market': key[1], **payload})
+            subscriber.push(key, delta_message, snapshot)
+
+    def _snapshot_frame(self, key: Tuple[str, str]) -> str:
+        """Full quote frame for delta clients"""
+        return format_sse('snapshot', {'symbol': key[0], 'market': key[1], **self.versions.diff(key)})
+
+    def poll_once(self):
+        """Fetch every subscribed key exactly once and publish the results"""
+        for symbol, market in self.subscribed_keys():
+            try:
+                data = self.fetcher(symbol, market)
+            except Exception as e:
+                print(f"Price stream fetch failed for {symbol}: {str(e)}")
+                continue
+            self.publish((symbol, market), data)
+
+    def _ensure_poller(self):
+        """Start the background poller (caller must hold the lock)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self):
+        """Background thread polling upstream while anyone is subscribed"""
+        while True:
+            if not self.subscribed_keys():
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            started = time.time()
+            self.poll_once()
+
+            elapsed = time.time() - started
+            self._wakeup.wait(max(self.poll_interval - elapsed, 0))
+            self._wakeup.clear()
+
+
+# Global instance (poll at the same rate the upstream cache expires)
+price_stream = PriceStreamHub(poll_interval=real_time_service.cache_duration)
@@ -0,0 +1,171 @@
+"""
+Quote Delta Encoding
+Versions every quote field so clients only receive what changed
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+
+class QuoteEntry:
+    """Latest known quote for a key with the sequence at which each field last changed"""
+
+    __slots__ = ('source', 'data', 'seq', 'field_seqs', 'removed_seqs', 'snapshot_seq', 'updates')
+
+    def __init__(self, data: Dict, seq: int):
+        self.source = data
+        self.data = dict(data)
+        self.seq = seq
+        self.field_seqs = {field: seq for field in data}
+        self.removed_seqs: Dict[str, int] = {}
+        self.snapshot_seq = seq
+        self.updates = 1
+
+
+class QuoteVersions:
+    """
+    Thread-safe field-level version tracker for quotes
+
+    Every change bumps one process-wide sequence number. A client that saw
+    sequence N asks for the delta since N and receives only the fields whose
+    version is newer. Every `snapshot_every` changes of a key a new snapshot
+    point is set: clients behind it receive the full quote, which resyncs any
+    client that missed an update.
+
+    The sequence starts at the current time in milliseconds, so numbers keep
+    growing across restarts and an older client sequence always falls behind
+    the new snapshot points.
+    """
+
+    def __init__(self, snapshot_every: int = 20):
+        self.snapshot_every = snapshot_every
+        self._seq = int(time.time() * 1000)
+        self._entries: Dict[Hashable, QuoteEntry] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def current_seq(self) -> int:
+        """Latest sequence number handed out"""
+        return self._seq
+
+    def update(self, key: Hashable, data: Dict) -> int:
+        """
+        Record the latest quote for a key
+
+        Args:
+            key: Quote identity, e.g. ('AAPL', 'US')
+            data (dict): Quote payload
+
+        Returns:
+            int: Version of the key, only moves when a field actually changed
+        """
+        with self._lock:
+            return self._update(key, data).seq
+
+    def diff(self, key: Hashable, since: Optional[int] = None) -> Optional[Dict]:
+        """
+        Build the payload a client at sequence `since` needs for a key
+
+        Args:
+            key: Quote identity
+            since (int, optional): Last sequence the client saw, None for a snapshot
+
+        Returns:
+            dict: {"seq", "full": True, "data"} or {"seq", "full": False, "changes"[, "removed"]},
+                  None if the key was never recorded
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return self._diff(entry, since) if entry is not None else None
+
+    def sync(self, quotes: Dict[Hashable, Dict], since: Optional[int] = None):
+        """
+        Record several quotes and diff them against `since` in one atomic step
+
+        The returned sequence covers exactly the data returned, so the client
+        can send it back as its next `since` without missing or repeating changes.
+
+        Args:
+            quotes (dict): {key: quote payload}
+            since (int, optional): Last sequence the client saw
+
+        Returns:
+            tuple: (current_seq, {key: diff payload})
+        """
+        with self._lock:
+            payloads = {key: self._diff(self._update(key, data), since)
+                        for key, data in quotes.items()}
+            return self._seq, payloads
+
+    def _update(self, key: Hashable, data: Dict) -> QuoteEntry:
+        """Record a quote (caller must hold the lock)"""
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self._seq += 1
+            entry = QuoteEntry(data, self._seq)
+            self._entries[key] = entry
+            return entry
+
+        # Same cached object as last time, nothing can have changed
+        if entry.source is data:
+            return entry
+
+        previous = entry.data
+        changed = [field for field, value in data.items()
+                   if field not in previous or previous[field] != value]
+        removed = [field for field in previous if field not in data]
+
+        entry.source = data
+        if not changed and not removed:
+            return entry
+
+        self._seq += 1
+        seq = self._seq
+        for field in changed:
+            entry.field_seqs[field] = seq
+            entry.removed_seqs.pop(field, None)
+        for field in removed:
+            entry.field_seqs.pop(field, None)
+            entry.removed_seqs[field] = seq
+
+        entry.data = dict(data)
+        entry.seq = seq
+        entry.updates += 1
+        if entry.updates % self.snapshot_every == 0:
+            entry.snapshot_seq = seq
+        return entry
+
+    def _diff(self, entry: QuoteEntry, since: Optional[int]) -> Dict:
+        """Diff an entry against a client sequence (caller must hold the lock)"""
+        if since is None or since < entry.snapshot_seq or since > self._seq:
+            return {'seq': entry.seq, 'full': True, 'data': dict(entry.data)}
+
+        payload = {
+            'seq': entry.seq,
+            'full': False,
+            'changes': {field: entry.data[field]
+                        for field, seq in entry.field_seqs.items() if seq > since}
+        }
+        removed = [field for field, seq in entry.removed_seqs.items() if seq > since]
+        if removed:
+            payload['removed'] = removed
+        return payload
+
+
+def parse_since(value) -> Optional[int]:
+    """Parse a client supplied sequence number, None if missing or malformed"""
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def has_changes(payload: Dict) -> bool:
+    """True when a diff payload carries anything the client does not have yet"""
+    return payload['full'] or bool(payload['changes']) or bool(payload.get('removed'))
+
+
+# Global instance for live market quotes (real_time_service)
+quote_versions = QuoteVersions()
@@ -12,6 +12,23 @@ from threading import Thread
 import time
 
 
+def market_for_symbol(symbol):
+    """
+    Market a traded symbol is priced on
+    
+    Args:
+        symbol (str): Trading symbol as stored on trades (AAPL, BTC-USD, IAM)
+        
+    Returns:
+        str: 'US', 'CRYPTO' or 'MOROCCO'
+    """
+    if symbol in ['BTC', 'ETH', 'BTC-USD', 'ETH-USD']:
+        return 'CRYPTO'
+    if symbol in ['IAM', 'ATW']:
+        return 'MOROCCO'
+    return 'US'
+
+
 class RealTimeDataService:
     """Service for fetching real-time market data"""
     
@@ -25,16 +42,36 @@ class RealTimeDataService:
         
         Args:
             symbol (str): Stock symbol
-            market (str): 'US' or 'MOROCCO'
+            market (str): 'US', 'CRYPTO' or 'MOROCCO'
             
         Returns:
             dict: Price data with timestamp
         """
         if market.upper() == 'MOROCCO':
             return self.get_morocco_stock(symbol)
+        elif market.upper() == 'CRYPTO':
+            return self.get_crypto(symbol)
         else:
             return self.get_us_stock(symbol)
     
+    def get_crypto(self, symbol):
+        """
+        Get cryptocurrency price using yfinance
+        
+        Args:
+            symbol (str): Crypto symbol (BTC, BTC-USD)
+            
+        Returns:
+            dict: Price data
+        """
+        symbol = symbol.upper()
+        if not symbol.endswith('-USD'):
+            symbol = f"{symbol}-USD"
+        
+        data = dict(self.get_us_stock(symbol))
+        data['market'] = 'CRYPTO'
+        return data
+    
     def get_us_stock(self, symbol):
         """
         Get US stock price using yfinance
@@ -0,0 +1,138 @@
+"""
+Rule Queue
+Challenge rule evaluation moved off the order path and coalesced per challenge
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from challenge_engine import FINAL_STATUSES, apply_rules, calculate_daily_pnl, current_drawdown
+from models import db, UserChallenge
+
+
+class RuleEvaluationQueue:
+    """
+    In-process work queue of challenges awaiting rule evaluation
+
+    Orders commit and enqueue their challenge id. Pending ids are kept in a
+    set, so a burst of orders is coalesced and each challenge is evaluated at
+    most once per batch window. A worker thread drains the set and evaluates
+    every challenge on its locked row, committing any status transition.
+
+    Finalized challenges are remembered in memory so the order path rejects
+    them without a database round trip. The cache only holds what this
+    process has seen, so every order path also passes require_status='ACTIVE'
+    to the status guard of TradeService.apply_balance_delta, which stays the
+    authoritative check. The
+    first time a challenge is seen final it is handed to `on_final`.
+    """
+
+    def __init__(self, window: float = 0.05):
+        self.window = window
+        self.app = None
+        self._pending: Set[int] = set()
+        self._final: Dict[int, str] = {}
+        self.on_final: Optional[Callable[[int], None]] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Bind to the Flask app the worker evaluates in"""
+        self.app = app
+
+    def pending_count(self) -> int:
+        """Number of challenges waiting for evaluation"""
+        return len(self._pending)
+
+    def blocked_status(self, challenge_id: int) -> Optional[str]:
+        """Final status of a challenge if this process has seen it, else None"""
+        return self._final.get(challenge_id)
+
+    def remember(self, challenge) -> None:
+        """Record a challenge's status if it is final"""
+        if challenge.status not in FINAL_STATUSES:
+            return
+        newly_final = challenge.id not in self._final
+        self._final[challenge.id] = challenge.status
+        if newly_final and self.on_final is not None:
+            try:
+                self.on_final(challenge.id)
+            except Exception as e:
+                print(f"Final status notification failed for challenge {challenge.id}: {str(e)}")
+
+    def forget(self, challenge_id: int) -> None:
+        """Drop a remembered final status, for deleted or reactivated challenges"""
+        self._final.pop(challenge_id, None)
+
+    def submit(self, challenge_id: int) -> None:
+        """Queue a challenge for evaluation, a no-op if it is already pending"""
+        with self._lock:
+            self._pending.add(challenge_id)
+            self._wakeup.set()
+        self._ensure_worker()
+
+    def evaluate(self, challenge_id: int) -> Optional[Dict]:
+        """
+        Evaluate one challenge and commit its status transition
+
+        The challenge row is locked first, so the balance and today's P&L
+        are read consistently with the orders that moved them.
+
+        Returns:
+            dict: Evaluation result, None if the challenge does not exist
+        """
+        challenge = UserChallenge.query.filter_by(id=challenge_id).with_for_update().first()
+        if challenge is None:
+            db.session.rollback()
+            return None
+
+        daily_pnl = calculate_daily_pnl(challenge_id, challenge.trading_calendar)
+        evaluation = apply_rules(challenge, daily_pnl, current_drawdown(challenge))
+        db.session.commit()
+        self.remember(challenge)
+        return evaluation
+
+    def flush(self) -> int:
+        """
+        Evaluate everything pending in the calling thread
+
+        Returns:
+            int: Number of challenges evaluated
+        """
+        with self._lock:
+            batch, self._pending = self._pending, set()
+        for challenge_id in batch:
+            try:
+                self.evaluate(challenge_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Rule evaluation failed for challenge {challenge_id}: {str(e)}")
+        return len(batch)
+
+    def _ensure_worker(self):
+        """Start the background worker"""
+        if self.app is None:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Wait for work, let the batch window fill, then evaluate it"""
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.window)
+            with self._lock:
+                self._wakeup.clear()
+            with self.app.app_context():
+                self.flush()
+
+
+# Global instance
+rule_queue = RuleEvaluationQueue()
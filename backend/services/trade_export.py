@@ -0,0 +1,177 @@
+"""
+Trade Export
+Streams a user's full trade history as CSV, NDJSON or Parquet in constant memory
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, Trade
+from services.trade_service import TRADE_HISTORY_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional, Parquet exports are unavailable
+    pa = None
+    pq = None
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Rows fetched from the server-side cursor per chunk
+EXPORT_CHUNK_SIZE = 5000
+
+COLUMN_NAMES = [column.key for column in TRADE_HISTORY_COLUMNS]
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def iter_trade_chunks(user_id: int, challenge_id: Optional[int] = None,
+                      chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List]:
+    """
+    Yield the user's trades oldest first, `chunk_size` rows at a time
+
+    yield_per makes the driver use a server-side cursor (SSCursor on
+    MySQL), so only one chunk of column tuples is ever held in memory.
+    """
+    query = select(*TRADE_HISTORY_COLUMNS).where(Trade.user_id == user_id)
+
+    if challenge_id:
+        query = query.where(Trade.challenge_id == challenge_id)
+
+    query = query.order_by(Trade.created_at, Trade.id).execution_options(yield_per=chunk_size)
+    result = db.session.execute(query)
+    try:
+        for rows in result.partitions():
+            yield rows
+    finally:
+        result.close()
+
+
+def csv_stream(chunks: Iterable[List]) -> Iterator[bytes]:
+    """Header line, then one CSV block per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+
+    for rows in chunks:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_stream(chunks: Iterable[List]) -> Iterator[bytes]:
+    """One JSON object per line, one block per chunk"""
+    dumps = current_app.json.dumps
+    for rows in chunks:
+        yield ''.join(dumps(row._asdict()) + '\n' for row in rows).encode('utf-8')
+
+
+class _ChunkSink:
+    """
+    Write-only file object handing out what was written since the last drain
+
+    ParquetWriter records absolute offsets in the footer, so tell() reports
+    the total bytes written even though drained bytes are no longer held.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_stream(chunks: Iterable[List]) -> Iterator[bytes]:
+    """One Parquet row group per chunk, footer last"""
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('challenge_id', pa.int64()),
+        ('symbol', pa.string()),
+        ('trade_type', pa.string()),
+        ('quantity', pa.float64()),
+        ('entry_price', pa.float64()),
+        ('exit_price', pa.float64()),
+        ('profit_loss', pa.float64()),
+        ('stop_loss', pa.float64()),
+        ('take_profit', pa.float64()),
+        ('status', pa.string()),
+        ('created_at', pa.timestamp('us')),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+    'parquet': parquet_stream,
+}
+
+
+def export_trades(user_id: int, export_format: str, challenge_id: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Stream a trade history export
+
+    Args:
+        user_id (int): Owner of the trades
+        export_format (str): 'csv', 'ndjson' or 'parquet'
+        challenge_id (int, optional): Only export this challenge
+
+    Returns:
+        iterator: Body chunks, to be sent as a chunked response
+    """
+    return EXPORT_WRITERS[export_format](iter_trade_chunks(user_id, challenge_id))
@@ -0,0 +1,175 @@
+"""
+Trade Journal
+Group commit for market orders: many request threads, one transaction per few milliseconds
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models import db, UserChallenge
+from services.mark_to_market import mtm_engine
+from services.rule_queue import rule_queue
+from services.trade_service import TradeService
+
+
+class PendingOrder:
+    """An order waiting for its group to be committed"""
+
+    __slots__ = ('challenge_id', 'args', 'result', 'done')
+
+    def __init__(self, challenge_id: int, args: Tuple):
+        self.challenge_id = challenge_id
+        self.args = args
+        self.result: Tuple[Optional[Dict], Optional[str]] = (None, "Order was not processed")
+        self.done = threading.Event()
+
+
+class TradeJournal:
+    """
+    Single writer appending market orders to the trades table in groups
+
+    Request threads enqueue their order and block. The writer takes the
+    first waiting order, gathers whatever else arrives within `window`
+    seconds (up to `max_batch` orders) and records them all with
+    TradeService.record_order in one transaction. Callers are released only
+    after that transaction has committed, so a returned fill is durable;
+    the database pays one commit (one log flush) for the whole group. If the
+    group fails as a whole it is rolled back and its orders are replayed
+    one commit each, so a bad order cannot fail its neighbours.
+
+    Orders are recorded in challenge id order, arrival order within a
+    challenge, so the challenge row locks are always taken in the same order.
+    """
+
+    def __init__(self, window: float = 0.002, max_batch: int = 256):
+        self.window = window
+        self.max_batch = max_batch
+        self.enabled = True
+        self.app = None
+        self._queue: 'queue.Queue[PendingOrder]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Bind to the Flask app and read TRADE_GROUP_COMMIT* settings"""
+        self.app = app
+        self.enabled = app.config.get('TRADE_GROUP_COMMIT', True)
+        self.window = app.config.get('TRADE_GROUP_COMMIT_WINDOW_MS', self.window * 1000) / 1000.0
+
+    def execute_order(self, challenge, symbol, side, quantity, price, require_status=None,
+                      stop_loss=None, take_profit=None):
+        """
+        Drop-in replacement for TradeService.execute_order
+
+        Returns:
+            tuple: ({"trade", "account"}, error_message), once the order's group is committed
+        """
+        if not self.enabled or self.app is None:
+            return TradeService.execute_order(
+                challenge, symbol, side, quantity, price, require_status, stop_loss, take_profit
+            )
+
+        blocked = rule_queue.blocked_status(challenge.id)
+        if blocked:
+            return None, f"Challenge is {blocked}. Cannot execute trades."
+
+        order = PendingOrder(challenge.id, (symbol, side, quantity, price, require_status, stop_loss, take_profit))
+
+        # End the caller's transaction (as execute_order would) so its pooled
+        # connection is free while it waits, otherwise waiting requests starve the writer
+        db.session.commit()
+
+        self._ensure_writer()
+        self._queue.put(order)
+        order.done.wait()
+        return order.result
+
+    def _ensure_writer(self):
+        """Start the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Gather a group, write it, release its callers, repeat"""
+        while True:
+            group = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(group) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    group.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                with self.app.app_context():
+                    self._write(group)
+            except Exception as e:
+                for order in group:
+                    order.result = (None, f"Failed to execute order: {str(e)}")
+            finally:
+                for order in group:
+                    order.done.set()
+
+    def _write(self, group: List[PendingOrder]):
+        """Record a group of orders in one transaction (runs in the writer thread)"""
+        ordered = sorted(group, key=lambda pending: pending.challenge_id)
+
+        try:
+            filled = self._record(ordered)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for challenge_id in {order.challenge_id for order in ordered}:
+                mtm_engine.discard(challenge_id)
+            # Nothing was committed: isolate the failing order by committing each on its own
+            for order in ordered:
+                challenge = db.session.get(UserChallenge, order.challenge_id)
+                if challenge is None:
+                    order.result = (None, "Challenge not found")
+                else:
+                    order.result = TradeService.execute_order(challenge, *order.args)
+            return
+
+        for challenge_id in {order.challenge_id for order in filled}:
+            rule_queue.submit(challenge_id)
+
+    def _record(self, ordered: List[PendingOrder]) -> List[PendingOrder]:
+        """
+        Record every order of a group without committing
+
+        A rejected order writes nothing, so it simply gets its error and the
+        group goes on; an exception aborts the whole group.
+
+        Returns:
+            list: Orders that were filled
+        """
+        filled = []
+        challenges: Dict[int, Optional[UserChallenge]] = {}
+
+        for order in ordered:
+            if order.challenge_id not in challenges:
+                challenges[order.challenge_id] = db.session.get(UserChallenge, order.challenge_id)
+            challenge = challenges[order.challenge_id]
+            if challenge is None:
+                order.result = (None, "Challenge not found")
+                continue
+
+            fill, error = TradeService.record_order(challenge, *order.args)
+            order.result = (fill, error)
+            if not error:
+                filled.append(order)
+
+        return filled
+
+
+# Global instance
+trade_journal = TradeJournal()
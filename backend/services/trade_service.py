@@ -1,7 +1,23 @@
 """Trade service for trade management and execution"""
 
+import base64
 from datetime import datetime
+from sqlalchemy import and_, case, func, insert, or_
 from models import db, Trade, UserChallenge
+from services.position_service import PositionService
+from services.daily_pnl_service import DailyPnlService
+from services.mark_to_market import mtm_engine
+from services.rule_queue import rule_queue
+from services.trading_calendar import trading_day
+
+# Columns returned by the trade history, selected as plain tuples
+TRADE_HISTORY_COLUMNS = (
+    Trade.id, Trade.challenge_id, Trade.symbol, Trade.trade_type, Trade.quantity,
+    Trade.entry_price, Trade.exit_price, Trade.profit_loss, Trade.stop_loss,
+    Trade.take_profit, Trade.status, Trade.created_at
+)
+
+MAX_PAGE_SIZE = 500
 
 
 class TradeService:
@@ -29,7 +45,7 @@ class TradeService:
             if not challenge:
                 return None, "Challenge not found"
             
-            if challenge.status != 'active':
+            if challenge.status != 'ACTIVE':
                 return None, "Challenge is not active"
             
             if challenge.user_id != user_id:
@@ -59,6 +75,222 @@ class TradeService:
             db.session.rollback()
             return None, f"Failed to create trade: {str(e)}"
     
+    @staticmethod
+    def execute_order(challenge, symbol, side, quantity, price, require_status=None,
+                      stop_loss=None, take_profit=None):
+        """
+        Record a market fill and move the challenge balance atomically
+        
+        The balance is changed with a single in-database
+        `UPDATE ... SET current_balance = current_balance + :pnl`, so
+        concurrent orders on the same challenge serialize on its row lock
+        instead of overwriting each other's read-modify-write. The challenge
+        rules are evaluated after the commit by the rule queue; challenges it
+        has already finalized are rejected before touching the database.
+        
+        Args:
+            challenge (UserChallenge): Challenge the order belongs to
+            symbol (str): Trading symbol
+            side (str): 'BUY' or 'SELL'
+            quantity (float): Quantity filled
+            price (float): Fill price
+            require_status (str, optional): Only fill while the challenge has this status
+            stop_loss (float, optional): Protective stop for a BUY
+            take_profit (float, optional): Profit target for a BUY
+            
+        Returns:
+            tuple: ({"trade", "account"}, error_message)
+        """
+        try:
+            fill, error = TradeService.record_order(
+                challenge, symbol, side, quantity, price, require_status, stop_loss, take_profit
+            )
+            
+            if error:
+                db.session.rollback()
+                return None, error
+            
+            db.session.commit()
+            rule_queue.submit(challenge.id)
+            
+            return fill, None
+            
+        except Exception as e:
+            db.session.rollback()
+            mtm_engine.discard(challenge.id)
+            return None, f"Failed to execute order: {str(e)}"
+    
+    @staticmethod
+    def record_order(challenge, symbol, side, quantity, price, require_status=None,
+                     stop_loss=None, take_profit=None):
+        """
+        Record a market fill in the current transaction without committing
+        
+        Shared by execute_order (one commit per order) and the trade journal
+        (one commit per group of orders). A rejected order writes nothing,
+        so the caller's transaction can carry on with other orders.
+        
+        Args:
+            See execute_order
+            
+        Returns:
+            tuple: ({"trade", "account"}, error_message)
+        """
+        blocked = rule_queue.blocked_status(challenge.id)
+        if blocked:
+            return None, f"Challenge is {blocked}. Cannot execute trades."
+        
+        side = side.upper()
+        trade_value = quantity * price
+        
+        # Simplified cash accounting: BUY spends the trade value, SELL receives it
+        profit_loss = -trade_value if side == 'BUY' else trade_value
+        
+        if not TradeService.apply_balance_delta(challenge, profit_loss, require_status):
+            db.session.refresh(challenge)
+            rule_queue.remember(challenge)
+            return None, f"Challenge is {challenge.status}. Cannot execute trades."
+        
+        now = datetime.utcnow()
+        DailyPnlService.add(challenge.id, trading_day(challenge.trading_calendar, now), profit_loss,
+                            profit_loss if side == 'SELL' else 0.0)
+        
+        trade = Trade(
+            challenge_id=challenge.id,
+            user_id=challenge.user_id,
+            symbol=symbol,
+            trade_type=side.lower(),
+            quantity=quantity,
+            entry_price=price,
+            exit_price=price if side == 'SELL' else None,
+            profit_loss=profit_loss,
+            stop_loss=stop_loss if side == 'BUY' else None,
+            take_profit=take_profit if side == 'BUY' else None,
+            status='closed' if side == 'SELL' else 'open',
+            created_at=now
+        )
+        
+        db.session.add(trade)
+        positions = PositionService.apply_fills(challenge, [
+            {'symbol': symbol, 'side': side, 'quantity': quantity, 'price': price}
+        ])
+        db.session.flush()
+        
+        PositionService.sync_account(challenge, positions.values(), {symbol: price})
+        PositionService.save_peaks([challenge.id])
+        
+        return {
+            'trade': trade.to_dict(),
+            'account': PositionService.account_state(challenge)
+        }, None
+    
+    @staticmethod
+    def execute_batch(challenge, orders, require_status=None):
+        """
+        Record several market fills in one transaction
+        
+        All Trade rows go in with a single multi-row INSERT and the balance
+        moves once by the combined delta, so a burst of orders costs one
+        UPDATE, one INSERT and one commit. The challenge is queued for rule
+        evaluation once for the whole batch.
+        
+        Args:
+            challenge (UserChallenge): Challenge the orders belong to
+            orders (list): [{"symbol", "side", "quantity", "price"}] already priced
+            require_status (str, optional): Only fill while the challenge has this status
+        
+        Returns:
+            tuple: ({"rows", "account"}, error_message), rows are the inserted
+                   trade values in order
+        """
+        blocked = rule_queue.blocked_status(challenge.id)
+        if blocked:
+            db.session.rollback()
+            return None, f"Challenge is {blocked}. Cannot execute trades."
+        
+        now = datetime.utcnow()
+        rows = []
+        
+        for order in orders:
+            side = order['side'].upper()
+            trade_value = order['quantity'] * order['price']
+            profit_loss = -trade_value if side == 'BUY' else trade_value
+            
+            rows.append({
+                'challenge_id': challenge.id,
+                'user_id': challenge.user_id,
+                'symbol': order['symbol'],
+                'trade_type': side.lower(),
+                'quantity': order['quantity'],
+                'entry_price': order['price'],
+                'exit_price': order['price'] if side == 'SELL' else None,
+                'profit_loss': profit_loss,
+                'status': 'closed' if side == 'SELL' else 'open',
+                'created_at': now
+            })
+        
+        if not rows:
+            return None, "No orders to execute"
+        
+        try:
+            total = sum(row['profit_loss'] for row in rows)
+            if not TradeService.apply_balance_delta(challenge, total, require_status):
+                db.session.rollback()
+                db.session.refresh(challenge)
+                rule_queue.remember(challenge)
+                return None, f"Challenge is {challenge.status}. Cannot execute trades."
+            
+            closed = sum(row['profit_loss'] for row in rows if row['status'] == 'closed')
+            DailyPnlService.add(challenge.id, trading_day(challenge.trading_calendar, now), total, closed)
+            
+            db.session.execute(insert(Trade), rows)
+            positions = PositionService.apply_fills(challenge, orders)
+            db.session.flush()
+            
+            marks = {order['symbol']: order['price'] for order in orders}
+            PositionService.sync_account(challenge, positions.values(), marks)
+            PositionService.save_peaks([challenge.id])
+            account = PositionService.account_state(challenge)
+            db.session.commit()
+            rule_queue.submit(challenge.id)
+            
+            return {'rows': rows, 'account': account}, None
+        
+        except Exception as e:
+            db.session.rollback()
+            mtm_engine.discard(challenge.id)
+            return None, f"Failed to execute orders: {str(e)}"
+    
+    @staticmethod
+    def apply_balance_delta(challenge, delta, require_status=None):
+        """
+        Atomically add a delta to a challenge balance in the current transaction
+        
+        Args:
+            challenge (UserChallenge): Challenge to update, balance and status are refreshed
+            delta (float): Amount to add (negative to subtract)
+            require_status (str, optional): Only apply while the challenge has this status
+            
+        Returns:
+            bool: False if the status guard did not match
+        """
+        query = UserChallenge.query.filter(UserChallenge.id == challenge.id)
+        
+        if require_status:
+            query = query.filter(UserChallenge.status == require_status)
+        
+        updated = query.update(
+            {UserChallenge.current_balance: UserChallenge.current_balance + delta},
+            synchronize_session=False
+        )
+        
+        if not updated:
+            return False
+        
+        # Read back our own write, the row stays locked until commit
+        db.session.refresh(challenge, attribute_names=['current_balance', 'status'])
+        return True
+    
     @staticmethod
     def get_trade_by_id(trade_id):
         """
@@ -130,6 +362,78 @@ class TradeService:
         except Exception as e:
             return None, f"Failed to get challenge trades: {str(e)}"
     
+    @staticmethod
+    def get_trade_page(user_id, challenge_id=None, status=None, limit=50, cursor=None):
+        """
+        Get one page of a user's trade history, newest first
+        
+        Keyset pagination on (created_at, id): the cursor is the last row
+        of the previous page, so every page is an index range scan no
+        matter how deep the client has scrolled. Rows are selected as
+        column tuples, no ORM objects are built.
+        
+        Args:
+            user_id (int): User ID
+            challenge_id (int, optional): Filter by challenge ID
+            status (str, optional): Filter by status (open or closed)
+            limit (int): Page size, capped at MAX_PAGE_SIZE
+            cursor (str, optional): next_cursor of the previous page
+            
+        Returns:
+            tuple: ({"trades", "next_cursor"}, error_message), next_cursor is None on the last page
+        """
+        try:
+            limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+            
+            query = db.session.query(*TRADE_HISTORY_COLUMNS).filter(Trade.user_id == user_id)
+            
+            if challenge_id:
+                query = query.filter(Trade.challenge_id == challenge_id)
+            
+            if status:
+                query = query.filter(Trade.status == status)
+            
+            if cursor:
+                created_at, trade_id = TradeService._decode_cursor(cursor)
+                query = query.filter(or_(
+                    Trade.created_at < created_at,
+                    and_(Trade.created_at == created_at, Trade.id < trade_id)
+                ))
+            
+            # One extra row tells whether another page follows
+            rows = query.order_by(Trade.created_at.desc(), Trade.id.desc()).limit(limit + 1).all()
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = TradeService._encode_cursor(rows[-1].created_at, rows[-1].id)
+            
+            return {
+                'trades': [row._asdict() for row in rows],
+                'next_cursor': next_cursor
+            }, None
+            
+        except (ValueError, TypeError):
+            return None, "Invalid cursor or limit"
+        except Exception as e:
+            return None, f"Failed to get trades: {str(e)}"
+    
+    @staticmethod
+    def _encode_cursor(created_at, trade_id):
+        """Opaque pagination cursor for a (created_at, id) position"""
+        raw = f"{created_at.isoformat()}|{trade_id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Inverse of _encode_cursor, raises ValueError on a malformed cursor"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        except Exception:
+            raise ValueError("Invalid cursor")
+        created_at, trade_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(trade_id)
+    
     @staticmethod
     def close_trade(trade_id, exit_price):
         """
@@ -147,7 +451,11 @@ class TradeService:
             if not trade:
                 return None, "Trade not found"
             
+            # Challenge row first, then the trade as the lock holder sees it
+            challenge = TradeService._lock_challenge(trade.challenge_id)
+            db.session.refresh(trade)
             if trade.status != 'open':
+                db.session.rollback()
                 return None, "Trade is already closed"
             
             # Calculate profit/loss
@@ -156,18 +464,25 @@ class TradeService:
             else:  # sell
                 profit_loss = (trade.entry_price - exit_price) * trade.quantity
             
+            DailyPnlService.add_trades(trade.challenge_id, [trade], -1, challenge.trading_calendar)
+            
+            # The balance moves by the change of the trade's P&L: the whole P&L for
+            # a trade that moved no cash yet, the exit value for a BUY order that paid
+            # its entry
+            TradeService.apply_balance_delta(challenge, profit_loss - (trade.profit_loss or 0.0))
+            
+            # The position is reduced by an offsetting fill at the exit price
+            PositionService.apply_fills(challenge, [TradeService._offsetting_fill(trade, exit_price)])
+            
             # Update trade
             trade.exit_price = exit_price
             trade.profit_loss = profit_loss
             trade.status = 'closed'
             
-            # Update challenge balance
-            challenge = UserChallenge.query.get(trade.challenge_id)
-            if challenge:
-                challenge.current_balance += profit_loss
-                TradeService._check_challenge_limits(challenge)
-            
+            DailyPnlService.add_trades(trade.challenge_id, [trade], calendar=challenge.trading_calendar)
             db.session.commit()
+            mtm_engine.discard(challenge.id)
+            rule_queue.submit(challenge.id)
             
             return trade.to_dict(), None
             
@@ -180,6 +495,14 @@ class TradeService:
         """
         Update trade information
         
+        The position ledger follows the change of the trade's open
+        quantity: a delta fill at the entry price when only the quantity
+        changes, the old fill reversed and the new one applied when the
+        symbol or entry price changes, an offsetting fill at the exit price
+        when the trade is closed. A closed trade holds no quantity, so
+        editing one leaves the positions alone. The balance moves by the
+        change of the trade's P&L.
+        
         Args:
             trade_id (int): Trade ID
             **kwargs: Fields to update
@@ -192,13 +515,26 @@ class TradeService:
             if not trade:
                 return None, "Trade not found"
             
+            challenge = TradeService._lock_challenge(trade.challenge_id)
+            DailyPnlService.add_trades(trade.challenge_id, [trade], -1, challenge.trading_calendar)
+            before = (trade.symbol, trade.quantity, trade.entry_price, trade.status)
+            profit_loss = trade.profit_loss or 0.0
+            
             # Update allowed fields
             allowed_fields = ['symbol', 'quantity', 'entry_price', 'exit_price', 'profit_loss', 'status']
             for field, value in kwargs.items():
                 if field in allowed_fields and value is not None:
                     setattr(trade, field, value)
             
+            fills = TradeService._update_fills(trade, *before)
+            if fills:
+                PositionService.apply_fills(challenge, fills)
+            TradeService.apply_balance_delta(challenge, (trade.profit_loss or 0.0) - profit_loss)
+            
+            DailyPnlService.add_trades(trade.challenge_id, [trade], calendar=challenge.trading_calendar)
             db.session.commit()
+            mtm_engine.discard(challenge.id)
+            rule_queue.submit(challenge.id)
             
             return trade.to_dict(), None
             
@@ -211,6 +547,9 @@ class TradeService:
         """
         Delete trade
         
+        An open trade's quantity leaves the position with an offsetting fill
+        at its entry price, and its P&L leaves the balance.
+        
         Args:
             trade_id (int): Trade ID
             
@@ -222,8 +561,17 @@ class TradeService:
             if not trade:
                 return False, "Trade not found"
             
+            challenge = TradeService._lock_challenge(trade.challenge_id)
+            DailyPnlService.add_trades(trade.challenge_id, [trade], -1, challenge.trading_calendar)
+            
+            if trade.status == 'open':
+                PositionService.apply_fills(challenge, [TradeService._offsetting_fill(trade, trade.entry_price)])
+            TradeService.apply_balance_delta(challenge, -(trade.profit_loss or 0.0))
+            
             db.session.delete(trade)
             db.session.commit()
+            mtm_engine.discard(challenge.id)
+            rule_queue.submit(challenge.id)
             
             return True, None
             
@@ -231,11 +579,61 @@ class TradeService:
             db.session.rollback()
             return False, f"Failed to delete trade: {str(e)}"
     
+    @staticmethod
+    def _lock_challenge(challenge_id):
+        """Load a challenge with its row locked until commit, as the position ledger requires"""
+        return UserChallenge.query.filter_by(id=challenge_id).with_for_update().first()
+    
+    @staticmethod
+    def _signed_fill(symbol, quantity, price):
+        """A fill for PositionService.apply_fills from a signed quantity, positive for BUY"""
+        return {'symbol': symbol, 'side': 'BUY' if quantity > 0 else 'SELL', 'quantity': abs(quantity), 'price': price}
+    
+    @staticmethod
+    def _offsetting_fill(trade, price):
+        """The fill taking an open trade's quantity back out of its position"""
+        direction = 1 if trade.trade_type == 'buy' else -1
+        return TradeService._signed_fill(trade.symbol, -direction * trade.quantity, price)
+    
+    @staticmethod
+    def _update_fills(trade, symbol, quantity, entry_price, status):
+        """
+        Fills moving a position from a trade's previous values to its current ones
+        
+        Args:
+            trade (Trade): Trade with the updated values
+            symbol, quantity, entry_price, status: Its values before the update
+        
+        Returns:
+            list: Fills for PositionService.apply_fills, empty if the open quantity did not change
+        """
+        direction = 1 if trade.trade_type == 'buy' else -1
+        fills = []
+        
+        if status == 'open':
+            if symbol != trade.symbol or entry_price != trade.entry_price:
+                fills.append(TradeService._signed_fill(symbol, -direction * quantity, entry_price))
+                fills.append(TradeService._signed_fill(trade.symbol, direction * trade.quantity, trade.entry_price))
+            elif quantity != trade.quantity:
+                fills.append(TradeService._signed_fill(
+                    trade.symbol, direction * (trade.quantity - quantity), trade.entry_price))
+            if trade.status != 'open':
+                fills.append(TradeService._offsetting_fill(trade, trade.exit_price or trade.entry_price))
+        elif trade.status == 'open':
+            # Reopened: the quantity is held again
+            fills.append(TradeService._signed_fill(trade.symbol, direction * trade.quantity, trade.entry_price))
+        
+        return fills
+    
     @staticmethod
     def get_trade_statistics(user_id=None, challenge_id=None):
         """
         Get trade statistics
         
+        Aggregated in the database in one query returning a single row, so
+        memory stays flat however many trades match. The query only reads
+        columns of idx_trades_user_stats and never touches the table rows.
+        
         Args:
             user_id (int, optional): Filter by user ID
             challenge_id (int, optional): Filter by challenge ID
@@ -244,42 +642,35 @@ class TradeService:
             tuple: (statistics_dict, error_message)
         """
         try:
-            query = Trade.query
+            closed = Trade.status == 'closed'
+            query = db.session.query(
+                func.count(),
+                func.sum(case((Trade.status == 'open', 1), else_=0)),
+                func.sum(case((closed, 1), else_=0)),
+                func.sum(case((and_(closed, Trade.profit_loss > 0), 1), else_=0)),
+                func.sum(case((and_(closed, Trade.profit_loss < 0), 1), else_=0)),
+                func.sum(case((closed, Trade.profit_loss), else_=0.0))
+            )
             
             if user_id:
-                query = query.filter_by(user_id=user_id)
+                query = query.filter(Trade.user_id == user_id)
             
             if challenge_id:
-                query = query.filter_by(challenge_id=challenge_id)
-            
-            trades = query.all()
-            
-            if not trades:
-                return {
-                    'total_trades': 0,
-                    'open_trades': 0,
-                    'closed_trades': 0,
-                    'winning_trades': 0,
-                    'losing_trades': 0,
-                    'total_profit_loss': 0,
-                    'average_profit_loss': 0,
-                    'win_rate': 0
-                }, None
-            
-            closed_trades = [t for t in trades if t.status == 'closed']
-            winning_trades = [t for t in closed_trades if t.profit_loss > 0]
-            losing_trades = [t for t in closed_trades if t.profit_loss < 0]
-            
-            total_profit_loss = sum(t.profit_loss for t in closed_trades)
-            average_profit_loss = total_profit_loss / len(closed_trades) if closed_trades else 0
-            win_rate = (len(winning_trades) / len(closed_trades) * 100) if closed_trades else 0
+                query = query.filter(Trade.challenge_id == challenge_id)
+            
+            total, open_count, closed_count, winning, losing, total_profit_loss = query.one()
+            
+            closed_count = int(closed_count or 0)
+            total_profit_loss = float(total_profit_loss or 0.0)
+            average_profit_loss = total_profit_loss / closed_count if closed_count else 0
+            win_rate = (int(winning or 0) / closed_count * 100) if closed_count else 0
             
             statistics = {
-                'total_trades': len(trades),
-                'open_trades': len([t for t in trades if t.status == 'open']),
-                'closed_trades': len(closed_trades),
-                'winning_trades': len(winning_trades),
-                'losing_trades': len(losing_trades),
+                'total_trades': int(total or 0),
+                'open_trades': int(open_count or 0),
+                'closed_trades': closed_count,
+                'winning_trades': int(winning or 0),
+                'losing_trades': int(losing or 0),
                 'total_profit_loss': round(total_profit_loss, 2),
                 'average_profit_loss': round(average_profit_loss, 2),
                 'win_rate': round(win_rate, 2)
@@ -289,17 +680,3 @@ class TradeService:
             
         except Exception as e:
             return None, f"Failed to get trade statistics: {str(e)}"
-    
-    @staticmethod
-    def _check_challenge_limits(challenge):
-        """
-        Internal method to check if challenge has exceeded loss limits
-        
-        Args:
-            challenge (UserChallenge): Challenge object
-        """
-        profit_loss = challenge.current_balance - challenge.initial_balance
-        
-        # Check if max total loss is exceeded
-        if abs(profit_loss) >= challenge.max_total_loss:
-            challenge.status = 'failed'
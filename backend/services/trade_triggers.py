@@ -0,0 +1,314 @@
+"""
+Trade Triggers
+Server-side stop-loss and take-profit levels evaluated on every price tick
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from challenge_engine import FINAL_STATUSES
+from models import db, Position, Trade, UserChallenge
+from services.daily_pnl_service import DailyPnlService
+from services.position_service import QUANTITY_EPSILON
+from services.real_time_data import market_for_symbol, real_time_service
+from services.rule_queue import rule_queue
+from services.trade_service import TradeService
+from services.trading_calendar import get_calendar
+
+
+class SymbolTriggers:
+    """
+    Protective levels of one symbol as two sorted arrays
+
+    Stop-losses close a long when the price falls to them, take-profits when
+    it rises to them. Each side is a sorted price array with a parallel
+    array of trade ids, so one bisect per side finds every crossed level.
+    """
+
+    __slots__ = ('stop_prices', 'stop_ids', 'target_prices', 'target_ids')
+
+    def __init__(self):
+        self.stop_prices: List[float] = []
+        self.stop_ids: List[int] = []
+        self.target_prices: List[float] = []
+        self.target_ids: List[int] = []
+
+    def __len__(self):
+        return len(self.stop_ids) + len(self.target_ids)
+
+    def add(self, trade_id: int, stop_loss: Optional[float], take_profit: Optional[float]):
+        if stop_loss:
+            _insert(self.stop_prices, self.stop_ids, stop_loss, trade_id)
+        if take_profit:
+            _insert(self.target_prices, self.target_ids, take_profit, trade_id)
+
+    def remove(self, trade_id: int, stop_loss: Optional[float], take_profit: Optional[float]):
+        if stop_loss:
+            _delete(self.stop_prices, self.stop_ids, stop_loss, trade_id)
+        if take_profit:
+            _delete(self.target_prices, self.target_ids, take_profit, trade_id)
+
+    def cross(self, price: float) -> Tuple[List[int], List[int]]:
+        """Remove and return (stopped ids, target ids) crossed by `price`"""
+        start = bisect_left(self.stop_prices, price)
+        stopped = self.stop_ids[start:]
+        del self.stop_prices[start:], self.stop_ids[start:]
+
+        end = bisect_right(self.target_prices, price)
+        targeted = self.target_ids[:end]
+        del self.target_prices[:end], self.target_ids[:end]
+
+        return stopped, targeted
+
+
+def _insert(prices: List[float], ids: List[int], price: float, trade_id: int):
+    index = bisect_right(prices, price)
+    prices.insert(index, price)
+    ids.insert(index, trade_id)
+
+
+def _delete(prices: List[float], ids: List[int], price: float, trade_id: int):
+    index = bisect_left(prices, price)
+    while index < len(prices) and prices[index] == price:
+        if ids[index] == trade_id:
+            del prices[index], ids[index]
+            return
+        index += 1
+
+
+def _covered(challenge_id: int, symbol: str) -> Set[int]:
+    """
+    Open BUY trades of a symbol the long position still holds the shares of
+
+    SELLs consume the oldest lots first, so these are the newest trades
+    whose quantities add up to at most the position.
+    """
+    held = Position.query.with_entities(Position.quantity).filter_by(
+        challenge_id=challenge_id, symbol=symbol
+    ).scalar() or 0.0
+    trades = Trade.query.with_entities(Trade.id, Trade.quantity).filter_by(
+        challenge_id=challenge_id, symbol=symbol, trade_type='buy', status='open'
+    ).order_by(Trade.created_at.desc(), Trade.id.desc())
+
+    covered = set()
+    for trade in trades:
+        if trade.quantity > held + QUANTITY_EPSILON:
+            break
+        covered.add(trade.id)
+        held -= trade.quantity
+    return covered
+
+
+class TriggerEvaluator:
+    """
+    Per-process stop-loss / take-profit book
+
+    Open trades with protective levels are loaded at startup. Each tick
+    bisects the symbol's two arrays, then closes the crossed trades of each
+    challenge in one batch transaction: the trade rows are locked and marked
+    closed and the offsetting SELL fills go through TradeService.execute_batch,
+    the same ledger as every other order. A trigger never sells more than
+    the long position still holds, see `trim`.
+    """
+
+    def __init__(self, poll_interval: float = 10, fetcher: Optional[Callable[[str], Dict]] = None):
+        self.poll_interval = poll_interval
+        self.fetcher = fetcher or (lambda symbol: real_time_service.get_live_price(symbol, market_for_symbol(symbol)))
+        self.app = None
+        self._books: Dict[str, SymbolTriggers] = {}
+        self._trades: Dict[int, Tuple[int, str, Optional[float], Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        """Bind to the Flask app and load the protected open trades of unfinished challenges"""
+        self.app = app
+        with app.app_context():
+            trades = Trade.query.join(UserChallenge, Trade.challenge_id == UserChallenge.id).filter(
+                Trade.status == 'open',
+                (Trade.stop_loss.isnot(None)) | (Trade.take_profit.isnot(None)),
+                UserChallenge.status.notin_(FINAL_STATUSES)
+            ).yield_per(10000)
+            for trade in trades:
+                self.add(trade.id, trade.challenge_id, trade.symbol, trade.stop_loss, trade.take_profit)
+
+    def armed_count(self) -> int:
+        return len(self._trades)
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one armed level"""
+        with self._lock:
+            return [symbol for symbol, book in self._books.items() if len(book)]
+
+    def add(self, trade_id: int, challenge_id: int, symbol: str,
+            stop_loss: Optional[float], take_profit: Optional[float]):
+        """Arm (or re-arm) the protective levels of an open trade"""
+        self.remove(trade_id)
+        if not stop_loss and not take_profit:
+            return
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                book = self._books[symbol] = SymbolTriggers()
+            book.add(trade_id, stop_loss, take_profit)
+            self._trades[trade_id] = (challenge_id, symbol, stop_loss, take_profit)
+        self._ensure_poller()
+
+    def remove(self, trade_id: int):
+        """Disarm a trade's levels, e.g. after it was closed another way"""
+        with self._lock:
+            entry = self._trades.pop(trade_id, None)
+            if entry is not None:
+                _, symbol, stop_loss, take_profit = entry
+                self._books[symbol].remove(trade_id, stop_loss, take_profit)
+
+    def evict(self, challenge_id: int) -> int:
+        """
+        Disarm every trade of a challenge, e.g. once it can no longer trade
+
+        Returns:
+            int: Number of trades disarmed
+        """
+        with self._lock:
+            trade_ids = [trade_id for trade_id, entry in self._trades.items() if entry[0] == challenge_id]
+        for trade_id in trade_ids:
+            self.remove(trade_id)
+        return len(trade_ids)
+
+    def trim(self, challenge_id: int, symbol: str) -> int:
+        """
+        Disarm the protected trades a SELL left without shares to close
+
+        A SELL reduces the net position but leaves the BUY trades open, so
+        their levels would sell shares the challenge no longer holds and
+        open a short. Call after a SELL of `symbol` was committed.
+
+        Returns:
+            int: Number of trades disarmed
+        """
+        covered = _covered(challenge_id, symbol)
+        with self._lock:
+            uncovered = [trade_id for trade_id, entry in self._trades.items()
+                         if entry[0] == challenge_id and entry[1] == symbol and trade_id not in covered]
+        for trade_id in uncovered:
+            self.remove(trade_id)
+        return len(uncovered)
+
+    def match(self, symbol: str, price: float) -> Dict[int, List[int]]:
+        """Remove and return the trades crossed by `price`, grouped by challenge"""
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                return {}
+            stopped, targeted = book.cross(price)
+
+            by_challenge: Dict[int, List[int]] = {}
+            for trade_id in stopped + targeted:
+                entry = self._trades.pop(trade_id, None)
+                if entry is None:
+                    continue  # crossed both sides at once
+                challenge_id, _, stop_loss, take_profit = entry
+                # Drop the level on the side that did not trigger
+                book.remove(trade_id, stop_loss, take_profit)
+                by_challenge.setdefault(challenge_id, []).append(trade_id)
+            return by_challenge
+
+    def on_tick(self, symbol: str, price: float) -> int:
+        """
+        Close every protected trade crossed by a new price
+
+        Returns:
+            int: Number of trades closed
+        """
+        by_challenge = self.match(symbol, price)
+        if not by_challenge:
+            return 0
+        with self.app.app_context():
+            return sum(self._close(challenge_id, trade_ids, price)
+                       for challenge_id, trade_ids in by_challenge.items())
+
+    def _close(self, challenge_id: int, trade_ids: List[int], price: float) -> int:
+        """
+        Close one challenge's crossed trades in a single transaction
+
+        On failure the trades are re-armed, so the next tick retries them,
+        unless the challenge can no longer trade.
+        """
+        # Challenge row first, the lock order of every other order path
+        challenge = UserChallenge.query.filter_by(id=challenge_id).with_for_update().first()
+        rows = Trade.query.with_entities(
+            Trade.id, Trade.symbol, Trade.quantity, Trade.profit_loss, Trade.created_at,
+            Trade.stop_loss, Trade.take_profit
+        ).filter(
+            Trade.id.in_(trade_ids),
+            Trade.status == 'open'
+        ).with_for_update().all()
+        if challenge is None or not rows:
+            db.session.rollback()
+            return 0
+
+        # Trades a SELL already took the shares of stay open, disarmed
+        covered = _covered(challenge_id, rows[0].symbol)
+        rows = [row for row in rows if row.id in covered]
+        if not rows:
+            db.session.rollback()
+            return 0
+
+        Trade.query.filter(Trade.id.in_([row.id for row in rows])).update(
+            {'status': 'closed', 'exit_price': price}, synchronize_session=False)
+
+        calendar = get_calendar(challenge.trading_calendar)
+
+        # The closed longs now count towards the closed P&L of the trading day they were opened
+        closed: Dict[date, float] = {}
+        for row in rows:
+            trade_date = calendar.trading_day(row.created_at)
+            closed[trade_date] = closed.get(trade_date, 0.0) + (row.profit_loss or 0.0)
+        for trade_date, pnl in closed.items():
+            DailyPnlService.add(challenge_id, trade_date, 0.0, pnl)
+
+        batch, error = TradeService.execute_batch(challenge, [
+            {'symbol': row.symbol, 'side': 'SELL', 'quantity': row.quantity, 'price': price}
+            for row in rows
+        ], require_status='ACTIVE')
+
+        if error:
+            db.session.rollback()
+            if not rule_queue.blocked_status(challenge_id):
+                for row in rows:
+                    self.add(row.id, challenge_id, row.symbol, row.stop_loss, row.take_profit)
+            print(f"Trigger close failed for challenge {challenge_id}: {error}")
+            return 0
+        return len(rows)
+
+    def _ensure_poller(self):
+        """Start the background price poller"""
+        if self.app is None:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self):
+        """Price every symbol with armed levels once per interval"""
+        while True:
+            started = time.time()
+            for symbol in self.symbols():
+                try:
+                    data = self.fetcher(symbol)
+                    if 'error' not in data and data.get('price'):
+                        self.on_tick(symbol, data['price'])
+                except Exception as e:
+                    print(f"Trigger evaluation failed for {symbol}: {str(e)}")
+
+            elapsed = time.time() - started
+            self._wakeup.wait(max(self.poll_interval - elapsed, 0))
+            self._wakeup.clear()
+
+
+# Global instance (ticks at the same rate the upstream cache expires)
+trade_triggers = TriggerEvaluator(poll_interval=real_time_service.cache_duration)
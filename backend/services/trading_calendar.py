@@ -0,0 +1,190 @@
+"""
+Trading Calendar
+Trading day and session boundaries per market, precomputed a year at a time
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, time as clock, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Calendar of challenges that did not choose one: the trading day is the UTC day
+DEFAULT_CALENDAR = 'UTC'
+
+
+class Market(NamedTuple):
+    """
+    How a market's days and sessions are laid out in its own time zone
+
+    A rollover other than midnight starts the next date's trading day, e.g.
+    with a 17:00 rollover Tuesday's trading day runs from Monday 17:00 to
+    Tuesday 17:00. Markets without session hours trade the whole day, every day.
+    """
+    timezone: str
+    rollover: clock = clock(0)
+    session_open: Optional[clock] = None
+    session_close: Optional[clock] = None
+
+
+MARKETS = {
+    'UTC': Market('UTC'),
+    'CRYPTO': Market('UTC'),
+    # Daily limits reset at 17:00 New York time, after the close, like US futures desks
+    'US': Market('America/New_York', clock(17), clock(9, 30), clock(16)),
+    # Casablanca Stock Exchange continuous session
+    'MOROCCO': Market('Africa/Casablanca', clock(0), clock(9, 30), clock(15, 30)),
+}
+
+
+class YearTable(NamedTuple):
+    """Boundaries of the trading days dated in one year, as POSIX timestamps"""
+    first_day: date
+    starts: List[float]  # one per day plus the start of the next year's first day
+    opens: List[Optional[float]]
+    closes: List[Optional[float]]
+
+
+def _timestamp(moment: Optional[datetime]) -> float:
+    """POSIX timestamp of a moment, naive datetimes are UTC like everywhere in the database"""
+    if moment is None:
+        return time.time()
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _utc(timestamp: float) -> datetime:
+    """Naive UTC datetime of a timestamp"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class TradingCalendar:
+    """
+    One market's trading days and sessions
+
+    The boundaries of every trading day of a year are computed in one go
+    with the time zone rules (so DST and Ramadan offsets are in them) and
+    kept as a sorted list of timestamps. Finding the trading day of a moment
+    is then a bisect on that list instead of time zone arithmetic on every
+    trade. Years are built on first use.
+    """
+
+    def __init__(self, name: str, market: Market):
+        self.name = name
+        self.market = market
+        self._zone = ZoneInfo(market.timezone)
+        self._years: Dict[int, YearTable] = {}
+        self._lock = threading.Lock()
+
+    def locate(self, moment: Optional[datetime] = None) -> Tuple[date, float, float]:
+        """
+        Trading day a moment falls in
+
+        Args:
+            moment (datetime, optional): Naive UTC or aware datetime, now by default
+
+        Returns:
+            tuple: (trading day, start timestamp, end timestamp)
+        """
+        timestamp = _timestamp(moment)
+        utc_year = datetime.fromtimestamp(timestamp, timezone.utc).year
+
+        # A rollover before midnight puts the last hours of a UTC year in the next trading year
+        for year in (utc_year, utc_year + 1, utc_year - 1):
+            table = self.year(year)
+            i = bisect_right(table.starts, timestamp) - 1
+            if 0 <= i < len(table.starts) - 1:
+                return table.first_day + timedelta(days=i), table.starts[i], table.starts[i + 1]
+        raise ValueError(f'No trading day of {self.name} contains {timestamp}')
+
+    def trading_day(self, moment: Optional[datetime] = None) -> date:
+        """Trading day a moment (naive UTC, now by default) falls in"""
+        return self.locate(moment)[0]
+
+    def day_bounds(self, day: date) -> Tuple[datetime, datetime]:
+        """Start and end of a trading day, as naive UTC datetimes"""
+        table = self.year(day.year)
+        i = (day - table.first_day).days
+        return _utc(table.starts[i]), _utc(table.starts[i + 1])
+
+    def session(self, day: date) -> Optional[Tuple[datetime, datetime]]:
+        """Open and close of a trading day's session as naive UTC datetimes, None on days without one"""
+        table = self.year(day.year)
+        i = (day - table.first_day).days
+        if table.opens[i] is None:
+            return None
+        return _utc(table.opens[i]), _utc(table.closes[i])
+
+    def is_open(self, moment: Optional[datetime] = None) -> bool:
+        """True when a moment (naive UTC, now by default) is inside a session"""
+        timestamp = _timestamp(moment)
+        day, _, _ = self.locate(moment)
+        table = self.year(day.year)
+        i = (day - table.first_day).days
+        return table.opens[i] is not None and table.opens[i] <= timestamp < table.closes[i]
+
+    def year(self, year: int) -> YearTable:
+        """Boundary table of the trading days dated in `year`, built on first use"""
+        table = self._years.get(year)
+        if table is None:
+            with self._lock:
+                table = self._years.get(year)
+                if table is None:
+                    table = self._build(year)
+                    self._years[year] = table
+        return table
+
+    def _build(self, year: int) -> YearTable:
+        """Compute one year's day starts and sessions in the market's time zone"""
+        market = self.market
+        first_day = date(year, 1, 1)
+        days = (date(year + 1, 1, 1) - first_day).days
+        # With a rollover the trading day starts on the previous calendar day
+        lead = timedelta(days=1) if market.rollover != clock(0) else timedelta(0)
+
+        starts, opens, closes = [], [], []
+        for offset in range(days + 1):
+            day = first_day + timedelta(days=offset)
+            starts.append(datetime.combine(day - lead, market.rollover, self._zone).timestamp())
+            if offset == days or market.session_open is None:
+                continue
+            if day.weekday() < 5:
+                opens.append(datetime.combine(day, market.session_open, self._zone).timestamp())
+                closes.append(datetime.combine(day, market.session_close, self._zone).timestamp())
+            else:
+                opens.append(None)
+                closes.append(None)
+
+        # 24 hour markets: the session is the whole trading day
+        if market.session_open is None:
+            opens, closes = starts[:-1], starts[1:]
+        return YearTable(first_day, starts, opens, closes)
+
+
+calendars: Dict[str, TradingCalendar] = {name: TradingCalendar(name, market) for name, market in MARKETS.items()}
+
+
+def get_calendar(name: Optional[str] = None) -> TradingCalendar:
+    """A calendar by name, the default one for a missing or unknown name"""
+    return calendars.get(name) or calendars[DEFAULT_CALENDAR]
+
+
+def trading_day(name: Optional[str] = None, moment: Optional[datetime] = None) -> date:
+    """
+    Trading day of a moment in a calendar, the day every daily limit is counted on
+
+    Args:
+        name (str, optional): Calendar name (a challenge's trading_calendar), default calendar if None
+        moment (datetime, optional): Naive UTC datetime, now by default
+
+    Returns:
+        date: Trading day
+    """
+    return get_calendar(name).trading_day(moment)
+
+
+def trading_days(moment: Optional[datetime] = None) -> Dict[str, date]:
+    """Trading day of a moment in every calendar, {name: day}"""
+    return {name: calendar.trading_day(moment) for name, calendar in calendars.items()}
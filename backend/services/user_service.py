@@ -185,7 +185,7 @@ class UserService:
             
             stats = {
                 'total_challenges': len(user.challenges),
-                'active_challenges': len([c for c in user.challenges if c.status == 'active']),
+                'active_challenges': len([c for c in user.challenges if c.status == 'ACTIVE']),
                 'total_trades': len(user.trades),
                 'open_trades': len([t for t in user.trades if t.status == 'open']),
                 'total_payments': len(user.payments),
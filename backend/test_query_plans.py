@@ -0,0 +1,125 @@
+"""
+Query plan regression check for the trades table
+Runs EXPLAIN on the SQL the hot trade queries actually emit and fails on full table scans
+or, for queries meant to be index-only, on reads of the table rows
+
+Usage (against the configured database, ideally with production-like volume):
+    python test_query_plans.py
+"""
+
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import app
+from models import db
+from services.trade_service import TradeService
+
+# Table whose access paths are checked
+TABLE = 'trades'
+
+
+def hot_queries():
+    """
+    Every hot query, run against placeholder ids
+
+    Returns:
+        list: (name, callable, covered) tuples, covered queries must be answered
+              from an index alone
+    """
+    cursor = TradeService._encode_cursor(datetime.utcnow(), 1)
+    return [
+        ('user trade history', lambda: TradeService.get_trade_page(1), False),
+        ('user trade history, next page', lambda: TradeService.get_trade_page(1, cursor=cursor), False),
+        ('challenge trade history', lambda: TradeService.get_trade_page(1, challenge_id=1, status='closed'), False),
+        ('user trade statistics', lambda: TradeService.get_trade_statistics(user_id=1), True),
+        ('challenge trade statistics', lambda: TradeService.get_trade_statistics(user_id=1, challenge_id=1), True),
+    ]
+
+
+def capture_statements(run):
+    """Execute `run` and return the (statement, parameters) it sent to the database"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        db.session.rollback()
+    return captured
+
+
+def plan_problems(statement, parameters, covered=False):
+    """
+    EXPLAIN one statement and list the plan steps that break its access rules
+
+    Args:
+        statement (str): SQL as sent to the driver
+        parameters: Driver parameters of the statement
+        covered (bool): Also require the table rows never to be read
+
+    Returns:
+        list: Offending plan lines, empty when every access is an index lookup or range
+    """
+    connection = db.session.connection()
+    problems = []
+
+    if db.engine.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        for row in rows:
+            detail = row[-1]
+            if not re.match(rf'(SCAN|SEARCH) {TABLE}\b', detail):
+                continue
+            # "SCAN trades" (with or without an index) reads every row, "SEARCH trades ..." does not
+            if detail.startswith('SCAN'):
+                problems.append(detail)
+            elif covered and 'COVERING INDEX' not in detail:
+                problems.append(f"{detail} (not covered)")
+        return problems
+
+    result = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+    columns = list(result.keys())
+    for row in result.fetchall():
+        step = dict(zip(columns, row))
+        if step.get('table') != TABLE:
+            continue
+        # MySQL access types: ALL is a table scan, index a full index scan
+        if step.get('type') in ('ALL', 'index'):
+            problems.append(f"type={step['type']} key={step.get('key')} rows={step.get('rows')}")
+        elif covered and 'Using index' not in (step.get('Extra') or ''):
+            problems.append(f"key={step.get('key')} extra={step.get('Extra')} (not covered)")
+    return problems
+
+
+def test_hot_queries_use_indexes():
+    """Every hot query on the trades table must be served by an index, covered ones by the index alone"""
+    failures = []
+
+    with app.app_context():
+        for name, run, covered in hot_queries():
+            statements = [(sql, params) for sql, params in capture_statements(run)
+                          if re.search(rf'\b{TABLE}\b', sql)]
+            assert statements, f"{name}: no query on {TABLE} was captured"
+
+            for statement, parameters in statements:
+                for step in plan_problems(statement, parameters, covered):
+                    failures.append(f"{name}: {step}\n    {' '.join(statement.split())}")
+            db.session.rollback()
+
+    assert not failures, "Query plan regressions:\n" + "\n".join(failures)
+
+
+if __name__ == '__main__':
+    try:
+        test_hot_queries_use_indexes()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("✅ All hot trade queries use an index")
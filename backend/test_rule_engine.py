@@ -0,0 +1,146 @@
+"""
+Property test for the vectorized rule engine
+For any challenge columns, evaluate_batch must give every challenge exactly the outcome
+ChallengeRules.check gives it on its own
+
+Usage:
+    python test_rule_engine.py [cases]
+
+Under pytest the challenges come from a fixed seed, run as a script they
+come from a new seed each time (printed on failure)
+"""
+
+import math
+import random
+import sys
+
+import numpy as np
+
+from challenge_engine import RULE_OUTCOMES, ChallengeRules, evaluate_batch
+
+# Values that stress comparisons: signs, zero, huge magnitudes and non-finite floats
+SPECIAL_VALUES = [0.0, -0.0, 1e-300, -1e-300, 1e300, -1e300, math.inf, -math.inf, math.nan]
+SEED = 2024
+
+
+def random_amount(rng):
+    """A balance or threshold, mostly realistic, sometimes extreme"""
+    roll = rng.random()
+    if roll < 0.05:
+        return rng.choice(SPECIAL_VALUES)
+    if roll < 0.15:
+        return rng.uniform(-1e9, 1e9)
+    return round(rng.uniform(0, 20000), rng.choice([0, 2, 6]))
+
+
+def near(rng, value):
+    """A value on, just below or just above a limit"""
+    return rng.choice([value, math.nextafter(value, -math.inf), math.nextafter(value, math.inf)])
+
+
+def random_challenge(rng):
+    """
+    One challenge's columns
+
+    Half the cases are built to land on or one ulp around a limit, computed
+    the way ChallengeRules computes it, which is where float differences
+    between the two implementations would show.
+    """
+    initial_balance = random_amount(rng)
+    profit_target = random_amount(rng)
+    max_daily_loss = random_amount(rng)
+    max_total_loss = random_amount(rng)
+    max_trailing_drawdown = random_amount(rng) if rng.random() < 0.7 else None
+    current_balance = random_amount(rng)
+    daily_pnl = -random_amount(rng)
+    drawdown = random_amount(rng)
+
+    if rng.random() < 0.5:
+        edge = rng.choice(['pass', 'total', 'daily', 'trailing'])
+        if edge == 'pass':
+            current_balance = near(rng, initial_balance + profit_target)
+        elif edge == 'total':
+            current_balance = near(rng, initial_balance - max_total_loss)
+        elif edge == 'daily':
+            daily_pnl = near(rng, -max_daily_loss)
+        elif max_trailing_drawdown is not None:
+            drawdown = near(rng, max_trailing_drawdown)
+
+    return (initial_balance, current_balance, daily_pnl, profit_target, max_daily_loss, max_total_loss,
+            drawdown, max_trailing_drawdown)
+
+
+def scalar_outcome(initial_balance, current_balance, daily_pnl, profit_target, max_daily_loss, max_total_loss,
+                   drawdown=0.0, max_trailing_drawdown=None):
+    """The single-challenge engine's outcome, named like RULE_OUTCOMES"""
+    rules = ChallengeRules((initial_balance, profit_target, max_daily_loss, max_total_loss, max_trailing_drawdown))
+    return rules.check(current_balance, daily_pnl, drawdown) or 'ACTIVE'
+
+
+def batch_columns(challenges):
+    """Columns for evaluate_batch, where a missing max trailing drawdown is inf"""
+    columns = [list(column) for column in zip(*challenges)]
+    columns[7] = [math.inf if limit is None else limit for limit in columns[7]]
+    return columns
+
+
+def check_agreement(challenges):
+    """List the challenges on which the batch and single-challenge engines disagree"""
+    codes = evaluate_batch(*batch_columns(challenges))
+    return [
+        (challenge, RULE_OUTCOMES[code], scalar_outcome(*challenge))
+        for challenge, code in zip(challenges, codes.tolist())
+        if RULE_OUTCOMES[code] != scalar_outcome(*challenge)
+    ]
+
+
+def test_batch_matches_single_challenge_engine(cases=200000, seed=SEED):
+    """evaluate_batch agrees with ChallengeRules.check on every generated challenge"""
+    rng = random.Random(seed)
+
+    challenges = [random_challenge(rng) for _ in range(cases)]
+    mismatches = check_agreement(challenges)
+
+    assert not mismatches, (
+        f"seed {seed}: {len(mismatches)} of {cases} challenges disagree, first: "
+        f"{mismatches[0][0]} batch={mismatches[0][1]} single={mismatches[0][2]}"
+    )
+
+
+def test_batch_covers_every_outcome():
+    """The rule priority holds when several rules are broken at once"""
+    # initial, balance, daily P&L, target, max daily loss, max total loss, drawdown, max trailing drawdown
+    challenges = [
+        (5000.0, 5000.0, 0.0, 500.0, 250.0, 500.0, 0.0, 400.0),        # nothing broken
+        (5000.0, 5500.0, -900.0, 500.0, 250.0, 500.0, 900.0, 400.0),   # target beats the loss rules
+        (5000.0, 4500.0, -900.0, 500.0, 250.0, 500.0, 900.0, 400.0),   # total loss beats daily loss
+        (5000.0, 4900.0, -250.0, 500.0, 250.0, 500.0, 400.0, 400.0),   # daily loss beats drawdown
+        (5000.0, 5100.0, -100.0, 500.0, 250.0, 500.0, 400.0, 400.0),   # drawdown on the limit
+        (5000.0, 5100.0, -100.0, 500.0, 250.0, 500.0, 9000.0, None),   # no trailing rule
+    ]
+    codes = evaluate_batch(*batch_columns(challenges))
+
+    assert [RULE_OUTCOMES[code] for code in codes] == [
+        'ACTIVE', 'PASSED', 'FAILED_TOTAL', 'FAILED_DAILY', 'FAILED_TRAILING', 'ACTIVE'
+    ]
+    assert not check_agreement(challenges)
+
+
+def test_scalar_thresholds_broadcast():
+    """A threshold given once applies to every challenge"""
+    balances = np.array([5600.0, 5000.0, 4400.0])
+    codes = evaluate_batch(5000.0, balances, 0.0, 500.0, 250.0, 500.0)
+
+    assert [RULE_OUTCOMES[code] for code in codes] == ['PASSED', 'ACTIVE', 'FAILED_TOTAL']
+
+
+if __name__ == '__main__':
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    try:
+        test_batch_covers_every_outcome()
+        test_scalar_thresholds_broadcast()
+        test_batch_matches_single_challenge_engine(cases, random.randrange(2 ** 32))
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Batch and single-challenge rule engines agree on {cases} generated challenges")
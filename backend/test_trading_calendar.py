@@ -0,0 +1,82 @@
+"""
+Test for the trading calendar
+The precomputed, bisected day boundaries must give every moment the trading
+day a direct time zone conversion gives it, DST and Ramadan changes included
+
+Usage:
+    python test_trading_calendar.py [moments]
+
+Under pytest the random moments come from a fixed seed, run as a script
+they come from a new seed each time (printed on failure)
+"""
+
+import random
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from services.trading_calendar import MARKETS, get_calendar
+
+START = datetime(2024, 1, 1)
+SPAN = timedelta(days=366 * 4)
+SEED = 2024
+
+
+def expected_day(name, moment):
+    """Trading day of a naive UTC moment, straight from the time zone rules"""
+    market = MARKETS[name]
+    local = moment.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(market.timezone))
+    if market.rollover != time(0) and local.time() >= market.rollover:
+        return local.date() + timedelta(days=1)
+    return local.date()
+
+
+def test_lookup_matches_time_zone_rules(moments=100000, seed=SEED):
+    """trading_day agrees with a direct conversion for random moments and for moments around boundaries"""
+    rng = random.Random(seed)
+
+    for name in MARKETS:
+        calendar = get_calendar(name)
+        for _ in range(moments // len(MARKETS)):
+            moment = START + timedelta(seconds=rng.uniform(0, SPAN.total_seconds()))
+            if rng.random() < 0.5:
+                # One second either side of, or exactly on, a day boundary
+                start, _ = calendar.day_bounds(expected_day(name, moment))
+                moment = start + timedelta(seconds=rng.choice([-1, 0, 1]))
+            assert calendar.trading_day(moment) == expected_day(name, moment), (
+                f"seed {seed}: {name} {moment} gives {calendar.trading_day(moment)}, "
+                f"expected {expected_day(name, moment)}"
+            )
+
+
+def test_boundaries():
+    """Day lengths and sessions on the days the offsets change"""
+    us = get_calendar('US')
+    # 17:00 New York, EDT from March 8th 2026, EST from November 1st
+    assert us.day_bounds(date(2026, 3, 9)) == (datetime(2026, 3, 8, 21), datetime(2026, 3, 9, 21))
+    assert us.day_bounds(date(2026, 3, 8)) == (datetime(2026, 3, 7, 22), datetime(2026, 3, 8, 21))  # 23 hours
+    assert us.trading_day(datetime(2026, 12, 31, 22, 30)) == date(2027, 1, 1)
+    assert us.session(date(2026, 10, 19)) == (datetime(2026, 10, 19, 13, 30), datetime(2026, 10, 19, 20))
+    assert us.session(date(2026, 10, 18)) is None
+    assert us.is_open(datetime(2026, 10, 19, 14)) and not us.is_open(datetime(2026, 10, 19, 20))
+
+    morocco = get_calendar('MOROCCO')
+    # UTC+1, back to UTC+0 during Ramadan
+    assert morocco.day_bounds(date(2026, 10, 19))[0] == datetime(2026, 10, 18, 23)
+    assert morocco.day_bounds(date(2026, 2, 25))[0] == datetime(2026, 2, 25)
+
+    utc = get_calendar('UTC')
+    assert utc.day_bounds(date(2026, 10, 19)) == (datetime(2026, 10, 19), datetime(2026, 10, 20))
+    assert utc.session(date(2026, 10, 18)) == utc.day_bounds(date(2026, 10, 18))
+    assert get_calendar('NOWHERE') is utc
+
+
+if __name__ == '__main__':
+    moments = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    try:
+        test_boundaries()
+        test_lookup_matches_time_zone_rules(moments, random.randrange(2 ** 32))
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Trading calendar agrees with the time zone rules on {moments} moments")
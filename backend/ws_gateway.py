@@ -0,0 +1,18 @@
+"""
+WebSocket market data gateway
+Run alongside the Flask API: python ws_gateway.py
+"""
+
+import asyncio
+from config import Config
+from services.market_gateway import serve
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve(
+            host='0.0.0.0',
+            port=Config.WS_GATEWAY_PORT,
+            poll_interval=Config.WS_GATEWAY_POLL_INTERVAL
+        ))
+    except KeyboardInterrupt:
+        pass
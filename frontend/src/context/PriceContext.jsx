@@ -17,6 +17,8 @@ export const PriceProvider = ({ children }) => {
   const [isLoading, setIsLoading] = useState({});
   const [error, setError] = useState(null);
   const intervalRefs = useRef({});
+  const streamRef = useRef(null);
+  const streamSymbolsRef = useRef({});
 
   // Fetch single price
   const fetchPrice = async (symbol, market = 'US') => {
@@ -86,19 +88,61 @@ export const PriceProvider = ({ children }) => {
     }
   };
 
+  // (Re)open the shared price stream for every auto-refreshed symbol
+  const openStream = () => {
+    if (streamRef.current) {
+      streamRef.current.close();
+      streamRef.current = null;
+    }
+
+    const symbols = Object.values(streamSymbolsRef.current);
+    if (symbols.length === 0) return;
+
+    const source = new EventSource(marketAPI.streamUrl(symbols, true));
+    const applyUpdate = (event) => {
+      const update = JSON.parse(event.data);
+      const key = `${update.symbol}-${update.market}`;
+      setPrices(prev => {
+        // Snapshots replace the quote, deltas only carry the changed fields
+        const priceData = update.full ? { ...update.data } : { ...prev[key], ...update.changes };
+        (update.removed || []).forEach(field => delete priceData[field]);
+        return {
+          ...prev,
+          [key]: {
+            ...priceData,
+            lastUpdated: new Date().toISOString()
+          }
+        };
+      });
+      setError(null);
+    };
+    source.addEventListener('snapshot', applyUpdate);
+    source.addEventListener('delta', applyUpdate);
+    streamRef.current = source;
+  };
+
   // Start auto-refresh for a symbol
   const startAutoRefresh = (symbol, market = 'US', intervalMs = 15000) => {
     const key = `${symbol}-${market}`;
     
+    // Fetch immediately
+    fetchPrice(symbol, market);
+
+    // One stream per tab carries every symbol, the server pushes updates
+    if (typeof EventSource !== 'undefined') {
+      if (!streamSymbolsRef.current[key]) {
+        streamSymbolsRef.current[key] = { symbol, market };
+        openStream();
+      }
+      return;
+    }
+    
     // Clear existing interval if any
     if (intervalRefs.current[key]) {
       clearInterval(intervalRefs.current[key]);
     }
     
-    // Fetch immediately
-    fetchPrice(symbol, market);
-    
-    // Set up interval
+    // Set up interval (fallback for browsers without EventSource)
     intervalRefs.current[key] = setInterval(() => {
       fetchPrice(symbol, market);
     }, intervalMs);
@@ -107,16 +151,23 @@ export const PriceProvider = ({ children }) => {
   // Stop auto-refresh for a symbol
   const stopAutoRefresh = (symbol, market = 'US') => {
     const key = `${symbol}-${market}`;
+    if (streamSymbolsRef.current[key]) {
+      delete streamSymbolsRef.current[key];
+      openStream();
+    }
     if (intervalRefs.current[key]) {
       clearInterval(intervalRefs.current[key]);
       delete intervalRefs.current[key];
     }
   };
 
-  // Stop all intervals on unmount
+  // Stop all intervals and the stream on unmount
   useEffect(() => {
     return () => {
       Object.values(intervalRefs.current).forEach(clearInterval);
+      if (streamRef.current) {
+        streamRef.current.close();
+      }
     };
   }, []);
 
@@ -19,6 +19,7 @@ function AdvancedTradingPage() {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState(null);
   const [trades, setTrades] = useState([]);
+  const [positions, setPositions] = useState([]);
   const [portfolio, setPortfolio] = useState({ totalBalance: 0, totalPnL: 0, positions: [] });
   const [activeTab, setActiveTab] = useState('trading'); // trading, portfolio, analytics
 
@@ -125,8 +126,12 @@ function AdvancedTradingPage() {
 
   const loadTrades = async () => {
     try {
-      const res = await tradingAPI.getTrades(selectedChallenge);
-      setTrades(res.data.trades || []);
+      const [tradesRes, positionsRes] = await Promise.all([
+        tradingAPI.getTrades(selectedChallenge),
+        tradingAPI.getPositions(selectedChallenge)
+      ]);
+      setTrades(tradesRes.data.trades || []);
+      setPositions(positionsRes.data.positions || []);
     } catch (error) {
       console.error('Error loading trades:', error);
     }
@@ -232,13 +237,13 @@ function AdvancedTradingPage() {
     setPortfolio({
       totalBalance,
       totalPnL,
-      positions: trades.filter(t => t.status === 'OPEN')
+      positions
     });
   };
 
   useEffect(() => {
     calculatePortfolioStats();
-  }, [trades, challenges]);
+  }, [trades, challenges, positions]);
 
   return (
     <div className="advanced-trading-page">
@@ -445,16 +450,16 @@ function AdvancedTradingPage() {
                     <div key={position.id} className="position-item">
                       <div className="position-header">
                         <span className="position-symbol">{position.symbol}</span>
-                        <span className={`position-type ${position.trade_type}`}>
-                          {position.trade_type.toUpperCase()}
+                        <span className={`position-type ${position.quantity > 0 ? 'buy' : 'sell'}`}>
+                          {position.quantity > 0 ? 'LONG' : 'SHORT'} {Math.abs(position.quantity)}
                         </span>
                       </div>
                       <div className="position-details">
                         <div className="position-price">
-                          {t('entryPrice', 'Entry Price')}: {position.entry_price}
+                          {t('entryPrice', 'Entry Price')}: {position.average_cost.toFixed(2)}
                         </div>
-                        <div className={`position-pnl ${position.profit_loss >= 0 ? 'positive' : 'negative'}`}>
-                          P&L: {position.profit_loss >= 0 ? '+' : ''}{position.profit_loss.toFixed(2)}
+                        <div className={`position-pnl ${position.unrealized_pnl >= 0 ? 'positive' : 'negative'}`}>
+                          P&L: {position.unrealized_pnl >= 0 ? '+' : ''}{position.unrealized_pnl.toFixed(2)}
                         </div>
                       </div>
                     </div>
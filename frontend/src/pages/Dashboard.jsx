@@ -16,15 +16,27 @@ function Dashboard() {
 
   useEffect(() => {
     loadDashboardData();
-    // Update watchlist every 15 seconds (instead of 10)
-    const interval = setInterval(() => {
-      marketAPI.getWatchlist()
-        .then(res => setWatchlist(res.data.data || []))
-        .catch(err => console.error('Watchlist update failed:', err));
-    }, 15000);
-    return () => clearInterval(interval);
   }, []);
 
+  // Watchlist updates are pushed over the shared price stream
+  const watchlistSymbols = watchlist.map(item => `${item.symbol}:${item.market}`).join(',');
+  useEffect(() => {
+    if (!watchlistSymbols) return;
+
+    const source = new EventSource(marketAPI.streamUrl(watchlist, true));
+    const applyUpdate = (event) => {
+      const update = JSON.parse(event.data);
+      setWatchlist(prev => prev.map(item => (
+        item.symbol === update.symbol && item.market === update.market
+          ? { ...item, ...(update.full ? update.data : update.changes) }
+          : item
+      )));
+    };
+    source.addEventListener('snapshot', applyUpdate);
+    source.addEventListener('delta', applyUpdate);
+    return () => source.close();
+  }, [watchlistSymbols]);
+
   const loadDashboardData = async () => {
     try {
       // Load challenges - FAST (no external API)
@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_BASE_URL = 'http://localhost:5000';
+export const API_BASE_URL = 'http://localhost:5000';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -31,6 +31,11 @@ export const marketAPI = {
   getWatchlist: () => api.get('/api/market/watchlist'),
   getMoroccoStocks: () => api.get('/api/market/morocco/stocks'),
   search: (query) => api.get(`/api/market/search?q=${query}`),
+  // Server-Sent Events stream, symbols: [{ symbol, market }]
+  // With delta the stream sends 'snapshot' events, then 'delta' events with changed fields only
+  streamUrl: (symbols, delta = false) => `${API_BASE_URL}/api/price/stream?symbols=${encodeURIComponent(
+    symbols.map(({ symbol, market }) => `${symbol}:${market}`).join(',')
+  )}${delta ? '&delta=1' : ''}`,
 };
 
 // Trading API
@@ -40,6 +45,7 @@ export const tradingAPI = {
   sellTrade: (tradeData) => api.post('/api/trade/sell', tradeData),
   getTrades: (challengeId) => api.get(`/api/trades${challengeId ? `?challenge_id=${challengeId}` : ''}`),
   getMetrics: (challengeId) => api.get(`/api/challenge/${challengeId}/metrics`),
+  getPositions: (challengeId) => api.get(`/api/challenge/${challengeId}/positions`),
 };
 
 // Challenge API